@@ -0,0 +1,127 @@
+"""
+Хранилище FSM в Redis
+"""
+from typing import Any, Dict, Mapping, Optional, cast
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+
+from config import settings
+
+
+class RedisFSMStorage(RedisStorage):
+    """
+    Хранилище состояний и данных FSM в Redis
+    
+    Данные хранятся в hash (поле - ключ данных, значение - JSON), поэтому
+    update_data выполняется одной транзакцией MULTI/EXEC без предварительного
+    чтения, и одновременные обновления разных полей не затирают друг друга.
+    Каждая операция - один запрос к Redis; TTL ключей состояния и данных
+    продлевается вместе, так что брошенный мастер удаляется целиком.
+    """
+    
+    def __init__(self, *args: Any, ttl: Optional[int] = None, **kwargs: Any):
+        """
+        Args:
+            ttl: Время жизни состояния и данных с последнего изменения, сек
+        """
+        super().__init__(*args, state_ttl=ttl, data_ttl=ttl, **kwargs)
+        self.ttl = ttl
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.set_state_and_data(key, state)
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self.redis.hgetall(self.key_builder.build(key, "data"))
+        return self._decode(raw)
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data_key = self.key_builder.build(key, "data")
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(data_key)
+            if data:
+                pipe.hset(data_key, mapping=self._encode(data))
+                self._expire(pipe, key)
+            await pipe.execute()
+    
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        return await self.set_state_and_data(key, data=data, keep_state=True)
+    
+    async def set_state_and_data(
+        self,
+        key: StorageKey,
+        state: StateType = None,
+        data: Optional[Mapping[str, Any]] = None,
+        keep_state: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Сменить состояние и дописать данные одним запросом
+        
+        Args:
+            key: Ключ FSM
+            state: Новое состояние (None - сбросить)
+            data: Поля данных для обновления
+            keep_state: Не менять состояние
+            
+        Returns:
+            Dict[str, Any]: Данные после обновления (пустой словарь, если data не передан)
+        """
+        state_key = self.key_builder.build(key, "state")
+        data_key = self.key_builder.build(key, "data")
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if not keep_state:
+                if state is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, cast(str, state.state if isinstance(state, State) else state))
+            if data:
+                pipe.hset(data_key, mapping=self._encode(data))
+            self._expire(pipe, key)
+            if data is not None:
+                pipe.hgetall(data_key)
+            results = await pipe.execute()
+        
+        return self._decode(results[-1]) if data is not None else {}
+    
+    def _expire(self, pipe: Any, key: StorageKey) -> None:
+        """Продлить TTL состояния и данных (в составе pipeline)"""
+        if self.ttl:
+            pipe.expire(self.key_builder.build(key, "state"), self.ttl)
+            pipe.expire(self.key_builder.build(key, "data"), self.ttl)
+    
+    def _encode(self, data: Mapping[str, Any]) -> Dict[str, str]:
+        return {name: self.json_dumps(value) for name, value in data.items()}
+    
+    def _decode(self, raw: Dict[Any, Any]) -> Dict[str, Any]:
+        return {
+            (name.decode("utf-8") if isinstance(name, bytes) else name): self.json_loads(value)
+            for name, value in raw.items()
+        }
+
+
+def create_fsm_storage() -> RedisFSMStorage:
+    """Хранилище FSM по настройкам (отдельный пул соединений к Redis)"""
+    return RedisFSMStorage.from_url(settings.redis_url, ttl=settings.fsm_state_ttl)
+
+
+async def advance(state: FSMContext, next_state: StateType, **data: Any) -> None:
+    """
+    Сохранить ответ на шаге мастера и перейти к следующему шагу
+    
+    С RedisFSMStorage это один запрос к Redis вместо update_data + set_state.
+    
+    Args:
+        state: Контекст FSM обработчика
+        next_state: Следующее состояние
+        data: Поля данных шага
+    """
+    if isinstance(state.storage, RedisFSMStorage):
+        await state.storage.set_state_and_data(state.key, next_state, data)
+        return
+    
+    await state.update_data(**data)
+    await state.set_state(next_state)
@@ -1,8 +1,10 @@
 """
 Обработчики для администраторов
 """
-from aiogram import Router, F
-from aiogram.filters import Command
+import html
+
+from aiogram import Bot, Router, F, flags
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -10,10 +12,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from loguru import logger
 
-from database.models import User
+from database.models import User, EventStatus
 from modules.events import EventService
+from modules.broadcasts import BroadcastService, start_broadcast
+from modules.stats import StatsService
+from modules.content import ContentService
+from modules.ai_content import AnnouncementProgressMessage, ai_generator, start_announcement
+from config import settings
+from utils.profiler import start_profile
 from bot.filters.admin import IsAdminFilter
-from bot.keyboards.inline import admin_menu_keyboard, back_to_main_keyboard
+from bot.fsm_storage import advance
+from bot.keyboards.inline import (
+    admin_menu_keyboard, back_to_main_keyboard, admin_events_keyboard, parse_pagination_data,
+    ai_events_keyboard, ai_announcement_keyboard
+)
 
 router = Router(name="admin")
 router.message.filter(IsAdminFilter())
@@ -35,24 +47,145 @@ async def cmd_admin(message: Message):
     """Админ-панель"""
     text = (
         "👨‍💼 <b>Панель администратора</b>\n\n"
+        "Анонс события всем пользователям: /broadcast &lt;ID события&gt;\n"
+        "Начать трансляцию: /live &lt;ID события&gt; [ссылка]\n"
+        "Завершить трансляцию: /finish &lt;ID события&gt;\n"
+        "Профиль работающего бота: /profile [секунды]\n\n"
         "Выберите действие:"
     )
     
     await message.answer(text, reply_markup=admin_menu_keyboard())
 
 
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject, bot: Bot):
+    """Снять профиль процесса бота и прислать его документом"""
+    args = (command.args or "").strip()
+    if args and not args.isdigit():
+        await message.answer("Использование: /profile [секунды]")
+        return
+    
+    seconds = min(max(int(args or 30), 1), settings.profiler_max_seconds)
+    if start_profile(bot, message.chat.id, seconds) is None:
+        await message.answer("⏳ Профилирование уже идет, дождитесь результата")
+        return
+    
+    await message.answer(f"🔬 Профилирование запущено на {seconds} с, профиль придет файлом")
+    logger.info(f"Админ {message.from_user.id} запустил профилирование на {seconds} с")
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(message: Message, command: CommandObject, bot: Bot, db_session: AsyncSession):
+    """Запустить рассылку анонса события всем пользователям"""
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Использование: /broadcast &lt;ID события&gt;")
+        return
+    
+    event_id = int(command.args.strip())
+    event = await EventService(db_session).get_event(event_id)
+    
+    if not event:
+        await message.answer("❌ Событие не найдено")
+        return
+    
+    text = (
+        f"🎭 <b>Премьера: {event.title}</b>\n\n"
+        f"📅 {event.start_time.strftime('%d.%m.%Y %H:%M')}\n"
+        f"⏱ {event.duration_minutes} мин\n"
+        f"💰 {event.price} ₽\n"
+    )
+    if event.description:
+        text += f"\n{event.description}\n"
+    
+    broadcast = await BroadcastService(db_session).create_broadcast(
+        text=text,
+        event_id=event.id,
+        created_by=message.from_user.id
+    )
+    
+    await message.answer(
+        f"📣 Рассылка #{broadcast.id} запущена\n"
+        f"Получателей: ~{broadcast.total_count}\n\n"
+        "Прогресс будет обновляться в следующем сообщении."
+    )
+    start_broadcast(bot, broadcast.id, message.chat.id)
+    
+    logger.info(f"Админ {message.from_user.id} запустил рассылку {broadcast.id} по событию {event_id}")
+
+
+@router.message(Command("live"))
+async def cmd_live(message: Message, command: CommandObject, db_session: AsyncSession):
+    """Начать трансляцию: событие переходит в LIVE и включается режим показа"""
+    args = (command.args or "").split()
+    if not args or not args[0].isdigit():
+        await message.answer("Использование: /live &lt;ID события&gt; [ссылка на трансляцию]")
+        return
+    
+    event_id = int(args[0])
+    event_service = EventService(db_session)
+    
+    event = await event_service.get_event(event_id)
+    if not event:
+        await message.answer("❌ Событие не найдено")
+        return
+    
+    if event.status not in (EventStatus.UPCOMING, EventStatus.LIVE):
+        await message.answer(f"❌ Событие {event_id} уже {event.status.value}, трансляцию не начать")
+        return
+    
+    # Ссылку сохраняем до перехода в LIVE, чтобы режим показа загрузил ее сразу
+    if len(args) > 1 and not await event_service.set_stream_link(event_id, args[1]):
+        await message.answer("❌ Событие не найдено")
+        return
+    
+    # Повторный /live только меняет ссылку: режим показа не перезагружается
+    if event.status == EventStatus.LIVE:
+        await message.answer(
+            f"🔴 Событие {event_id} уже в эфире" + (", ссылка обновлена" if len(args) > 1 else "")
+        )
+        return
+    
+    if not await event_service.update_event_status(event_id, EventStatus.LIVE, from_statuses=[EventStatus.UPCOMING]):
+        await message.answer(f"❌ Событие {event_id} уже не ожидает начала")
+        return
+    
+    await message.answer(f"🔴 Событие {event_id} в эфире")
+    logger.info(f"Админ {message.from_user.id} начал трансляцию события {event_id}")
+
+
+@router.message(Command("finish"))
+async def cmd_finish(message: Message, command: CommandObject, db_session: AsyncSession):
+    """Завершить трансляцию"""
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Использование: /finish &lt;ID события&gt;")
+        return
+    
+    event_id = int(command.args.strip())
+    
+    if not await EventService(db_session).update_event_status(event_id, EventStatus.FINISHED):
+        await message.answer("❌ Событие не найдено")
+        return
+    
+    await message.answer(f"✅ Трансляция события {event_id} завершена")
+    logger.info(f"Админ {message.from_user.id} завершил трансляцию события {event_id}")
+
+
 @router.callback_query(F.data == "admin_events_list")
+@router.callback_query(F.data.startswith("admin_events_prev_") | F.data.startswith("admin_events_next_"))
+@flags.read_only
 async def admin_events_list(callback: CallbackQuery, db_session: AsyncSession):
-    """Список всех событий для админа"""
+    """Список всех событий для админа (постранично)"""
+    cursor, backward = parse_pagination_data(callback.data, "admin_events")
+    
     event_service = EventService(db_session)
-    events = await event_service.get_all_events()
+    page = await event_service.get_all_events(cursor, backward)
     
-    if not events:
+    if not page.events:
         text = "📋 <b>Список событий</b>\n\nСобытий пока нет."
     else:
-        text = f"📋 <b>Список событий</b>\n\nВсего: {len(events)}\n\n"
+        text = f"📋 <b>Список событий</b>\n\nВсего: {page.total}\n\n"
         
-        for event in events[:10]:  # Показываем первые 10
+        for event in page.events:
             status_emoji = {
                 "upcoming": "🔜",
                 "live": "🔴",
@@ -63,12 +196,13 @@ async def admin_events_list(callback: CallbackQuery, db_session: AsyncSession):
             text += (
                 f"{status_emoji} <b>{event.title}</b>\n"
                 f"   ID: {event.id} | {event.start_time.strftime('%d.%m.%Y %H:%M')}\n"
-                f"   Цена: {event.price} ₽\n\n"
+                f"   Цена: {event.price} ₽\n"
+                f"   Продано: {event.sold_tickets} | Выручка: {event.revenue} ₽\n\n"
             )
     
     await callback.message.edit_text(
         text,
-        reply_markup=back_to_main_keyboard()
+        reply_markup=admin_events_keyboard(page.prev_cursor, page.next_cursor)
     )
     await callback.answer()
 
@@ -90,8 +224,7 @@ async def start_create_event(callback: CallbackQuery, state: FSMContext):
 @router.message(CreateEventStates.title)
 async def process_event_title(message: Message, state: FSMContext):
     """Обработка названия события"""
-    await state.update_data(title=message.text)
-    await state.set_state(CreateEventStates.description)
+    await advance(state, CreateEventStates.description, title=message.text)
     
     await message.answer(
         "Шаг 2/6: Введите описание спектакля\n"
@@ -103,8 +236,7 @@ async def process_event_title(message: Message, state: FSMContext):
 async def process_event_description(message: Message, state: FSMContext):
     """Обработка описания события"""
     description = None if message.text == "-" else message.text
-    await state.update_data(description=description)
-    await state.set_state(CreateEventStates.start_time)
+    await advance(state, CreateEventStates.start_time, description=description)
     
     await message.answer(
         "Шаг 3/6: Введите дату и время начала\n"
@@ -118,8 +250,7 @@ async def process_event_start_time(message: Message, state: FSMContext):
     """Обработка времени начала"""
     try:
         start_time = datetime.strptime(message.text, "%d.%m.%Y %H:%M")
-        await state.update_data(start_time=start_time)
-        await state.set_state(CreateEventStates.duration)
+        await advance(state, CreateEventStates.duration, start_time=start_time.isoformat())
         
         await message.answer(
             "Шаг 4/6: Введите длительность в минутах\n"
@@ -138,8 +269,7 @@ async def process_event_duration(message: Message, state: FSMContext):
     """Обработка длительности"""
     try:
         duration = int(message.text) if message.text != "-" else 120
-        await state.update_data(duration_minutes=duration)
-        await state.set_state(CreateEventStates.price)
+        await advance(state, CreateEventStates.price, duration_minutes=duration)
         
         await message.answer(
             "Шаг 5/6: Введите цену билета в рублях\n"
@@ -154,8 +284,7 @@ async def process_event_price(message: Message, state: FSMContext):
     """Обработка цены"""
     try:
         price = float(message.text)
-        await state.update_data(price=price)
-        await state.set_state(CreateEventStates.max_viewers)
+        await advance(state, CreateEventStates.max_viewers, price=price)
         
         await message.answer(
             "Шаг 6/6: Введите максимальное количество зрителей\n"
@@ -177,7 +306,7 @@ async def process_event_max_viewers(message: Message, state: FSMContext, db_sess
         event = await event_service.create_event(
             title=data["title"],
             description=data.get("description"),
-            start_time=data["start_time"],
+            start_time=datetime.fromisoformat(data["start_time"]),
             duration_minutes=data["duration_minutes"],
             price=data["price"],
             max_viewers=max_viewers
@@ -204,15 +333,18 @@ async def process_event_max_viewers(message: Message, state: FSMContext, db_sess
 @router.callback_query(F.data == "admin_stats")
 async def admin_stats(callback: CallbackQuery, db_session: AsyncSession):
     """Статистика"""
-    # TODO: Реализовать подсчет статистики
+    stats = await StatsService(db_session).get_stats()
     
     text = (
         "📊 <b>Статистика</b>\n\n"
-        "Пользователей: -\n"
-        "Событий: -\n"
-        "Продано билетов: -\n"
-        "Выручка: - ₽\n\n"
-        "⚠️ Функция в разработке"
+        f"👥 Пользователей: {stats.users_total}\n"
+        f"Активны за 24 ч: {stats.active_day} | за 7 дн: {stats.active_week}\n\n"
+        f"🎭 Событий: {stats.events_upcoming + stats.events_live + stats.events_finished + stats.events_cancelled}\n"
+        f"Предстоящих: {stats.events_upcoming} | В эфире: {stats.events_live}\n"
+        f"Завершено: {stats.events_finished} | Отменено: {stats.events_cancelled}\n\n"
+        f"🎫 Продано билетов: {stats.tickets_sold}\n"
+        f"💰 Выручка: {stats.revenue} ₽\n\n"
+        f"🕐 Обновлено: {stats.refreshed_at.strftime('%d.%m.%Y %H:%M')} UTC"
     )
     
     await callback.message.edit_text(
@@ -223,19 +355,63 @@ async def admin_stats(callback: CallbackQuery, db_session: AsyncSession):
 
 
 @router.callback_query(F.data == "admin_ai_content")
-async def admin_ai_content(callback: CallbackQuery):
-    """ИИ-контент"""
-    text = (
-        "🤖 <b>ИИ-генерация контента</b>\n\n"
-        "⚠️ Функция в разработке\n\n"
-        "Планируется:\n"
-        "• Генерация анонсов спектаклей\n"
-        "• Создание афиш\n"
-        "• Автопостинг в канал"
-    )
+@flags.read_only
+async def admin_ai_content(callback: CallbackQuery, db_session: AsyncSession):
+    """ИИ-контент: выбор события для анонса"""
+    page = await EventService(db_session).get_upcoming_events()
+    
+    if not page.events:
+        text = "🤖 <b>ИИ-генерация анонсов</b>\n\nПредстоящих событий нет."
+    else:
+        text = "🤖 <b>ИИ-генерация анонсов</b>\n\nВыберите событие:"
     
     await callback.message.edit_text(
         text,
-        reply_markup=back_to_main_keyboard()
+        reply_markup=ai_events_keyboard(page.events)
     )
     await callback.answer()
+
+
+@router.callback_query(F.data.startswith("ai_announce_") | F.data.startswith("ai_regen_"))
+@flags.read_only
+async def ai_announce(callback: CallbackQuery, bot: Bot, db_session: AsyncSession):
+    """Сгенерировать анонс события (текст дописывается в сообщение по мере генерации)"""
+    force = callback.data.startswith("ai_regen_")
+    event_id = int(callback.data.rsplit("_", 1)[1])
+    
+    event = await EventService(db_session).get_event(event_id)
+    if not event:
+        await callback.answer("Событие не найдено", show_alert=True)
+        return
+    
+    await callback.answer()
+    message = await callback.message.answer(
+        f"🤖 <b>Анонс: {html.escape(event.title)}</b>\n\n⏳ Генерация..."
+    )
+    
+    progress = AnnouncementProgressMessage(bot, message.chat.id, message.message_id, event.title)
+    start_announcement(progress, event, ai_announcement_keyboard(event_id), force=force)
+    logger.info(f"Админ {callback.from_user.id} запустил генерацию анонса события {event_id}")
+
+
+@router.callback_query(F.data.startswith("ai_publish_"))
+async def ai_publish(callback: CallbackQuery, db_session: AsyncSession):
+    """Опубликовать готовый анонс в канал"""
+    event_id = int(callback.data.split("_")[2])
+    
+    event = await EventService(db_session).get_event(event_id)
+    if not event:
+        await callback.answer("Событие не найдено", show_alert=True)
+        return
+    
+    text = await ai_generator.get_cached(event)
+    if text is None:
+        # Событие изменилось после генерации или анонс истек
+        await callback.answer("Анонс устарел, сгенерируйте заново", show_alert=True)
+        return
+    
+    post = await ContentService(db_session).create_post("text", html.escape(text))
+    
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.answer("📣 Анонс поставлен в очередь публикации")
+    logger.info(f"Админ {callback.from_user.id} опубликовал анонс события {event_id} (пост {post.id})")
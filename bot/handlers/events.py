@@ -1,33 +1,44 @@
 """
 Обработчики для работы с событиями (спектаклями)
 """
-from aiogram import Router, F
+from aiogram import Router, F, flags
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from database.models import User
+from database.models import User, OrderStatus
 from modules.events import EventService
-from bot.keyboards.inline import events_list_keyboard, event_detail_keyboard, back_to_main_keyboard
+from modules.events.cache import event_key
+from modules.payments import PaymentService, PaymentError, create_payment, payments_enabled
+from modules.tickets import TicketService, ReservationStatus
+from modules.tickets.showtime import showtime, WatchAccess
+from bot.keyboards.inline import back_to_main_keyboard, parse_pagination_data, payment_keyboard
+from bot.screens import event_detail_screen, events_page_screen
 
 router = Router(name="events")
 
 
 @router.message(Command("events"))
 @router.callback_query(F.data == "events_list")
+@router.callback_query(F.data.startswith("events_prev_") | F.data.startswith("events_next_"))
+@flags.read_only
 async def show_events_list(event: Message | CallbackQuery, db_session: AsyncSession):
     """
-    Показать список предстоящих событий
+    Показать страницу предстоящих событий
     
     Args:
-        event: Сообщение или callback
+        event: Сообщение или callback (кнопки листания передают курсор)
         db_session: Сессия БД (из middleware)
     """
+    cursor, backward = None, False
+    if isinstance(event, CallbackQuery):
+        cursor, backward = parse_pagination_data(event.data, "events")
+    
     event_service = EventService(db_session)
-    events = await event_service.get_upcoming_events()
+    page = await event_service.get_upcoming_events(cursor, backward)
     
-    if not events:
+    if not page.events:
         text = (
             "🎭 <b>Афиша</b>\n\n"
             "К сожалению, пока нет запланированных спектаклей.\n"
@@ -35,12 +46,8 @@ async def show_events_list(event: Message | CallbackQuery, db_session: AsyncSess
         )
         keyboard = back_to_main_keyboard()
     else:
-        text = (
-            "🎭 <b>Афиша предстоящих спектаклей</b>\n\n"
-            f"Найдено событий: {len(events)}\n"
-            "Выберите спектакль для подробной информации:"
-        )
-        keyboard = events_list_keyboard(events)
+        screen = events_page_screen(page)
+        text, keyboard = screen.text, screen.reply_markup
     
     if isinstance(event, Message):
         await event.answer(text, reply_markup=keyboard)
@@ -50,6 +57,7 @@ async def show_events_list(event: Message | CallbackQuery, db_session: AsyncSess
 
 
 @router.callback_query(F.data.startswith("event_"))
+@flags.read_only
 async def show_event_detail(callback: CallbackQuery, db_session: AsyncSession, db_user: User):
     """
     Показать детальную информацию о событии
@@ -68,31 +76,15 @@ async def show_event_detail(callback: CallbackQuery, db_session: AsyncSession, d
         await callback.answer("❌ Событие не найдено", show_alert=True)
         return
     
-    # TODO: Проверить, есть ли у пользователя билет
-    has_ticket = False
-    
-    # Форматирование даты
-    start_time = event.start_time.strftime("%d.%m.%Y %H:%M")
-    
-    text = (
-        f"🎭 <b>{event.title}</b>\n\n"
-        f"📅 Дата: {start_time}\n"
-        f"⏱ Длительность: {event.duration_minutes} мин\n"
-        f"💰 Цена: {event.price} ₽\n\n"
-    )
-    
-    if event.description:
-        text += f"{event.description}\n\n"
-    
-    if event.max_viewers:
-        # TODO: Подсчитать количество проданных билетов
-        sold_tickets = 0
-        text += f"🎫 Доступно мест: {event.max_viewers - sold_tickets} из {event.max_viewers}\n"
+    # Во время показа билет проверяется по Redis, иначе - индексом по tickets
+    access = await showtime.check(event_id, db_user.telegram_id)
+    if access is not None:
+        has_ticket = access.entitled
+    else:
+        has_ticket = await TicketService(db_session).has_ticket(db_user.telegram_id, event_id)
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=event_detail_keyboard(event_id, has_ticket)
-    )
+    screen = event_detail_screen(event, has_ticket)
+    await callback.message.edit_text(screen.text, reply_markup=screen.reply_markup)
     await callback.answer()
 
 
@@ -115,25 +107,78 @@ async def buy_ticket(callback: CallbackQuery, db_session: AsyncSession, db_user:
         await callback.answer("❌ Событие не найдено", show_alert=True)
         return
     
-    # TODO: Реализовать создание заказа и платежа
+    reservation = await TicketService(db_session).reserve_seat(db_user.telegram_id, event_id)
     
-    text = (
-        f"🎫 <b>Покупка билета</b>\n\n"
+    if reservation.status == ReservationStatus.SOLD_OUT:
+        # Обновляем кэш, чтобы карточка события показывала актуальные места
+        await event_service.cache.invalidate(event_key(event_id))
+        await callback.answer("😔 Все места на этот спектакль проданы", show_alert=True)
+        return
+    
+    if reservation.status == ReservationStatus.NOT_FOUND:
+        await callback.answer("❌ Событие не найдено", show_alert=True)
+        return
+    
+    order = reservation.order
+    
+    if order.status == OrderStatus.PAID:
+        await callback.answer("✅ Билет на этот спектакль у вас уже есть", show_alert=True)
+        return
+    
+    reserved_until = order.reserved_until.strftime("%H:%M") if order.reserved_until else "-"
+    
+    if not payments_enabled():
+        # Магазин ЮKassa не настроен: бронь оплачивается через администратора
+        text = (
+            f"🎫 Место забронировано до {reserved_until} UTC\n\n"
+            f"Спектакль: {event.title}\n"
+            f"Заказ №{order.id}: {order.amount} ₽\n\n"
+            f"⚠️ Оплата пока через администратора."
+        )
+        await callback.answer(text, show_alert=True)
+        logger.info(f"Пользователь {db_user.telegram_id} бронирует билет на событие {event_id} ({reservation.status.value})")
+        return
+    
+    # Повторное нажатие возвращает тот же платеж (ключ идемпотентности по заказу)
+    try:
+        link = await create_payment(order, event.title)
+    except PaymentError as e:
+        logger.error(f"Не удалось создать платеж за заказ {order.id}: {e}")
+        await callback.answer(
+            f"⚠️ Не удалось создать платеж. Место забронировано до {reserved_until} UTC, попробуйте еще раз",
+            show_alert=True
+        )
+        return
+    
+    if order.payment_id != link.payment_id:
+        if not await PaymentService(db_session).attach_payment(order.id, link.payment_id):
+            # Бронь истекла, пока создавался платеж
+            await callback.answer("⌛ Бронь истекла, попробуйте купить билет еще раз", show_alert=True)
+            return
+    
+    await callback.answer()
+    await callback.message.answer(
+        f"🎫 Место забронировано до {reserved_until} UTC\n\n"
         f"Спектакль: {event.title}\n"
-        f"Цена: {event.price} ₽\n\n"
-        f"⚠️ Функция оплаты находится в разработке.\n"
-        f"Для покупки билета обратитесь к администратору."
+        f"Заказ №{order.id}: {order.amount} ₽\n\n"
+        f"Оплатите заказ до окончания брони - билет придет сюда сразу после оплаты.",
+        reply_markup=payment_keyboard(link.confirmation_url)
+    )
+    logger.info(
+        f"Пользователь {db_user.telegram_id} бронирует билет на событие {event_id} "
+        f"({reservation.status.value}), платеж {link.payment_id}"
     )
-    
-    await callback.answer(text, show_alert=True)
-    logger.info(f"Пользователь {db_user.telegram_id} пытается купить билет на событие {event_id}")
 
 
 @router.callback_query(F.data.startswith("watch_"))
+@flags.read_only
 async def watch_stream(callback: CallbackQuery, db_session: AsyncSession, db_user: User):
     """
     Смотреть трансляцию
     
+    Во время показа доступ проверяется по Redis (режим показа), и обработчик
+    не обращается к БД. Вне показа событие и билет читаются из БД.
+    
     Args:
         callback: Callback query
         db_session: Сессия БД
@@ -141,17 +186,26 @@ async def watch_stream(callback: CallbackQuery, db_session: AsyncSession, db_use
     """
     event_id = int(callback.data.split("_")[1])
     
-    event_service = EventService(db_session)
-    event = await event_service.get_event(event_id)
+    access = await showtime.check(event_id, db_user.telegram_id)
+    
+    if access is None:
+        event = await EventService(db_session).get_event(event_id)
+        
+        if not event:
+            await callback.answer("❌ Событие не найдено", show_alert=True)
+            return
+        
+        access = WatchAccess(
+            title=event.title,
+            invite_link=event.invite_link,
+            entitled=await TicketService(db_session).has_ticket(db_user.telegram_id, event_id)
+        )
     
-    if not event:
-        await callback.answer("❌ Событие не найдено", show_alert=True)
+    if not access.entitled:
+        await callback.answer("🎫 Для просмотра нужен билет на этот спектакль", show_alert=True)
         return
     
-    # TODO: Проверить наличие билета
-    # TODO: Проверить, что трансляция идет
-    
-    if not event.invite_link:
+    if not access.invite_link:
         await callback.answer(
             "⚠️ Ссылка на трансляцию еще не готова. Попробуйте позже.",
             show_alert=True
@@ -159,9 +213,9 @@ async def watch_stream(callback: CallbackQuery, db_session: AsyncSession, db_use
         return
     
     text = (
-        f"▶️ <b>Трансляция: {event.title}</b>\n\n"
+        f"▶️ <b>Трансляция: {access.title}</b>\n\n"
         f"Перейдите по ссылке для просмотра:\n"
-        f"{event.invite_link}\n\n"
+        f"{access.invite_link}\n\n"
         f"Приятного просмотра! 🎭"
     )
     
@@ -1,13 +1,15 @@
 """
 Обработчики для обычных пользователей
 """
-from aiogram import Router, F
+from aiogram import Bot, Router, F, flags
 from aiogram.filters import CommandStart, Command
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from database.models import User
-from bot.keyboards.inline import main_menu_keyboard, back_to_main_keyboard
+from modules.tickets import TicketService, TicketQRService
+from bot.keyboards.inline import main_menu_keyboard, back_to_main_keyboard, my_tickets_keyboard
 
 router = Router(name="user")
 
@@ -55,22 +57,53 @@ async def show_main_menu(event: Message | CallbackQuery, db_user: User):
         await event.answer()
 
 
+@router.message(Command("tickets"))
 @router.callback_query(F.data == "my_tickets")
-async def show_my_tickets(callback: CallbackQuery, db_user: User):
+@flags.read_only
+async def show_my_tickets(event: Message | CallbackQuery, db_user: User, db_session: AsyncSession):
     """Показать билеты пользователя"""
-    # TODO: Реализовать получение билетов из БД
+    tickets = await TicketService(db_session).get_user_tickets(db_user.telegram_id)
     
-    text = (
-        "🎫 <b>Мои билеты</b>\n\n"
-        "У вас пока нет купленных билетов.\n"
-        "Посмотрите афишу и выберите интересующий спектакль!"
-    )
+    if tickets:
+        text = (
+            "🎫 <b>Мои билеты</b>\n\n"
+            "Выберите билет, чтобы получить QR-код:"
+        )
+        keyboard = my_tickets_keyboard(tickets)
+    else:
+        text = (
+            "🎫 <b>Мои билеты</b>\n\n"
+            "У вас пока нет купленных билетов.\n"
+            "Посмотрите афишу и выберите интересующий спектакль!"
+        )
+        keyboard = back_to_main_keyboard()
+    
+    if isinstance(event, Message):
+        await event.answer(text, reply_markup=keyboard)
+    else:
+        await event.message.edit_text(text, reply_markup=keyboard)
+        await event.answer()
+
+
+@router.callback_query(F.data.startswith("ticket_"))
+async def send_ticket_qr(callback: CallbackQuery, bot: Bot, db_user: User, db_session: AsyncSession):
+    """Отправить QR-код билета"""
+    ticket_id = int(callback.data.split("_")[1])
+    ticket = await TicketService(db_session).get_user_ticket(db_user.telegram_id, ticket_id)
+    
+    if not ticket:
+        await callback.answer("❌ Билет не найден", show_alert=True)
+        return
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=back_to_main_keyboard()
-    )
     await callback.answer()
+    await TicketQRService(db_session).send_ticket_qr(
+        bot,
+        callback.message.chat.id,
+        ticket,
+        caption=f"🎫 <b>{ticket.event.title}</b>\n{ticket.event.start_time.strftime('%d.%m.%Y %H:%M')}"
+    )
+    
+    logger.info(f"Пользователь {db_user.telegram_id} получил QR-код билета {ticket_id}")
 
 
 @router.callback_query(F.data == "about")
@@ -5,7 +5,11 @@ from bot.keyboards.inline import (
     main_menu_keyboard,
     events_list_keyboard,
     event_detail_keyboard,
+    my_tickets_keyboard,
     admin_menu_keyboard,
+    admin_events_keyboard,
+    ai_events_keyboard,
+    ai_announcement_keyboard,
     back_to_main_keyboard
 )
 
@@ -13,6 +17,10 @@ __all__ = [
     'main_menu_keyboard',
     'events_list_keyboard',
     'event_detail_keyboard',
+    'my_tickets_keyboard',
     'admin_menu_keyboard',
+    'admin_events_keyboard',
+    'ai_events_keyboard',
+    'ai_announcement_keyboard',
     'back_to_main_keyboard'
 ]
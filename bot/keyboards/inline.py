@@ -1,13 +1,19 @@
 """
 Inline клавиатуры
+
+Клавиатуры под lru_cache строятся один раз и переиспользуются:
+возвращаемый объект общий, изменять его нельзя.
 """
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import List
+from typing import List, Optional, Tuple
 
-from database.models import Event
+from database.models import Event, Ticket
 
 
+@lru_cache(maxsize=None)
 def main_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню"""
     builder = InlineKeyboardBuilder()
@@ -25,8 +31,12 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def events_list_keyboard(events: List[Event]) -> InlineKeyboardMarkup:
-    """Клавиатура со списком событий"""
+def events_list_keyboard(
+    events: List[Event],
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None
+) -> InlineKeyboardMarkup:
+    """Клавиатура со списком событий (одна страница афиши)"""
     builder = InlineKeyboardBuilder()
     
     for event in events:
@@ -37,6 +47,27 @@ def events_list_keyboard(events: List[Event]) -> InlineKeyboardMarkup:
             )
         )
     
+    add_pagination_row(builder, "events", prev_cursor, next_cursor)
+    
+    builder.row(
+        InlineKeyboardButton(text="◀️ Назад", callback_data="main_menu")
+    )
+    
+    return builder.as_markup()
+
+
+def my_tickets_keyboard(tickets: List[Ticket]) -> InlineKeyboardMarkup:
+    """Клавиатура со списком билетов пользователя (события должны быть загружены)"""
+    builder = InlineKeyboardBuilder()
+    
+    for ticket in tickets:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"🎫 {ticket.event.title} ({ticket.event.start_time.strftime('%d.%m %H:%M')})",
+                callback_data=f"ticket_{ticket.id}"
+            )
+        )
+    
     builder.row(
         InlineKeyboardButton(text="◀️ Назад", callback_data="main_menu")
     )
@@ -44,6 +75,63 @@ def events_list_keyboard(events: List[Event]) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def admin_events_keyboard(
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None
+) -> InlineKeyboardMarkup:
+    """Листание списка событий администратора"""
+    builder = InlineKeyboardBuilder()
+    
+    add_pagination_row(builder, "admin_events", prev_cursor, next_cursor)
+    
+    builder.row(
+        InlineKeyboardButton(text="◀️ Главное меню", callback_data="main_menu")
+    )
+    
+    return builder.as_markup()
+
+
+def add_pagination_row(
+    builder: InlineKeyboardBuilder,
+    prefix: str,
+    prev_cursor: Optional[str],
+    next_cursor: Optional[str]
+) -> None:
+    """
+    Добавить кнопки «назад»/«вперед»
+    
+    callback_data имеет вид {prefix}_prev_{курсор} и {prefix}_next_{курсор}
+    (курсоры короткие, укладываются в лимит Telegram 64 байта).
+    """
+    buttons = []
+    if prev_cursor:
+        buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"{prefix}_prev_{prev_cursor}"))
+    if next_cursor:
+        buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"{prefix}_next_{next_cursor}"))
+    
+    if buttons:
+        builder.row(*buttons)
+
+
+def parse_pagination_data(data: str, prefix: str) -> Tuple[Optional[str], bool]:
+    """
+    Разобрать callback_data кнопки листания
+    
+    Args:
+        data: callback_data
+        prefix: Префикс, переданный в add_pagination_row
+        
+    Returns:
+        Tuple[Optional[str], bool]: Курсор (None для первой страницы) и признак листания назад
+    """
+    for direction in ("prev", "next"):
+        marker = f"{prefix}_{direction}_"
+        if data.startswith(marker):
+            return data[len(marker):], direction == "prev"
+    return None, False
+
+
+@lru_cache(maxsize=4096)
 def event_detail_keyboard(event_id: int, has_ticket: bool = False) -> InlineKeyboardMarkup:
     """Клавиатура для детальной информации о событии"""
     builder = InlineKeyboardBuilder()
@@ -70,6 +158,19 @@ def event_detail_keyboard(event_id: int, has_ticket: bool = False) -> InlineKeyb
     return builder.as_markup()
 
 
+def payment_keyboard(confirmation_url: str) -> InlineKeyboardMarkup:
+    """Ссылка на оплату заказа"""
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(text="💳 Оплатить", url=confirmation_url)
+    )
+    builder.row(
+        InlineKeyboardButton(text="◀️ Назад к афише", callback_data="events_list")
+    )
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=None)
 def admin_menu_keyboard() -> InlineKeyboardMarkup:
     """Меню администратора"""
     builder = InlineKeyboardBuilder()
@@ -90,6 +191,44 @@ def admin_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def ai_events_keyboard(events: List[Event]) -> InlineKeyboardMarkup:
+    """Выбор события для генерации анонса"""
+    builder = InlineKeyboardBuilder()
+    
+    for event in events:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"🎭 {event.title} ({event.start_time.strftime('%d.%m %H:%M')})",
+                callback_data=f"ai_announce_{event.id}"
+            )
+        )
+    
+    builder.row(
+        InlineKeyboardButton(text="◀️ Главное меню", callback_data="main_menu")
+    )
+    
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def ai_announcement_keyboard(event_id: int) -> InlineKeyboardMarkup:
+    """Действия с готовым анонсом"""
+    builder = InlineKeyboardBuilder()
+    
+    builder.row(
+        InlineKeyboardButton(text="📣 Опубликовать в канал", callback_data=f"ai_publish_{event_id}")
+    )
+    builder.row(
+        InlineKeyboardButton(text="🔄 Заново", callback_data=f"ai_regen_{event_id}")
+    )
+    builder.row(
+        InlineKeyboardButton(text="◀️ К событиям", callback_data="admin_ai_content")
+    )
+    
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=None)
 def back_to_main_keyboard() -> InlineKeyboardMarkup:
     """Кнопка возврата в главное меню"""
     builder = InlineKeyboardBuilder()
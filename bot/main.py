@@ -2,16 +2,32 @@
 Главный файл Telegram бота
 """
 import asyncio
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from loguru import logger
 
 from config import settings, setup_logging
-from database import init_db, close_db
+from database import init_db, close_db, engine
 
 from bot.handlers import user, admin, events
-from bot.middlewares.auth import AuthMiddleware
+from bot.middlewares import AuthMiddleware, MetricsMiddleware, BotApiMetricsMiddleware
+from bot.fsm_storage import create_fsm_storage
+from bot.webhook import run_webhook
+from bot.workers import WorkerPool, ForwardToWorkersMiddleware
+from modules.users import UserActivityBuffer
+from modules.broadcasts import resume_broadcasts
+from modules.events import EventScheduler
+from modules.content import ContentPublisher
+from modules.payments import PaymentIngestor, PaymentWebhookHandler, PaymentWebhookServer, close_payments_client
+from modules.tickets import ReservationSweeper
+from modules.tickets.qr import close_qr_renderer
+from utils.metrics import MetricsServer
+from utils.redis_client import close_redis
+from utils.watchdog import HealthServer, create_watchdog
 
 
 async def on_startup(bot: Bot):
@@ -22,6 +38,9 @@ async def on_startup(bot: Bot):
     await init_db()
     logger.success("✅ База данных инициализирована")
     
+    # Продолжение рассылок, прерванных остановкой
+    await resume_broadcasts(bot)
+    
     # Уведомление админов о запуске
     for admin_id in settings.admin_list:
         try:
@@ -50,45 +69,200 @@ async def on_shutdown(bot: Bot):
         except Exception:
             pass
     
-    # Закрытие соединения с БД
+    await close_qr_renderer()
+    await close_payments_client()
+    
+    # Закрытие соединений с БД и Redis
     await close_db()
-    logger.success("✅ Соединение с БД закрыто")
+    await close_redis()
+    logger.success("✅ Соединения с БД и Redis закрыты")
 
 
-async def main():
-    """Главная функция"""
-    # Настройка логирования
-    setup_logging()
+def create_bot() -> Bot:
+    """Создать бота"""
+    session = None
+    if settings.telegram_api_url:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.telegram_api_url))
     
-    # Создание бота и диспетчера
     bot = Bot(
         token=settings.bot_token,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    bot.session.middleware(BotApiMetricsMiddleware())
+    return bot
+
+
+def create_dispatcher(activity_buffer: UserActivityBuffer) -> Dispatcher:
+    """
+    Создать диспетчер с middleware и роутерами
     
-    dp = Dispatcher()
+    Args:
+        activity_buffer: Буфер отложенной записи активности пользователей
+        
+    Returns:
+        Dispatcher: Диспетчер без startup/shutdown хуков
+    """
+    # Состояния FSM в Redis: мастера переживают перезапуск и работают на нескольких репликах
+    dp = Dispatcher(storage=create_fsm_storage())
     
-    # Регистрация middleware
-    dp.message.middleware(AuthMiddleware())
-    dp.callback_query.middleware(AuthMiddleware())
+    # Регистрация middleware (метрики первыми: замер включает авторизацию)
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.message.middleware(AuthMiddleware(activity_buffer))
+    dp.callback_query.middleware(AuthMiddleware(activity_buffer))
     
     # Регистрация роутеров
     dp.include_router(user.router)
     dp.include_router(events.router)
     dp.include_router(admin.router)
     
+    return dp
+
+
+def register_background_jobs(dp: Dispatcher, bot: Bot, workers: Optional[WorkerPool] = None) -> None:
+    """
+    Подключить планировщик событий, публикатор постов, прием платежей,
+    выгрузку метрик и сторожа event loop с проверками здоровья
+    
+    Все запускаются на каждой реплике: таймеры событий ведет только одна
+    (advisory-блокировка), посты реплики разбирают через SKIP LOCKED,
+    а уведомления об оплате - через группу читателей потока Redis.
+    С пулом воркеров (фронт-процесс) готовность учитывает и их состояние.
+    """
+    if settings.scheduler_enabled:
+        event_scheduler = EventScheduler(bot)
+        dp.startup.register(event_scheduler.start)
+        dp.shutdown.register(event_scheduler.stop)
+    
+    if settings.content_publisher_enabled:
+        content_publisher = ContentPublisher(bot)
+        dp.startup.register(content_publisher.start)
+        dp.shutdown.register(content_publisher.stop)
+    
+    if settings.payments_webhook_enabled:
+        payment_ingestor = PaymentIngestor(bot)
+        payment_handler = PaymentWebhookHandler(payment_ingestor)
+        dp.startup.register(payment_ingestor.start)
+        dp.shutdown.register(payment_ingestor.stop)
+        
+        if settings.bot_mode == "webhook":
+            # Маршрут добавляется на сервер бота в create_webhook_app
+            dp["payment_webhook"] = payment_handler
+        else:
+            payment_server = PaymentWebhookServer(payment_handler)
+            dp.startup.register(payment_server.start)
+            dp.shutdown.register(payment_server.stop)
+    
+    if settings.metrics_enabled:
+        metrics_server = MetricsServer(settings.metrics_host, settings.metrics_port, settings.metrics_path)
+        dp.startup.register(metrics_server.start)
+        dp.shutdown.register(metrics_server.stop)
+    
+    if settings.watchdog_enabled:
+        watchdog = create_watchdog(engine)
+        dp.startup.register(watchdog.start)
+        dp.shutdown.register(watchdog.stop)
+        
+        if settings.health_port:
+            health_server = HealthServer(watchdog, settings.health_host, settings.health_port, workers)
+            dp.startup.register(health_server.start)
+            dp.shutdown.register(health_server.stop)
+
+
+async def main():
+    """Главная функция"""
+    # Настройка логирования
+    setup_logging()
+    
+    # Создание бота и диспетчера
+    bot = create_bot()
+    
+    if settings.bot_workers > 0:
+        # Обновления обрабатывают процессы-воркеры, здесь только прием
+        await run_front(bot)
+        return
+    
+    # Буфер отложенной записи активности пользователей
+    activity_buffer = UserActivityBuffer()
+    
+    dp = create_dispatcher(activity_buffer)
+    
+    # Освобождение мест по неоплаченным броням
+    reservation_sweeper = ReservationSweeper()
+    
     # Регистрация startup/shutdown хуков
     dp.startup.register(on_startup)
+    dp.startup.register(activity_buffer.start)
+    dp.startup.register(reservation_sweeper.start)
+    # Буфер сбрасывается до закрытия соединения с БД в on_shutdown
+    dp.shutdown.register(reservation_sweeper.stop)
+    register_background_jobs(dp, bot)
+    dp.shutdown.register(activity_buffer.stop)
     dp.shutdown.register(on_shutdown)
     
-    # Запуск polling
     logger.success("✅ Бот успешно запущен!")
+    
+    if settings.bot_mode == "webhook":
+        # Запуск webhook-сервера (сессию бота закрывает обработчик запросов)
+        await run_webhook(dp, bot)
+        return
+    
+    # Запуск polling
     try:
+        # Polling не работает, пока установлен webhook
+        await bot.delete_webhook()
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         await bot.session.close()
 
 
+async def run_front(bot: Bot):
+    """
+    Фронт-процесс: принимает обновления и раздает их воркерам по chat_id
+    
+    Фоновые задачи (брони, возобновление рассылок) работают только здесь,
+    чтобы не дублироваться в воркерах.
+    """
+    pool = WorkerPool(settings.bot_workers)
+    pool.start()
+    
+    # FSM и обработчики работают в воркерах; роутеры нужны для allowed_updates
+    dp = Dispatcher(disable_fsm=True)
+    dp.update.outer_middleware(ForwardToWorkersMiddleware(pool))
+    dp.include_router(user.router)
+    dp.include_router(events.router)
+    dp.include_router(admin.router)
+    
+    reservation_sweeper = ReservationSweeper()
+    
+    dp.startup.register(on_startup)
+    dp.startup.register(reservation_sweeper.start)
+    dp.shutdown.register(reservation_sweeper.stop)
+    register_background_jobs(dp, bot, pool)
+    # Воркеры дорабатывают очередь до закрытия соединений в on_shutdown
+    dp.shutdown.register(pool.stop)
+    dp.shutdown.register(on_shutdown)
+    
+    logger.success(f"✅ Бот запущен: фронт и {settings.bot_workers} воркеров")
+    
+    if settings.bot_mode == "webhook":
+        # Один обработчик очереди: пересылка дешевая, а порядок обновлений сохраняется
+        await run_webhook(dp, bot, workers=1)
+        return
+    
+    try:
+        await bot.delete_webhook()
+        # Последовательная пересылка сохраняет порядок обновлений одного чата
+        await dp.start_polling(
+            bot,
+            handle_as_tasks=False,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+    finally:
+        await bot.session.close()
+
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
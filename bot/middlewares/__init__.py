@@ -2,5 +2,6 @@
 Middlewares
 """
 from bot.middlewares.auth import AuthMiddleware
+from bot.middlewares.metrics import MetricsMiddleware, BotApiMetricsMiddleware
 
-__all__ = ['AuthMiddleware']
+__all__ = ['AuthMiddleware', 'MetricsMiddleware', 'BotApiMetricsMiddleware']
@@ -1,18 +1,33 @@
 """
 Middleware для авторизации и работы с пользователями
 """
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message, CallbackQuery, User as TelegramUser
 from loguru import logger
 
-from database import get_session
-from modules.users import UserService
+from database import LazySession, User, async_session_maker
+from modules.users import UserService, UserActivityBuffer
 
 
 class AuthMiddleware(BaseMiddleware):
-    """Middleware для автоматического создания/обновления пользователей"""
+    """
+    Middleware для автоматического создания/обновления пользователей
+    
+    Передает обработчику ленивую сессию db_session. Обработчики, которые
+    только читают БД, помечаются флагом read_only (декоратор @flags.read_only)
+    и работают в транзакции только на чтение без commit.
+    """
+    
+    def __init__(self, activity_buffer: Optional[UserActivityBuffer] = None):
+        """
+        Args:
+            activity_buffer: Буфер отложенной записи активности. Если задан,
+                в БД синхронно идет только первое обращение пользователя
+        """
+        self.activity_buffer = activity_buffer
     
     async def __call__(
         self,
@@ -34,25 +49,56 @@ class AuthMiddleware(BaseMiddleware):
         if not user:
             return await handler(event, data)
         
-        # Создаем сессию БД
-        async for session in get_session():
-            user_service = UserService(session)
-            
-            # Получаем или создаем пользователя
-            db_user = await user_service.get_or_create_user(
+        # Известного пользователя берем из памяти, изменения уйдут в БД пакетом
+        db_user = None
+        if self.activity_buffer is not None:
+            db_user = self.activity_buffer.touch(
                 telegram_id=user.id,
                 username=user.username,
                 first_name=user.first_name,
-                last_name=user.last_name,
-                language_code=user.language_code or "ru"
+                last_name=user.last_name
             )
+        
+        session = LazySession(read_only=get_flag(data, "read_only", default=False))
+        
+        try:
+            if db_user is None:
+                db_user = await self._load_user(user, session)
             
             # Добавляем пользователя и сервисы в data
             data["db_user"] = db_user
-            data["user_service"] = user_service
+            data["user_service"] = UserService(session)
             data["db_session"] = session
             
             logger.debug(f"Пользователь {user.id} обработан middleware")
             
             # Вызываем следующий обработчик
-            return await handler(event, data)
+            result = await handler(event, data)
+            await session.finish()
+            return result
+        finally:
+            await session.close()
+    
+    async def _load_user(self, user: TelegramUser, session: LazySession) -> User:
+        """Получить или создать пользователя в БД"""
+        if session.read_only:
+            # Транзакция обработчика только на чтение: запись идет в отдельной сессии
+            async with async_session_maker() as write_session:
+                db_user = await self._upsert_user(user, UserService(write_session))
+        else:
+            db_user = await self._upsert_user(user, UserService(session))
+        
+        if self.activity_buffer is not None:
+            # last_active и корзины активности пишет сброс буфера, а не upsert
+            self.activity_buffer.remember(db_user, active=True)
+        return db_user
+    
+    @staticmethod
+    async def _upsert_user(user: TelegramUser, user_service: UserService) -> User:
+        return await user_service.get_or_create_user(
+            telegram_id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            language_code=user.language_code or "ru"
+        )
@@ -0,0 +1,108 @@
+"""
+Middleware метрик: задержка обработчиков, запросы к БД и вызовы Bot API
+"""
+import time
+from typing import Callable, Dict, Any, Awaitable, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from utils.metrics import COUNT_BUCKETS, Counter, Histogram, MetricsScope, current_scope
+
+
+HANDLER_LABELS = ("handler", "update_type")
+
+handler_duration = Histogram("bot_handler_duration_seconds", "Время обработчика", HANDLER_LABELS)
+handler_statements = Histogram(
+    "bot_handler_sql_statements", "SQL-запросов за обработку", HANDLER_LABELS, buckets=COUNT_BUCKETS
+)
+handler_pool_wait = Histogram("bot_handler_pool_wait_seconds", "Ожидание соединения БД за обработку", HANDLER_LABELS)
+handler_errors = Counter("bot_handler_errors_total", "Обработчиков, завершившихся исключением", HANDLER_LABELS)
+api_duration = Histogram(
+    "bot_api_request_duration_seconds", "Время запроса к Bot API", ("method",) + HANDLER_LABELS
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Замер обработки обновления по имени обработчика и типу обновления
+    
+    Регистрируется первой рядом с AuthMiddleware: только внутренним middleware
+    известен выбранный обработчик. Время включает AuthMiddleware и сессию БД.
+    Запросы к БД и ожидание пула считаются через current_scope, который
+    видят события движка в database/session.py.
+    """
+    
+    def __init__(self):
+        # Серии метрик по (обработчик, тип обновления): на горячем пути без поиска меток
+        self._series: Dict[Tuple[str, str], Tuple[Any, Any, Any, Any]] = {}
+    
+    def _get_series(self, key: Tuple[str, str]) -> Tuple[Any, Any, Any, Any]:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = (
+                handler_duration.labels(*key),
+                handler_statements.labels(*key),
+                handler_pool_wait.labels(*key),
+                handler_errors.labels(*key)
+            )
+        return series
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Обработка события
+        
+        Args:
+            handler: Следующий обработчик
+            event: Событие
+            data: Данные
+            
+        Returns:
+            Результат обработчика
+        """
+        handler_object = data.get("handler")
+        update = data.get("event_update")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        update_type = update.event_type if update else "unknown"
+        
+        scope = MetricsScope(name, update_type)
+        token = current_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self._get_series((name, update_type))[3].inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            current_scope.reset(token)
+            duration, statements, pool_wait, _ = self._get_series((name, update_type))
+            duration.observe(elapsed)
+            statements.observe(scope.statements)
+            pool_wait.observe(scope.pool_wait)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Время запросов к Bot API с привязкой к обработчику, который их сделал"""
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        scope = current_scope.get()
+        labels = (method.__api_method__,) + ((scope.handler, scope.update_type) if scope else ("", ""))
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            api_duration.labels(*labels).observe(time.perf_counter() - started)
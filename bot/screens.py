@@ -0,0 +1,115 @@
+"""
+Кэш готовых экранов: текст сообщения и клавиатура
+"""
+from dataclasses import dataclass
+from typing import Hashable
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import settings
+from database.models import Event
+from modules.events.service import EventPage
+from bot.keyboards.inline import events_list_keyboard, event_detail_keyboard
+from utils.cache import TTLCache
+
+
+# Записи не устаревают по времени: ключ содержит версию события,
+# старые версии вытесняются как давно не использованные
+_SCREEN_TTL = 24 * 3600
+
+_event_texts = TTLCache(maxsize=settings.screen_cache_size, ttl=_SCREEN_TTL)
+_events_pages = TTLCache(maxsize=settings.screen_cache_size, ttl=_SCREEN_TTL)
+
+
+@dataclass(frozen=True)
+class Screen:
+    """Готовый экран (общий для всех пользователей, изменять нельзя)"""
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
+
+def event_detail_screen(event: Event, has_ticket: bool = False) -> Screen:
+    """
+    Карточка события
+    
+    Текст строится один раз на версию события, пользовательская часть
+    (есть ли билет) выбирает одну из двух заранее собранных клавиатур.
+    
+    Args:
+        event: Событие
+        has_ticket: Есть ли у пользователя билет
+        
+    Returns:
+        Screen: Экран
+    """
+    key = (event.id, event.version)
+    text = _event_texts.get(key)
+    if text is None:
+        text = render_event_detail(event)
+        _event_texts.set(key, text)
+    
+    return Screen(text, event_detail_keyboard(event.id, has_ticket))
+
+
+def events_page_screen(page: EventPage) -> Screen:
+    """
+    Страница афиши
+    
+    Args:
+        page: Страница предстоящих событий (не пустая)
+        
+    Returns:
+        Screen: Экран
+    """
+    key: Hashable = (
+        tuple((event.id, event.version) for event in page.events),
+        page.total,
+        page.prev_cursor,
+        page.next_cursor
+    )
+    screen = _events_pages.get(key)
+    if screen is None:
+        screen = Screen(
+            render_events_page(page),
+            events_list_keyboard(page.events, page.prev_cursor, page.next_cursor)
+        )
+        _events_pages.set(key, screen)
+    
+    return screen
+
+
+def render_event_detail(event: Event) -> str:
+    """Текст карточки события (без кэша)"""
+    # Форматирование даты
+    start_time = event.start_time.strftime("%d.%m.%Y %H:%M")
+    
+    text = (
+        f"🎭 <b>{event.title}</b>\n\n"
+        f"📅 Дата: {start_time}\n"
+        f"⏱ Длительность: {event.duration_minutes} мин\n"
+        f"💰 Цена: {event.price} ₽\n\n"
+    )
+    
+    if event.description:
+        text += f"{event.description}\n\n"
+    
+    if event.max_viewers:
+        free_seats = max(event.max_viewers - event.reserved_seats, 0)
+        text += f"🎫 Доступно мест: {free_seats} из {event.max_viewers}\n"
+    
+    return text
+
+
+def render_events_page(page: EventPage) -> str:
+    """Текст страницы афиши (без кэша)"""
+    return (
+        "🎭 <b>Афиша предстоящих спектаклей</b>\n\n"
+        f"Найдено событий: {page.total}\n"
+        "Выберите спектакль для подробной информации:"
+    )
+
+
+def clear_screens() -> None:
+    """Очистить кэш экранов"""
+    _event_texts.clear()
+    _events_pages.clear()
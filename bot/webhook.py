@@ -0,0 +1,171 @@
+"""
+Режим webhook: aiohttp-сервер с очередью обработки обновлений
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from loguru import logger
+
+from config import settings
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook-запросов с ограниченной параллельностью
+    
+    Запрос подтверждается сразу после проверки секрета и постановки
+    обновления в очередь, а обрабатывают очередь workers фоновых задач.
+    При переполнении очереди отвечаем 503, и Telegram доставит
+    обновление повторно.
+    """
+    
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        workers: int = 64,
+        queue_size: int = 10000,
+        **data: Any
+    ):
+        """
+        Args:
+            dispatcher: Диспетчер
+            bot: Бот
+            secret_token: Ожидаемый X-Telegram-Bot-Api-Secret-Token
+            workers: Количество одновременно обрабатываемых обновлений
+            queue_size: Максимальная длина очереди
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data
+        )
+        self.workers = workers
+        self._queue: "asyncio.Queue[Tuple[Bot, Dict[str, Any]]]" = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks: List[asyncio.Task] = []
+    
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        """Зарегистрировать маршрут и запуск воркеров вместе с приложением"""
+        app.on_startup.append(self._handle_start)
+        super().register(app, path=path, **kwargs)
+    
+    async def _handle_start(self, app: web.Application) -> None:
+        await self.start()
+    
+    async def start(self) -> None:
+        """Запустить воркеры очереди"""
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        logger.info(f"Запущено {self.workers} обработчиков webhook-очереди")
+    
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        
+        try:
+            self._queue.put_nowait((bot, update))
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь webhook переполнена, обновление {update.get('update_id')} отклонено")
+            return web.Response(status=503, text="Queue is full")
+        
+        return web.json_response({}, dumps=bot.session.json_dumps)
+    
+    async def _worker(self) -> None:
+        """Обработка обновлений из очереди"""
+        while True:
+            bot, update = await self._queue.get()
+            try:
+                await self._background_feed_update(bot=bot, update=update)
+            except Exception as e:
+                logger.exception(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def close(self) -> None:
+        """Дождаться обработки очереди, остановить воркеры и закрыть сессию бота"""
+        if self._worker_tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=settings.webhook_drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Не обработано обновлений при остановке: {self._queue.qsize()}")
+            
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+            self._worker_tasks = []
+        
+        await super().close()
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher):
+    """Зарегистрировать webhook в Telegram"""
+    await bot.set_webhook(
+        url=settings.webhook_url,
+        secret_token=settings.webhook_secret or None,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=settings.webhook_max_connections
+    )
+    logger.success(f"✅ Webhook установлен: {settings.webhook_url}")
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, workers: Optional[int] = None) -> web.Application:
+    """
+    Собрать aiohttp-приложение для приема обновлений
+    
+    Args:
+        dp: Диспетчер с зарегистрированными роутерами
+        bot: Бот
+        workers: Обработчиков очереди (по умолчанию из настроек)
+        
+    Returns:
+        web.Application: Приложение
+    """
+    app = web.Application()
+    
+    handler = QueuedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook_secret or None,
+        workers=workers or settings.webhook_workers,
+        queue_size=settings.webhook_queue_size
+    )
+    handler.register(app, path=settings.webhook_path)
+    
+    # Уведомления ЮKassa (см. register_background_jobs)
+    payment_webhook = dp.workflow_data.get("payment_webhook")
+    if payment_webhook is not None:
+        payment_webhook.register(app, settings.payments_webhook_path)
+    
+    setup_application(app, dp, bot=bot)
+    
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, workers: Optional[int] = None):
+    """Запустить aiohttp-сервер и работать до остановки процесса"""
+    if not settings.webhook_secret:
+        logger.warning("⚠️ WEBHOOK_SECRET не задан: запросы к webhook не проверяются")
+    
+    dp.startup.register(set_webhook)
+    
+    app = create_webhook_app(dp, bot, workers)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.success(
+        f"✅ Webhook-сервер слушает {settings.webhook_host}:{settings.webhook_port}"
+        f"{settings.webhook_path}"
+    )
+    
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
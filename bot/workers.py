@@ -0,0 +1,443 @@
+"""
+Многопроцессная обработка обновлений
+
+Фронт-процесс принимает обновления (polling или webhook) и раздает их
+процессам-воркерам по chat_id: все обновления одного чата попадают в один
+воркер, а внутри воркера обрабатываются строго по очереди, поэтому
+FSM-сценарии не ломаются. Разные чаты обрабатываются параллельно.
+"""
+import asyncio
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from loguru import logger
+
+from config import settings, setup_logging
+
+
+# Сколько обновлений воркер забирает из очереди за один переход в поток
+WORKER_BATCH_SIZE = 100
+
+# Состояние воркера в общей памяти: пишет воркер, читает фронт
+STATUS_HEARTBEAT = 0  # time.time() последнего пульса
+STATUS_PROCESSED = 1  # Обработано обновлений
+STATUS_ERRORS = 2  # Из них с ошибкой
+STATUS_READY = 3  # Готовность по сторожу воркера (1/0)
+STATUS_LAG = 4  # Текущая задержка event loop, сек
+STATUS_RECENT_LAG = 5  # Задержка, снявшая готовность (0 - не было), сек
+STATUS_POOL_SATURATED = 6  # Сколько пул БД исчерпан сверх порога (0 - нет), сек
+STATUS_FIELDS = 7
+
+# Период пульса воркера, сек
+WORKER_HEARTBEAT_INTERVAL = 0.5
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    """
+    Ключ распределения обновления по воркерам
+    
+    Args:
+        update: Обновление в виде JSON-словаря Bot API
+        
+    Returns:
+        int: ID чата, иначе ID пользователя, иначе update_id
+    """
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+    
+    return update.get("update_id", 0)
+
+
+class ChatSequencer:
+    """
+    Параллельная обработка разных чатов с сохранением порядка внутри чата
+    
+    Обновление чата ждет завершения предыдущего обновления того же чата.
+    Семафор ограничивает число принятых, но не обработанных обновлений.
+    """
+    
+    def __init__(self, concurrency: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tails: Dict[int, asyncio.Task] = {}
+    
+    async def submit(self, chat_id: int, process: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Поставить обработку в очередь чата
+        
+        Args:
+            chat_id: Чат
+            process: Фабрика корутины обработки
+        """
+        await self._semaphore.acquire()
+        
+        previous = self._tails.get(chat_id)
+        task = asyncio.create_task(self._run(previous, process))
+        self._tails[chat_id] = task
+        
+        def done(finished: asyncio.Task) -> None:
+            self._semaphore.release()
+            if self._tails.get(chat_id) is finished:
+                del self._tails[chat_id]
+        
+        task.add_done_callback(done)
+    
+    async def join(self) -> None:
+        """Дождаться обработки всех принятых обновлений"""
+        while self._tails:
+            await asyncio.gather(*self._tails.values(), return_exceptions=True)
+    
+    @staticmethod
+    async def _run(previous: Optional[asyncio.Task], process: Callable[[], Awaitable[Any]]) -> None:
+        if previous is not None:
+            # Ошибка предыдущего обновления не должна останавливать очередь чата
+            await asyncio.wait([previous])
+        await process()
+
+
+class WorkerPool:
+    """Процессы-воркеры и их очереди (сторона фронт-процесса)"""
+    
+    def __init__(self, workers: int, queue_size: Optional[int] = None):
+        """
+        Args:
+            workers: Количество процессов
+            queue_size: Размер очереди одного воркера
+        """
+        self.workers = workers
+        self.queue_size = queue_size or settings.worker_queue_size
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: List[multiprocessing.Queue] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._statuses: List[Any] = []
+        # Блокирующая запись в очередь идет в потоке: перезапуск воркера
+        # (закрытие и замена его очереди) ждет, пока она не закончится
+        self._locks = [asyncio.Lock() for _ in range(workers)]
+        self._supervisor: Optional[asyncio.Task] = None
+        self._stopping = False
+    
+    def _spawn(self, index: int) -> None:
+        """Запустить процесс воркера с новой очередью и памятью состояния"""
+        updates = self._context.Queue(maxsize=self.queue_size)
+        status = self._context.Array("d", STATUS_FIELDS, lock=False)
+        process = self._context.Process(
+            target=worker_main,
+            args=(index, updates, status),
+            name=f"bot-worker-{index}"
+        )
+        process.start()
+        
+        if index < len(self._processes):
+            self._queues[index] = updates
+            self._statuses[index] = status
+            self._processes[index] = process
+        else:
+            self._queues.append(updates)
+            self._statuses.append(status)
+            self._processes.append(process)
+    
+    def start(self) -> None:
+        """Запустить процессы и проверку их живости"""
+        for index in range(self.workers):
+            self._spawn(index)
+        
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+        logger.info(f"Запущено воркеров: {self.workers}")
+    
+    def ensure_alive(self, index: int) -> bool:
+        """
+        Перезапустить воркер, если его процесс завершился
+        
+        Необработанные обновления переносятся из старой очереди в новую
+        в прежнем порядке; теряется только то, что воркер обрабатывал.
+        Вызывается только из event loop и не во время блокирующей записи
+        в очередь этого воркера (ее защищает блокировка воркера).
+        
+        Args:
+            index: Номер воркера
+            
+        Returns:
+            bool: True, если воркер был перезапущен
+        """
+        process = self._processes[index]
+        if self._stopping or process.is_alive():
+            return False
+        
+        process.join(0)
+        old_updates = self._queues[index]
+        pending = []
+        while True:
+            try:
+                # Без блокировки: умерший воркер мог оставить захваченной блокировку чтения
+                pending.append(old_updates.get(block=False))
+            except (queue.Empty, OSError, EOFError):
+                break
+        old_updates.close()
+        old_updates.cancel_join_thread()
+        
+        self._spawn(index)
+        self.restarts += 1
+        for update in pending:
+            self._queues[index].put_nowait(update)
+        
+        logger.error(
+            f"Воркер {index} завершился (код {process.exitcode}), перезапущен; "
+            f"перенесено обновлений: {len(pending)}"
+        )
+        return True
+    
+    async def _supervise(self) -> None:
+        """Периодическая проверка, что процессы воркеров живы"""
+        while not self._stopping:
+            await asyncio.sleep(settings.worker_check_interval)
+            for index in range(self.workers):
+                if self._locks[index].locked():
+                    # Воркер проверяет submit, ожидающий место в его очереди
+                    continue
+                try:
+                    self.ensure_alive(index)
+                except Exception as e:
+                    logger.exception(f"Не удалось перезапустить воркер {index}: {e}")
+    
+    def processed(self) -> int:
+        """Сколько обновлений обработали текущие процессы воркеров"""
+        return int(sum(status[STATUS_PROCESSED] for status in self._statuses))
+    
+    def errors(self) -> int:
+        """Сколько обновлений текущие процессы воркеров обработали с ошибкой"""
+        return int(sum(status[STATUS_ERRORS] for status in self._statuses))
+    
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Готовность воркеров по их пульсу и сторожам
+        
+        Зависший воркер сам сообщить о себе не может, поэтому устаревший
+        пульс (дольше worker_heartbeat_timeout) тоже снимает готовность.
+        
+        Returns:
+            Tuple[bool, Dict[str, Any]]: Готовы ли все воркеры и подробности
+        """
+        now = time.time()
+        workers, problems = [], []
+        
+        for index, (process, status) in enumerate(zip(self._processes, self._statuses)):
+            heartbeat = status[STATUS_HEARTBEAT]
+            age = now - heartbeat if heartbeat else None
+            workers.append({
+                "index": index,
+                "alive": process.is_alive(),
+                "heartbeat_age": round(age, 1) if age is not None else None,
+                "lag_ms": round(status[STATUS_LAG] * 1000, 1),
+                "processed": int(status[STATUS_PROCESSED])
+            })
+            
+            if not process.is_alive():
+                problems.append(f"воркер {index} не работает")
+            elif age is None:
+                problems.append(f"воркер {index} запускается")
+            elif age > settings.worker_heartbeat_timeout:
+                problems.append(f"воркер {index} не отвечает {age:.0f} с")
+            elif not status[STATUS_READY]:
+                if status[STATUS_RECENT_LAG]:
+                    problems.append(f"воркер {index}: задержка event loop до {status[STATUS_RECENT_LAG] * 1000:.0f} мс")
+                if status[STATUS_POOL_SATURATED]:
+                    problems.append(f"воркер {index}: пул БД исчерпан {status[STATUS_POOL_SATURATED]:.0f} с")
+                if not status[STATUS_RECENT_LAG] and not status[STATUS_POOL_SATURATED]:
+                    problems.append(f"воркер {index}: сторож не работает")
+        
+        return not problems, {"workers": workers, "problems": problems}
+    
+    async def submit(self, update: Dict[str, Any]) -> bool:
+        """
+        Передать обновление воркеру его чата
+        
+        Вызывающий должен передавать обновления последовательно: при полной
+        очереди ожидание блокирует следующую пересылку, и порядок сохраняется.
+        Ожидание идет порциями с проверкой живости воркера и ограничено
+        worker_submit_timeout, после чего обновление отбрасывается.
+        
+        Returns:
+            bool: Принято ли обновление
+        """
+        index = update_chat_id(update) % self.workers
+        
+        try:
+            self._queues[index].put_nowait(update)
+            return True
+        except queue.Full:
+            logger.warning(f"Очередь воркера {index} переполнена, прием обновлений замедлен")
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.worker_submit_timeout
+        async with self._locks[index]:
+            while True:
+                self.ensure_alive(index)
+                timeout = min(settings.worker_check_interval, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    await loop.run_in_executor(None, self._queues[index].put, update, True, timeout)
+                    return True
+                except queue.Full:
+                    continue
+        
+        logger.error(
+            f"Воркер {index} не принял обновление {update.get('update_id')} "
+            f"за {settings.worker_submit_timeout:.0f} с, обновление отброшено"
+        )
+        return False
+    
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Дождаться обработки очередей и остановить процессы"""
+        loop = asyncio.get_running_loop()
+        self._stopping = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        
+        for updates, process in zip(self._queues, self._processes):
+            if not process.is_alive():
+                continue
+            try:
+                await loop.run_in_executor(None, updates.put, None, True, timeout)
+            except queue.Full:
+                logger.warning(f"Очередь воркера {process.name} не освободилась за {timeout} с")
+        
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Воркер {process.name} не остановился за {timeout} с")
+                process.terminate()
+        
+        logger.info(f"Воркеры остановлены, перезапусков за работу: {self.restarts}")
+
+
+class ForwardToWorkersMiddleware(BaseMiddleware):
+    """Пересылка обновлений воркерам вместо обработки во фронт-процессе"""
+    
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+    
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        await self.pool.submit(event.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+
+def worker_main(index: int, updates: multiprocessing.Queue, status: Any) -> None:
+    """Точка входа процесса-воркера"""
+    # Остановку воркера инициирует фронт, отправляя None в очередь
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(run_worker(index, updates, status))
+
+
+async def run_worker(index: int, updates: multiprocessing.Queue, status: Any) -> None:
+    """
+    Обработка обновлений воркером
+    
+    Воркер поднимает обычный диспетчер (роутеры, AuthMiddleware, FSM в Redis)
+    и кормит его обновлениями из своей очереди. Пульс и счетчики обработки
+    пишутся в status - общую с фронтом память.
+    """
+    from bot.main import create_bot, create_dispatcher
+    from database import close_db
+    from modules.payments import close_payments_client
+    from modules.tickets.qr import close_qr_renderer
+    from modules.users import UserActivityBuffer
+    from database import engine
+    from utils.metrics import MetricsServer
+    from utils.redis_client import close_redis
+    from utils.watchdog import create_watchdog
+    
+    bot = create_bot()
+    activity_buffer = UserActivityBuffer()
+    dp = create_dispatcher(activity_buffer)
+    sequencer = ChatSequencer(settings.worker_concurrency)
+    loop = asyncio.get_running_loop()
+    
+    async def process(update: Dict[str, Any]) -> None:
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            status[STATUS_ERRORS] += 1
+            logger.exception(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
+        finally:
+            status[STATUS_PROCESSED] += 1
+    
+    async def heartbeat() -> None:
+        while True:
+            if watchdog is not None:
+                ready, _ = watchdog.readiness()
+                status[STATUS_READY] = float(ready)
+                status[STATUS_LAG] = watchdog.lag
+                status[STATUS_RECENT_LAG] = watchdog.recent_lag()
+                status[STATUS_POOL_SATURATED] = watchdog.saturated_for()
+            else:
+                status[STATUS_READY] = 1.0
+            status[STATUS_HEARTBEAT] = time.time()
+            await asyncio.sleep(WORKER_HEARTBEAT_INTERVAL)
+    
+    # Свой порт метрик у каждого воркера: счетчики живут в памяти процесса
+    metrics_server = None
+    if settings.metrics_enabled:
+        metrics_server = MetricsServer(settings.metrics_host, settings.metrics_port + 1 + index, settings.metrics_path)
+        await metrics_server.start()
+    
+    # Блокировки loop воркера попадают в его лог и метрики; готовность фронт собирает из status
+    watchdog = create_watchdog(engine) if settings.watchdog_enabled else None
+    if watchdog is not None:
+        await watchdog.start()
+    
+    await activity_buffer.start()
+    heartbeat_task = asyncio.create_task(heartbeat())
+    logger.info(f"Воркер {index} готов")
+    
+    try:
+        stopping = False
+        while not stopping:
+            batch = [await loop.run_in_executor(None, updates.get)]
+            while len(batch) < WORKER_BATCH_SIZE:
+                try:
+                    batch.append(updates.get_nowait())
+                except queue.Empty:
+                    break
+            
+            for update in batch:
+                if update is None:
+                    stopping = True
+                    break
+                await sequencer.submit(update_chat_id(update), lambda update=update: process(update))
+        
+        await sequencer.join()
+    finally:
+        heartbeat_task.cancel()
+        await activity_buffer.stop()
+        if watchdog is not None:
+            await watchdog.stop()
+        if metrics_server is not None:
+            await metrics_server.stop()
+        await dp.storage.close()
+        await bot.session.close()
+        await close_qr_renderer()
+        await close_payments_client()
+        await close_db()
+        await close_redis()
+        logger.info(f"Воркер {index} остановлен")
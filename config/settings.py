@@ -17,6 +17,29 @@ class Settings(BaseSettings):
     # Telegram Bot
     bot_token: str
     admin_ids: str  # Comma-separated list
+    telegram_api_url: str = ""  # Свой сервер Bot API (telegram-bot-api, нагрузочный тест); пусто - api.telegram.org
+    
+    # Режим получения обновлений: polling (разработка) или webhook
+    bot_mode: str = "polling"
+    
+    # Webhook
+    webhook_base_url: str = ""  # Публичный https-адрес, например https://bot.example.com
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""  # X-Telegram-Bot-Api-Secret-Token
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_workers: int = 64  # Одновременно обрабатываемых обновлений
+    webhook_queue_size: int = 10000  # При переполнении отвечаем 503
+    webhook_max_connections: int = 40  # Параллельных соединений от Telegram
+    webhook_drain_timeout: float = 10.0  # Ожидание очереди при остановке, сек
+    
+    # Многопроцессная обработка: фронт принимает обновления, воркеры их обрабатывают
+    bot_workers: int = 0  # Процессов-воркеров (0 - все в одном процессе)
+    worker_queue_size: int = 10000  # Очередь обновлений одного воркера
+    worker_concurrency: int = 64  # Одновременно обрабатываемых обновлений в воркере
+    worker_submit_timeout: float = 30.0  # Ожидание места в очереди воркера, потом обновление отбрасывается, сек
+    worker_check_interval: float = 1.0  # Период проверки живости воркеров, сек
+    worker_heartbeat_timeout: float = 5.0  # Воркер без пульса дольше этого снимает готовность фронта, сек
     
     # Database
     db_host: str = "localhost"
@@ -29,13 +52,39 @@ class Settings(BaseSettings):
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
+    fsm_state_ttl: int = 86400  # Время жизни брошенного состояния FSM (мастера), сек
     
     # OpenAI
     openai_api_key: str
     
+    # ИИ-генерация анонсов
+    ai_provider: str = "openai"  # openai или fake (локальная заглушка без сети)
+    ai_model: str = "gpt-4o-mini"
+    ai_concurrency: int = 4  # Одновременных запросов к провайдеру на процесс
+    ai_timeout: float = 60.0  # Предел одной генерации, сек
+    ai_max_tokens: int = 600
+    ai_cache_ttl: int = 30 * 86400  # Время жизни готового анонса в Redis, сек
+    ai_progress_interval: float = 1.5  # Период обновления текста у админа, сек
+    
     # Payments
     yukassa_shop_id: str = ""
     yukassa_secret_key: str = ""
+    yukassa_return_url: str = ""  # Куда ЮKassa вернет после оплаты, например https://t.me/<бот>
+    yukassa_api_url: str = "https://api.yookassa.ru"
+    yukassa_timeout: float = 10.0  # Предел запроса создания платежа, сек
+    
+    # Прием уведомлений ЮKassa
+    payments_webhook_enabled: bool = False
+    payments_webhook_path: str = "/yookassa"
+    payments_port: int = 8081  # Отдельный сервер в режиме polling (в webhook - на сервере бота)
+    # Сети ЮKassa; за обратным прокси проверку делает прокси, здесь - пусто
+    payments_trusted_ips: str = (
+        "185.71.76.0/27,185.71.77.0/27,77.75.153.0/25,77.75.156.11,77.75.156.35,"
+        "77.75.154.128/25,2a02:5180::/32"
+    )
+    payments_batch_size: int = 200  # Уведомлений в одной транзакции
+    payments_claim_timeout: float = 60.0  # Через сколько чужие неподтвержденные уведомления забираются, сек
+    payments_dedupe_ttl: int = 86400  # Память о принятых уведомлениях (ЮKassa повторяет до суток), сек
     
     # Telegram Channel
     stream_channel_id: int
@@ -43,11 +92,80 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = "INFO"
     
+    # Write-behind буфер активности пользователей
+    user_flush_interval: float = 5.0  # Период сброса last_active в БД, сек
+    user_flush_batch_size: int = 500  # Досрочный сброс при накоплении записей
+    user_cache_size: int = 100_000  # Максимум пользователей в памяти
+    
+    # Рассылки
+    telegram_rate_limit: float = 28.0  # Сообщений в секунду (лимит Telegram ~30)
+    broadcast_chunk_size: int = 100  # Получателей за один шаг (и шаг сохранения прогресса)
+    broadcast_concurrency: int = 30  # Одновременных запросов sendMessage
+    broadcast_progress_interval: float = 5.0  # Период обновления прогресса у админа, сек
+    
+    # Бронирование билетов
+    reservation_ttl_minutes: int = 15  # Срок брони неоплаченного заказа
+    reservation_sweep_interval: float = 30.0  # Период освобождения истекших броней, сек
+    
+    # Планировщик жизненного цикла событий (статусы по расписанию и напоминания)
+    scheduler_enabled: bool = True
+    event_reminders: str = "60,10"  # За сколько минут до начала напоминать владельцам билетов
+    scheduler_tick: float = 1.0  # Точность срабатывания таймеров, сек
+    scheduler_lease_interval: float = 15.0  # Проверка блокировки ведущего и попытки резервных реплик, сек
+    scheduler_resync_interval: float = 900.0  # Полная пересборка расписания из БД, сек
+    
+    # Публикация запланированных постов в канал
+    content_publisher_enabled: bool = True
+    content_batch_size: int = 10  # Постов, забираемых за раз
+    content_rate_per_minute: float = 20.0  # Публикаций в канал в минуту (лимит Telegram ~20)
+    content_max_idle: float = 300.0  # Максимальный сон публикатора без оповещений, сек
+    content_claim_timeout: float = 600.0  # Забранный, но не подтвержденный пост считается failed, сек
+    
+    # QR-коды билетов
+    qr_workers: int = 2  # Процессов генерации в боте (скрипт prerender_qr использует все ядра)
+    qr_cache_ttl: int = 7 * 86400  # Время жизни PNG в Redis до первой отправки, сек
+    
+    # Кэш событий (L1 в памяти, L2 в Redis)
+    event_cache_size: int = 1024  # Максимум записей L1
+    event_cache_l1_ttl: float = 5.0  # TTL L1, сек (ограничивает рассинхрон реплик)
+    event_cache_l2_ttl: int = 60  # TTL L2, сек
+    events_page_size: int = 8  # Событий на странице афиши и админ-списка
+    screen_cache_size: int = 4096  # Готовых экранов (карточек и страниц афиши) в памяти
+    
+    # Метрики Prometheus
+    metrics_enabled: bool = False
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9100  # Воркер i (BOT_WORKERS) отдает метрики на metrics_port + 1 + i
+    metrics_path: str = "/metrics"
+    
+    # Сторож event loop и пула БД, проверки здоровья для оркестратора
+    watchdog_enabled: bool = True
+    watchdog_interval: float = 0.1  # Период замера задержки event loop, сек
+    watchdog_stall_threshold: float = 0.25  # Задержка, при которой в лог пишется стек блокировки, сек
+    watchdog_unready_lag: float = 1.0  # Задержка, снимающая готовность реплики на watchdog_window, сек
+    watchdog_pool_saturation: float = 5.0  # Сколько пул БД может быть исчерпан до снятия готовности, сек
+    watchdog_window: float = 30.0  # Окно, в котором помнятся задержки, сек
+    health_host: str = "0.0.0.0"
+    health_port: int = 8090  # /health/live и /health/ready; 0 - без сервера (воркеры его не поднимают)
+    
+    # Профилирование из админ-панели (/profile)
+    profiler_interval: float = 0.01  # Период выборки стеков, сек
+    profiler_max_seconds: int = 300  # Максимальная длительность профилирования, сек
+    
+    # Статистика админ-панели
+    stats_max_age: float = 60.0  # Снимок старше этого пересчитывается при открытии, сек
+    stats_watermark_lag: int = 60  # Отставание водяного знака от текущего времени, сек
+    
     @property
     def database_url(self) -> str:
         """Формирование URL для подключения к БД"""
         return f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
     
+    @property
+    def webhook_url(self) -> str:
+        """Полный адрес webhook"""
+        return f"{self.webhook_base_url.rstrip('/')}{self.webhook_path}"
+    
     @property
     def redis_url(self) -> str:
         """Формирование URL для подключения к Redis"""
@@ -57,6 +175,11 @@ class Settings(BaseSettings):
     def admin_list(self) -> List[int]:
         """Список ID администраторов"""
         return [int(admin_id.strip()) for admin_id in self.admin_ids.split(',') if admin_id.strip()]
+    
+    @property
+    def reminder_minutes(self) -> List[int]:
+        """Напоминания о начале события, минут до начала (по убыванию)"""
+        return sorted({int(value) for value in self.event_reminders.split(',') if value.strip()}, reverse=True)
 
 
 # Глобальный экземпляр настроек
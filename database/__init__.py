@@ -1,12 +1,20 @@
 """
 База данных
 """
-from database.session import Base, get_session, init_db, close_db, engine
-from database.models import User, Event, Order, Ticket, ContentPost, UserRole, EventStatus, OrderStatus
+from database.session import (
+    Base, get_session, init_db, close_db, engine, LazySession, async_session_maker, advisory_lock_session
+)
+from database.models import (
+    User, Event, Order, Ticket, ContentPost, Broadcast, StatsSnapshot, ActivityBucket,
+    UserRole, EventStatus, OrderStatus, BroadcastStatus, ContentPostStatus
+)
 
 __all__ = [
     'Base',
     'get_session',
+    'LazySession',
+    'async_session_maker',
+    'advisory_lock_session',
     'init_db',
     'close_db',
     'engine',
@@ -15,7 +23,12 @@ __all__ = [
     'Order',
     'Ticket',
     'ContentPost',
+    'Broadcast',
+    'StatsSnapshot',
+    'ActivityBucket',
     'UserRole',
     'EventStatus',
     'OrderStatus',
+    'BroadcastStatus',
+    'ContentPostStatus',
 ]
@@ -0,0 +1,60 @@
+"""
+Миграции схемы БД (Alembic)
+"""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Advisory-блокировка миграций в PostgreSQL: реплики стартуют одновременно, мигрирует одна
+MIGRATIONS_LOCK_NAMESPACE = 5003
+MIGRATIONS_LOCK_ID = 0
+
+# Ревизия, соответствующая схеме, которую создавал create_all до появления миграций
+BASELINE_REVISION = "0001"
+
+# Контекст Alembic глобальный: в одном процессе миграции идут по очереди
+_upgrade_lock = asyncio.Lock()
+
+
+def alembic_config(url: Optional[str] = None) -> Config:
+    """
+    Конфигурация Alembic
+    
+    Args:
+        url: Адрес БД (по умолчанию из настроек приложения)
+        
+    Returns:
+        Config: Конфигурация из alembic.ini
+    """
+    config = Config(str(ALEMBIC_INI))
+    if url:
+        # configparser раскрывает %, а в пароле он может быть
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+async def upgrade_database(engine: AsyncEngine, revision: str = "head") -> None:
+    """
+    Применить миграции через движок приложения
+    
+    Args:
+        engine: Асинхронный движок БД
+        revision: Целевая ревизия
+    """
+    def upgrade(connection: Connection) -> None:
+        config = alembic_config()
+        config.attributes["connection"] = connection
+        # Логирование приложения (loguru) не перенастраивается
+        config.attributes["configure_logger"] = False
+        command.upgrade(config, revision)
+    
+    async with _upgrade_lock, engine.connect() as connection:
+        await connection.run_sync(upgrade)
@@ -0,0 +1,122 @@
+"""
+Окружение Alembic
+
+Миграции применяются под advisory-блокировкой PostgreSQL, по транзакции
+на ревизию (ревизии с CREATE INDEX CONCURRENTLY выходят из транзакции).
+"""
+import asyncio
+import time
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import Connection, inspect, pool, select, func
+from sqlalchemy.ext.asyncio import create_async_engine
+from loguru import logger
+
+from config.settings import settings
+from database import Base
+from database.migrate import MIGRATIONS_LOCK_NAMESPACE, MIGRATIONS_LOCK_ID, BASELINE_REVISION
+
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    """Адрес БД: из конфигурации Alembic или из настроек приложения"""
+    return config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+def run_migrations_offline() -> None:
+    """Вывести SQL миграций без подключения к БД (alembic upgrade --sql)"""
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def acquire_migrations_lock(connection: Connection) -> None:
+    """
+    Дождаться advisory-блокировки миграций
+    
+    Сессионная блокировка переживает commit каждой ревизии. Ожидание идет
+    опросом pg_try_advisory_lock вне транзакции: заблокированный
+    pg_advisory_lock держит снимок, которого ждет CREATE INDEX CONCURRENTLY
+    у владельца блокировки, и реплики взаимоблокируются.
+    """
+    waiting = False
+    while True:
+        locked = connection.execute(
+            select(func.pg_try_advisory_lock(MIGRATIONS_LOCK_NAMESPACE, MIGRATIONS_LOCK_ID))
+        ).scalar()
+        connection.commit()
+        if locked:
+            return
+        if not waiting:
+            logger.info("Миграции применяет другой экземпляр, ожидание...")
+            waiting = True
+        time.sleep(1)
+
+
+def do_run_migrations(connection: Connection) -> None:
+    """Применить миграции на соединении"""
+    acquire_migrations_lock(connection)
+    
+    try:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            transaction_per_migration=True
+        )
+        
+        migration_context = context.get_context()
+        if migration_context.get_current_revision() is None and inspect(connection).has_table("events"):
+            # База создана create_all до появления миграций. Исходная схема - это 0001;
+            # 0002 добавляет колонки и таблицы, только если их еще нет
+            logger.warning(f"Схема без истории миграций отмечена ревизией {BASELINE_REVISION}")
+            migration_context.stamp(context.script, BASELINE_REVISION)
+        connection.commit()
+        
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        connection.execute(select(func.pg_advisory_unlock(MIGRATIONS_LOCK_NAMESPACE, MIGRATIONS_LOCK_ID)))
+        connection.commit()
+
+
+async def run_async_migrations() -> None:
+    """Применить миграции через отдельное соединение asyncpg"""
+    engine = create_async_engine(database_url(), poolclass=pool.NullPool)
+    
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    
+    await engine.dispose()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    
+    if connection is None:
+        # Командная строка alembic
+        asyncio.run(run_async_migrations())
+    else:
+        # upgrade_database(): соединение приложения
+        do_run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
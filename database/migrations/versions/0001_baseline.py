@@ -0,0 +1,100 @@
+"""Базовая схема (то, что создавал create_all в исходной версии бота)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 16:44:03.381420
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('content_posts',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('content_type', sa.String(length=50), nullable=False),
+        sa.Column('content_text', sa.Text(), nullable=True),
+        sa.Column('content_url', sa.String(length=500), nullable=True),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=True),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('channel_id', sa.BigInteger(), nullable=True),
+        sa.Column('message_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('poster_url', sa.String(length=500), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('duration_minutes', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('max_viewers', sa.Integer(), nullable=True),
+        sa.Column('stream_url', sa.String(length=500), nullable=True),
+        sa.Column('invite_link', sa.String(length=500), nullable=True),
+        sa.Column('status', sa.Enum('UPCOMING', 'LIVE', 'FINISHED', 'CANCELLED', name='eventstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('first_name', sa.String(length=255), nullable=True),
+        sa.Column('last_name', sa.String(length=255), nullable=True),
+        sa.Column('language_code', sa.String(length=10), nullable=False),
+        sa.Column('role', sa.Enum('USER', 'ADMIN', 'MODERATOR', name='userrole'), nullable=False),
+        sa.Column('is_premium', sa.Boolean(), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_active', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('telegram_id')
+    )
+    op.create_table('orders',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'PAID', 'CANCELLED', 'REFUNDED', name='orderstatus'), nullable=False),
+        sa.Column('payment_id', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('paid_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('tickets',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('access_token', sa.String(length=255), nullable=False),
+        sa.Column('qr_code', sa.Text(), nullable=True),
+        sa.Column('is_used', sa.Boolean(), nullable=False),
+        sa.Column('used_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('access_token')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('tickets')
+    op.drop_table('orders')
+    op.drop_table('users')
+    op.drop_table('events')
+    op.drop_table('content_posts')
+    
+    for enum_name in ('orderstatus', 'userrole', 'eventstatus'):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
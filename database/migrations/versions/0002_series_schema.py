@@ -0,0 +1,131 @@
+"""Счетчики продаж, брони, рассылки, статистика и публикатор постов
+
+Базы, созданные create_all более поздней версией бота, отмечаются ревизией
+0001, поэтому колонки и таблицы добавляются только при отсутствии.
+Счетчики событий пересчитываются по заказам; PENDING заказы без срока
+брони получают истекший срок, и их освобождает ReservationSweeper.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:20:41.502716
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (таблица, колонка, тип, значение для существующих строк или None)
+COLUMNS = (
+    ('users', 'is_blocked', 'BOOLEAN', 'false'),
+    ('events', 'reserved_seats', 'INTEGER', '0'),
+    ('events', 'sold_tickets', 'INTEGER', '0'),
+    ('events', 'revenue', 'NUMERIC(12, 2)', '0'),
+    ('events', 'version', 'INTEGER', '1'),
+    ('events', 'reminded_before', 'INTEGER', None),
+    ('orders', 'reserved_until', 'TIMESTAMP WITHOUT TIME ZONE', None),
+    ('content_posts', 'claimed_at', 'TIMESTAMP WITHOUT TIME ZONE', None),
+    ('content_posts', 'error', 'TEXT', None),
+)
+
+
+def upgrade() -> None:
+    for table, column, type_, value in COLUMNS:
+        if value is None:
+            op.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {type_}')
+        else:
+            # Константный DEFAULT не переписывает таблицу; после заполнения он снимается, как у create_all
+            op.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {type_} NOT NULL DEFAULT {value}')
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT')
+    
+    # Из нескольких активных заказов пользователя на событие остается один (PAID, иначе последний):
+    # дальше это гарантирует уникальный индекс uq_orders_active_user_event
+    op.execute("""
+        UPDATE orders SET status = 'CANCELLED'
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, event_id
+                    ORDER BY status = 'PAID' DESC, id DESC
+                ) AS position
+                FROM orders
+                WHERE status IN ('PENDING', 'PAID')
+            ) ranked
+            WHERE position > 1
+        )
+    """)
+    op.execute("UPDATE orders SET reserved_until = now() AT TIME ZONE 'utc' WHERE status = 'PENDING' AND reserved_until IS NULL")
+    
+    op.execute("""
+        UPDATE events SET
+            reserved_seats = counters.reserved,
+            sold_tickets = counters.sold,
+            revenue = counters.revenue
+        FROM (
+            SELECT
+                events.id,
+                count(orders.id) FILTER (WHERE orders.status IN ('PENDING', 'PAID')) AS reserved,
+                count(orders.id) FILTER (WHERE orders.status = 'PAID') AS sold,
+                coalesce(sum(orders.amount) FILTER (WHERE orders.status = 'PAID'), 0) AS revenue
+            FROM events
+            LEFT JOIN orders ON orders.event_id = events.id
+            GROUP BY events.id
+        ) counters
+        WHERE events.id = counters.id
+    """)
+    
+    inspector = sa.inspect(op.get_bind())
+    
+    if not inspector.has_table('broadcasts'):
+        op.create_table('broadcasts',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.Column('event_id', sa.Integer(), nullable=True),
+            sa.Column('created_by', sa.BigInteger(), nullable=True),
+            sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'FINISHED', name='broadcaststatus'), nullable=False),
+            sa.Column('total_count', sa.Integer(), nullable=False),
+            sa.Column('last_user_id', sa.BigInteger(), nullable=False),
+            sa.Column('sent_count', sa.Integer(), nullable=False),
+            sa.Column('blocked_count', sa.Integer(), nullable=False),
+            sa.Column('failed_count', sa.Integer(), nullable=False),
+            sa.Column('flood_wait_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id')
+        )
+    
+    if not inspector.has_table('stats_snapshots'):
+        op.create_table('stats_snapshots',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('users_watermark', sa.DateTime(), nullable=True),
+            sa.Column('users_counted', sa.Integer(), nullable=False),
+            sa.Column('users_total', sa.Integer(), nullable=False),
+            sa.Column('active_day', sa.Integer(), nullable=False),
+            sa.Column('active_week', sa.Integer(), nullable=False),
+            sa.Column('events_upcoming', sa.Integer(), nullable=False),
+            sa.Column('events_live', sa.Integer(), nullable=False),
+            sa.Column('events_finished', sa.Integer(), nullable=False),
+            sa.Column('events_cancelled', sa.Integer(), nullable=False),
+            sa.Column('tickets_sold', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('stats_snapshots')
+    op.drop_table('broadcasts')
+    postgresql.ENUM(name='broadcaststatus').drop(op.get_bind(), checkfirst=True)
+    
+    for table, column, _, _ in reversed(COLUMNS):
+        op.drop_column(table, column)
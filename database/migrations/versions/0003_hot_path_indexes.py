@@ -0,0 +1,106 @@
+"""Индексы горячих запросов
+
+Индексы строятся CREATE INDEX CONCURRENTLY, чтобы не блокировать запись
+в users, events, orders и tickets на работающей базе. Прерванная сборка
+оставляет невалидный индекс: его нужно удалить (DROP INDEX) и повторить
+upgrade.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 16:44:17.780535
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # Статистика: новые пользователи по водяному знаку, активные
+        op.create_index(
+            'ix_users_created_at', 'users', ['created_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_users_last_active', 'users', ['last_active'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Keyset-пагинация списка событий по (start_time, id)
+        op.create_index(
+            'ix_events_start_time_id', 'events', ['start_time', 'id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Афиша: status = UPCOMING, keyset по (start_time, id)
+        op.create_index(
+            'ix_events_status_start_time_id', 'events', ['status', 'start_time', 'id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Публикатор: готовые посты и ближайший scheduled_time
+        op.create_index(
+            'ix_content_posts_status_scheduled', 'content_posts', ['status', 'scheduled_time'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Один активный заказ пользователя на событие (дубликаты отменены в 0002)
+        op.create_index(
+            'uq_orders_active_user_event', 'orders', ['user_id', 'event_id'], unique=True,
+            postgresql_where=sa.text("status IN ('PENDING', 'PAID')"),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Заказ по уведомлению ЮKassa
+        op.create_index(
+            'uq_orders_payment_id', 'orders', ['payment_id'], unique=True,
+            postgresql_where=sa.text('payment_id IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Пересчет счетчиков события
+        op.create_index(
+            'ix_orders_event_status', 'orders', ['event_id', 'status'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Освобождение истекших броней
+        op.create_index(
+            'ix_orders_pending_reserved_until', 'orders', ['reserved_until'],
+            postgresql_where=sa.text("status = 'PENDING'"),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Зрители события в режиме показа
+        op.create_index(
+            'ix_tickets_event_user', 'tickets', ['event_id', 'user_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Отзыв билета по заказу
+        op.create_index(
+            'ix_tickets_order_id', 'tickets', ['order_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # «Мои билеты»
+        op.create_index(
+            'ix_tickets_user_event', 'tickets', ['user_id', 'event_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, index in (
+            ('tickets', 'ix_tickets_user_event'),
+            ('tickets', 'ix_tickets_order_id'),
+            ('tickets', 'ix_tickets_event_user'),
+            ('orders', 'ix_orders_pending_reserved_until'),
+            ('orders', 'ix_orders_event_status'),
+            ('orders', 'uq_orders_payment_id'),
+            ('orders', 'uq_orders_active_user_event'),
+            ('events', 'ix_events_status_start_time_id'),
+            ('events', 'ix_events_start_time_id'),
+            ('users', 'ix_users_last_active'),
+            ('users', 'ix_users_created_at'),
+            ('content_posts', 'ix_content_posts_status_scheduled'),
+        ):
+            op.drop_index(index, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,39 @@
+"""Часовые корзины активности пользователей
+
+Корзины заполняются по текущим last_active за окно статистики; дальше их
+поддерживают сброс буфера активности и upsert пользователей.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:31:06.118254
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_buckets',
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('hour')
+    )
+    # Диапазон по ix_users_last_active: старше окна корзины не нужны
+    op.execute("""
+        INSERT INTO activity_buckets (hour, users)
+        SELECT date_trunc('hour', last_active), count(*)
+        FROM users
+        WHERE last_active >= date_trunc('hour', now() AT TIME ZONE 'utc') - interval '8 days'
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('activity_buckets')
@@ -5,7 +5,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import BigInteger, String, Text, Integer, DateTime, Boolean, Numeric, ForeignKey, Enum as SQLEnum
+from sqlalchemy import BigInteger, String, Text, Integer, DateTime, Boolean, Numeric, ForeignKey, Index, text, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -35,6 +35,21 @@ class OrderStatus(str, enum.Enum):
     REFUNDED = "refunded"  # Возвращен
 
 
+class ContentPostStatus(str, enum.Enum):
+    """Статусы постов контента (в БД хранится строковое значение)"""
+    PENDING = "pending"  # Ждет scheduled_time
+    PUBLISHING = "publishing"  # Забран публикатором
+    PUBLISHED = "published"  # Опубликован
+    FAILED = "failed"  # Не опубликован
+
+
+class BroadcastStatus(str, enum.Enum):
+    """Статусы рассылок"""
+    PENDING = "pending"  # Создана
+    RUNNING = "running"  # Идет отправка
+    FINISHED = "finished"  # Завершена
+
+
 class User(Base):
     """Модель пользователя"""
     __tablename__ = "users"
@@ -47,8 +62,9 @@ class User(Base):
     role: Mapped[UserRole] = mapped_column(SQLEnum(UserRole), default=UserRole.USER)
     is_premium: Mapped[bool] = mapped_column(Boolean, default=False)
     balance: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    last_active: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    last_active: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)  # Заблокировал бота
     
     # Relationships
     orders: Mapped[list["Order"]] = relationship("Order", back_populates="user")
@@ -70,11 +86,24 @@ class Event(Base):
     duration_minutes: Mapped[int] = mapped_column(Integer, default=120)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0)
     max_viewers: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Денормализованные счетчики продаж (поддерживает TicketService, сверяет scripts/reconcile_counters.py)
+    reserved_seats: Mapped[int] = mapped_column(Integer, default=0)  # Места под PENDING и PAID заказами
+    sold_tickets: Mapped[int] = mapped_column(Integer, default=0)  # PAID заказы
+    revenue: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)  # Сумма PAID заказов
+    version: Mapped[int] = mapped_column(Integer, default=1)  # Растет при каждом изменении (ключ кэша отрисовки)
     stream_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     invite_link: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     status: Mapped[EventStatus] = mapped_column(SQLEnum(EventStatus), default=EventStatus.UPCOMING)
+    reminded_before: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # За сколько минут до начала ушло последнее напоминание
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Keyset-пагинация афиши и списка событий по (start_time, id)
+        Index("ix_events_start_time_id", "start_time", "id"),
+        # Афиша (status = UPCOMING) тем же keyset, пересборка расписания, статистика по статусам
+        Index("ix_events_status_start_time_id", "status", "start_time", "id"),
+    )
+    
     # Relationships
     orders: Mapped[list["Order"]] = relationship("Order", back_populates="event")
     tickets: Mapped[list["Ticket"]] = relationship("Ticket", back_populates="event")
@@ -95,6 +124,33 @@ class Order(Base):
     payment_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     paid_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    reserved_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Срок брони PENDING заказа
+    
+    __table_args__ = (
+        # Не больше одного активного заказа пользователя на событие
+        Index(
+            "uq_orders_active_user_event",
+            "user_id",
+            "event_id",
+            unique=True,
+            postgresql_where=text("status IN ('PENDING', 'PAID')")
+        ),
+        # Один платеж ЮKassa оплачивает не больше одного заказа; поиск заказа по уведомлению
+        Index(
+            "uq_orders_payment_id",
+            "payment_id",
+            unique=True,
+            postgresql_where=text("payment_id IS NOT NULL")
+        ),
+        # Пересчет счетчиков события по заказам
+        Index("ix_orders_event_status", "event_id", "status"),
+        # Освобождение истекших броней: в индексе только PENDING заказы
+        Index(
+            "ix_orders_pending_reserved_until",
+            "reserved_until",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+    )
     
     # Relationships
     user: Mapped["User"] = relationship("User", back_populates="orders")
@@ -114,11 +170,20 @@ class Ticket(Base):
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
     event_id: Mapped[int] = mapped_column(Integer, ForeignKey("events.id"), nullable=False)
     access_token: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
-    qr_code: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    qr_code: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # file_id фото QR-кода в Telegram
     is_used: Mapped[bool] = mapped_column(Boolean, default=False)
     used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Загрузка зрителей в режим показа и проверка билета без чтения строк таблицы
+        Index("ix_tickets_event_user", "event_id", "user_id"),
+        # «Мои билеты» и билет пользователя
+        Index("ix_tickets_user_event", "user_id", "event_id"),
+        # Отзыв билета при отмене и возврате заказа
+        Index("ix_tickets_order_id", "order_id"),
+    )
+    
     # Relationships
     order: Mapped["Order"] = relationship("Order", back_populates="ticket")
     user: Mapped["User"] = relationship("User", back_populates="tickets")
@@ -138,10 +203,84 @@ class ContentPost(Base):
     content_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     scheduled_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    status: Mapped[str] = mapped_column(String(50), default="pending")  # pending, published, failed
+    status: Mapped[str] = mapped_column(String(50), default=ContentPostStatus.PENDING.value)  # ContentPostStatus
     channel_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Когда забран публикатором
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Причина статуса failed
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Выборка готовых к публикации постов и ближайшего scheduled_time
+        Index("ix_content_posts_status_scheduled", "status", "scheduled_time"),
+    )
+    
     def __repr__(self):
         return f"<ContentPost {self.id}: {self.content_type}>"
+
+
+class Broadcast(Base):
+    """Модель рассылки по всем пользователям"""
+    __tablename__ = "broadcasts"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    event_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("events.id", ondelete="SET NULL"), nullable=True)
+    created_by: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)  # Telegram ID админа
+    status: Mapped[BroadcastStatus] = mapped_column(SQLEnum(BroadcastStatus), default=BroadcastStatus.PENDING)
+    total_count: Mapped[int] = mapped_column(Integer, default=0)  # Оценка числа получателей на старте
+    last_user_id: Mapped[int] = mapped_column(BigInteger, default=0)  # Курсор: последний обработанный telegram_id
+    sent_count: Mapped[int] = mapped_column(Integer, default=0)
+    blocked_count: Mapped[int] = mapped_column(Integer, default=0)
+    failed_count: Mapped[int] = mapped_column(Integer, default=0)
+    flood_wait_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<Broadcast {self.id}: {self.status}>"
+
+
+class StatsSnapshot(Base):
+    """
+    Снимок статистики для админ-панели (одна строка, id = 1)
+    
+    Число пользователей накапливается по водяному знаку на created_at:
+    при обновлении досчитываются только строки новее users_watermark.
+    """
+    __tablename__ = "stats_snapshots"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    users_watermark: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    users_counted: Mapped[int] = mapped_column(Integer, default=0)  # Пользователи с created_at <= users_watermark
+    users_total: Mapped[int] = mapped_column(Integer, default=0)
+    active_day: Mapped[int] = mapped_column(Integer, default=0)
+    active_week: Mapped[int] = mapped_column(Integer, default=0)
+    events_upcoming: Mapped[int] = mapped_column(Integer, default=0)
+    events_live: Mapped[int] = mapped_column(Integer, default=0)
+    events_finished: Mapped[int] = mapped_column(Integer, default=0)
+    events_cancelled: Mapped[int] = mapped_column(Integer, default=0)
+    tickets_sold: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=0)
+    refreshed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<StatsSnapshot {self.refreshed_at}>"
+
+
+class ActivityBucket(Base):
+    """
+    Пользователи по часу последней активности
+    
+    Каждый пользователь учтен в корзине часа своего last_active: новая
+    активность переносит его из старой корзины в новую. Активные за период -
+    сумма корзин периода, строки users при этом не считаются.
+    """
+    __tablename__ = "activity_buckets"
+    
+    hour: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # Начало часа (UTC)
+    users: Mapped[int] = mapped_column(Integer, default=0)
+    
+    def __repr__(self):
+        return f"<ActivityBucket {self.hour}: {self.users}>"
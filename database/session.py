@@ -1,22 +1,75 @@
 """
 Настройка подключения к базе данных
 """
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, AsyncIterator, Any, Optional
 
 from config.settings import settings
+from utils.metrics import Counter, Gauge, Histogram, current_scope
+
+
+db_statements = Counter("db_statements_total", "SQL-запросов к БД")
+db_pool_wait = Histogram("db_pool_wait_seconds", "Ожидание свободного соединения пула")
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание свободного соединения"""
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0  # Запросов соединения, ожидающих сейчас
+    
+    @property
+    def capacity(self) -> int:
+        """Максимум одновременно выданных соединений (pool_size + max_overflow)"""
+        return self.size() + self._max_overflow
+    
+    def _do_get(self):
+        # Ожидание в очереди пула (или открытие overflow-соединения), без pre-ping
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            waited = time.perf_counter() - started
+            db_pool_wait.observe(waited)
+            scope = current_scope.get()
+            if scope is not None:
+                scope.pool_wait += waited
 
 
 # Создание асинхронного движка
 engine = create_async_engine(
     settings.database_url,
     echo=False,  # Логирование SQL запросов (для отладки)
+    poolclass=InstrumentedQueuePool,
     pool_pre_ping=True,  # Проверка соединения перед использованием
     pool_size=10,  # Размер пула соединений
     max_overflow=20  # Максимальное количество дополнительных соединений
 )
 
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Учесть SQL-запрос (и в замере обновления, если он идет)"""
+    db_statements.inc()
+    scope = current_scope.get()
+    if scope is not None:
+        scope.statements += 1
+
+
+# engine.pool читается при каждой выгрузке: dispose() заменяет пул
+Gauge("db_pool_checked_out", "Занятых соединений пула", lambda: engine.pool.checkedout())
+Gauge("db_pool_overflow", "Открытых сверх pool_size соединений", lambda: max(engine.pool.overflow(), 0))
+Gauge("db_pool_waiting", "Запросов соединения в ожидании", lambda: engine.pool.waiting)
+
 # Фабрика сессий
 async_session_maker = async_sessionmaker(
     engine,
@@ -24,6 +77,14 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Фабрика сессий для обработчиков только на чтение: транзакция открывается
+# как BEGIN READ ONLY, признак сбрасывается при возврате соединения в пул
+read_only_session_maker = async_sessionmaker(
+    engine.execution_options(postgresql_readonly=True),
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 
 class Base(DeclarativeBase):
     """Базовый класс для всех моделей"""
@@ -48,10 +109,83 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+class LazySession:
+    """
+    Сессия БД, создаваемая при первом обращении
+    
+    Проксирует атрибуты AsyncSession. Пока обработчик не обратился к БД,
+    ни сессия, ни соединение из пула не создаются, а в конце обновления
+    не нужен ни commit, ни rollback.
+    """
+    
+    def __init__(self, read_only: bool = False):
+        """
+        Args:
+            read_only: Работать в транзакции только на чтение и не делать commit
+        """
+        self.read_only = read_only
+        self._session: Optional[AsyncSession] = None
+    
+    @property
+    def session(self) -> AsyncSession:
+        """Настоящая сессия (создается при первом обращении)"""
+        if self._session is None:
+            maker = read_only_session_maker if self.read_only else async_session_maker
+            self._session = maker()
+        return self._session
+    
+    @property
+    def is_used(self) -> bool:
+        """Обращался ли обработчик к сессии"""
+        return self._session is not None
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+    
+    async def finish(self) -> None:
+        """Зафиксировать незавершенную транзакцию записи"""
+        if self._session is not None and not self.read_only and self._session.in_transaction():
+            await self._session.commit()
+    
+    async def close(self) -> None:
+        """Закрыть сессию, если она создавалась (незафиксированное откатывается)"""
+        if self._session is not None:
+            await self._session.close()
+
+
+@asynccontextmanager
+async def advisory_lock_session(
+    session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для advisory-блокировок PostgreSQL уровня сессии
+    
+    Соединение работает в AUTOCOMMIT (как блокировка миграций в env.py):
+    блокировка держится, пока открыто соединение, а запросы к нему не
+    оставляют транзакцию "idle in transaction", которая держала бы снимок
+    и мешала VACUUM все время, пока реплика ведущая.
+    
+    Args:
+        session_maker: Фабрика сессий (по умолчанию основная)
+        
+    Yields:
+        AsyncSession: Сессия на отдельном соединении в AUTOCOMMIT
+    """
+    async with (session_maker or async_session_maker)() as session:
+        await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        yield session
+
+
 async def init_db():
-    """Инициализация базы данных (создание таблиц)"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Инициализация базы данных: миграции Alembic до последней ревизии
+    
+    Безопасно вызывать с нескольких реплик одновременно (миграции идут
+    под advisory-блокировкой).
+    """
+    from database.migrate import upgrade_database
+    
+    await upgrade_database(engine)
 
 
 async def close_db():
@@ -0,0 +1,17 @@
+"""
+Модуль ИИ-контента
+"""
+from modules.ai_content.providers import TextProvider, FakeTextProvider, create_provider
+from modules.ai_content.generator import (
+    AIContentGenerator, AnnouncementProgressMessage, ai_generator, start_announcement
+)
+
+__all__ = [
+    'TextProvider',
+    'FakeTextProvider',
+    'create_provider',
+    'AIContentGenerator',
+    'AnnouncementProgressMessage',
+    'ai_generator',
+    'start_announcement',
+]
@@ -0,0 +1,239 @@
+"""
+Генерация анонсов событий
+"""
+import asyncio
+import hashlib
+import html
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from redis.asyncio import Redis
+from loguru import logger
+
+from config.settings import settings
+from database.models import Event
+from modules.ai_content.providers import TextProvider, create_provider
+from utils.redis_client import get_redis
+
+
+# Меняется вместе с промптом: старые тексты перестают попадать в кэш
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = (
+    "Ты - копирайтер онлайн-театра. Напиши анонс спектакля для Telegram-канала "
+    "на русском языке: 3-5 живых предложений, без хэштегов и без выдуманных фактов "
+    "о постановке. Дату и длительность упомяни один раз."
+)
+
+
+def announcement_key(event: Event, provider_name: str) -> str:
+    """Ключ кэша анонса: хэш всего, от чего зависит текст"""
+    source = "\n".join([
+        str(PROMPT_VERSION),
+        provider_name,
+        event.title,
+        event.description or "",
+        event.start_time.isoformat(),
+        str(event.duration_minutes),
+    ])
+    return f"ai:announcement:{hashlib.sha256(source.encode()).hexdigest()}"
+
+
+def announcement_prompt(event: Event) -> str:
+    """Запрос к модели по данным события"""
+    prompt = (
+        f"Спектакль: {event.title}\n"
+        f"Начало: {event.start_time.strftime('%d.%m.%Y %H:%M')}\n"
+        f"Длительность: {event.duration_minutes} мин\n"
+    )
+    if event.description:
+        prompt += f"Описание: {event.description}\n"
+    return prompt
+
+
+class AIContentGenerator:
+    """
+    Генерация анонсов через LLM
+    
+    Готовый текст кэшируется в Redis по хэшу названия, описания и времени
+    события, поэтому повторная генерация неизмененного события бесплатна.
+    Одновременных запросов к провайдеру не больше ai_concurrency, каждый
+    ограничен ai_timeout; одинаковые одновременные запросы схлопываются.
+    """
+    
+    def __init__(self, provider: Optional[TextProvider] = None, redis: Optional[Redis] = None):
+        """
+        Args:
+            provider: Провайдер LLM (по умолчанию по настройкам ai_provider)
+            redis: Клиент Redis (по умолчанию общий из utils.redis_client)
+        """
+        self._provider = provider
+        self._redis = redis
+        self._semaphore = asyncio.Semaphore(settings.ai_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    @property
+    def provider(self) -> TextProvider:
+        if self._provider is None:
+            self._provider = create_provider()
+        return self._provider
+    
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+    
+    async def get_cached(self, event: Event) -> Optional[str]:
+        """Готовый анонс события или None"""
+        try:
+            raw = await self.redis.get(announcement_key(event, self.provider.name))
+        except Exception as e:
+            logger.warning(f"Redis недоступен, кэш анонсов пропущен: {e}")
+            return None
+        return raw.decode() if raw is not None else None
+    
+    async def generate_announcement(
+        self,
+        event: Event,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+        force: bool = False
+    ) -> str:
+        """
+        Анонс события (из кэша или от провайдера)
+        
+        Args:
+            event: Событие
+            on_progress: Получает весь сгенерированный на данный момент текст
+            force: Сгенерировать заново, даже если анонс есть в кэше
+            
+        Returns:
+            str: Текст анонса (без HTML)
+        """
+        key = announcement_key(event, self.provider.name)
+        
+        if not force:
+            cached = await self.get_cached(event)
+            if cached is not None:
+                return cached
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        
+        try:
+            text = await self._generate(event, on_progress)
+            try:
+                await self.redis.set(key, text, ex=settings.ai_cache_ttl)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить анонс события {event.id} в Redis: {e}")
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _generate(self, event: Event, on_progress: Optional[Callable[[str], Awaitable[None]]]) -> str:
+        async with self._semaphore:
+            started = time.monotonic()
+            parts = []
+            
+            async with asyncio.timeout(settings.ai_timeout):
+                async for part in self.provider.stream(SYSTEM_PROMPT, announcement_prompt(event)):
+                    parts.append(part)
+                    if on_progress:
+                        await on_progress("".join(parts))
+        
+        text = "".join(parts).strip()
+        if not text:
+            raise ValueError("Провайдер вернул пустой текст")
+        
+        logger.info(f"Анонс события {event.id} сгенерирован за {time.monotonic() - started:.1f} с ({len(text)} символов)")
+        return text
+
+
+class AnnouncementProgressMessage:
+    """Сообщение в чате администратора, в которое дописывается анонс"""
+    
+    def __init__(self, bot: Bot, chat_id: int, message_id: int, title: str, interval: Optional[float] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.interval = interval or settings.ai_progress_interval
+        self._last_update = 0.0
+    
+    async def __call__(self, text: str) -> None:
+        """Показать текущий текст (не чаще interval: лимит Telegram на правку сообщений)"""
+        now = time.monotonic()
+        if now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        await self.show(f"{html.escape(text)}▌")
+    
+    async def show(self, body: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """Заменить текст сообщения"""
+        try:
+            await self.bot.edit_message_text(
+                f"🤖 <b>Анонс: {html.escape(self.title)}</b>\n\n{body}",
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                reply_markup=reply_markup
+            )
+        except Exception as e:
+            logger.debug(f"Не удалось обновить сообщение с анонсом: {e}")
+
+
+# Общий генератор процесса (семафор ограничивает запросы всего процесса)
+ai_generator = AIContentGenerator()
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_running_tasks: Set[asyncio.Task] = set()
+
+
+def start_announcement(
+    progress: AnnouncementProgressMessage,
+    event: Event,
+    reply_markup: InlineKeyboardMarkup,
+    force: bool = False
+) -> asyncio.Task:
+    """
+    Сгенерировать анонс в фоне, показывая текст по мере генерации
+    
+    Args:
+        progress: Сообщение для вывода
+        event: Событие
+        reply_markup: Клавиатура под готовым анонсом
+        force: Не брать анонс из кэша
+        
+    Returns:
+        asyncio.Task: Задача генерации
+    """
+    async def runner():
+        try:
+            text = await ai_generator.generate_announcement(event, on_progress=progress, force=force)
+        except TimeoutError:
+            await progress.show("⌛ Модель не ответила вовремя, попробуйте позже")
+            return
+        except Exception as e:
+            logger.exception(f"Ошибка генерации анонса события {event.id}: {e}")
+            await progress.show("❌ Не удалось сгенерировать анонс")
+            return
+        
+        await progress.show(html.escape(text), reply_markup=reply_markup)
+    
+    task = asyncio.create_task(runner())
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return task
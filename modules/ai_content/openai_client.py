@@ -0,0 +1,43 @@
+"""
+Клиент OpenAI
+"""
+from typing import AsyncIterator, Optional
+
+from openai import AsyncOpenAI
+
+from config.settings import settings
+from modules.ai_content.providers import TextProvider
+
+
+class OpenAIProvider(TextProvider):
+    """Генерация текста через OpenAI Chat Completions (потоком)"""
+    
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        """
+        Args:
+            api_key: Ключ API (по умолчанию из настроек)
+            model: Модель (по умолчанию из настроек)
+        """
+        self.model = model or settings.ai_model
+        self.name = f"openai:{self.model}"
+        # Общий таймаут генерации задает вызывающий, здесь - таймаут запроса и без повторов SDK
+        self.client = AsyncOpenAI(
+            api_key=api_key or settings.openai_api_key,
+            timeout=settings.ai_timeout,
+            max_retries=0
+        )
+    
+    async def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=settings.ai_max_tokens,
+            stream=True
+        )
+        
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
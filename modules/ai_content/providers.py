@@ -0,0 +1,64 @@
+"""
+Провайдеры генерации текста
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from config.settings import settings
+
+
+class TextProvider(ABC):
+    """Провайдер LLM: потоковая генерация текста по промпту"""
+    
+    # Входит в ключ кэша: тексты разных провайдеров и моделей не смешиваются
+    name: str = "provider"
+    
+    @abstractmethod
+    def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Сгенерировать текст
+        
+        Args:
+            system: Системный промпт
+            prompt: Запрос
+            
+        Yields:
+            str: Очередной фрагмент текста
+        """
+
+
+class FakeTextProvider(TextProvider):
+    """Локальный провайдер без сети (разработка и проверки)"""
+    
+    name = "fake"
+    
+    def __init__(self, text: Optional[str] = None, delay: float = 0.05):
+        """
+        Args:
+            text: Что «генерировать» (по умолчанию собирается из промпта)
+            delay: Пауза между фрагментами, сек
+        """
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+    
+    async def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        text = self.text or f"🎭 Анонс\n\n{prompt}"
+        
+        for word in text.split(" "):
+            await asyncio.sleep(self.delay)
+            yield word + " "
+
+
+def create_provider() -> TextProvider:
+    """Провайдер по настройкам (ai_provider)"""
+    if settings.ai_provider == "fake":
+        return FakeTextProvider()
+    
+    if settings.ai_provider == "openai":
+        from modules.ai_content.openai_client import OpenAIProvider
+        return OpenAIProvider()
+    
+    raise ValueError(f"Неизвестный провайдер ИИ: {settings.ai_provider}")
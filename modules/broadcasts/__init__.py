@@ -0,0 +1,7 @@
+"""
+Модуль рассылок
+"""
+from modules.broadcasts.service import BroadcastService
+from modules.broadcasts.engine import BroadcastEngine, BroadcastReport, start_broadcast, resume_broadcasts
+
+__all__ = ['BroadcastService', 'BroadcastEngine', 'BroadcastReport', 'start_broadcast', 'resume_broadcasts']
@@ -0,0 +1,373 @@
+"""
+Движок рассылок с ограничением скорости и возобновлением после сбоя
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramForbiddenError,
+    TelegramBadRequest,
+    TelegramNetworkError,
+    TelegramServerError,
+)
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.models import Broadcast, BroadcastStatus
+from database.session import async_session_maker, advisory_lock_session
+from modules.broadcasts.service import BroadcastService
+from utils.rate_limit import TokenBucket, telegram_bucket
+
+
+# Пространство имен advisory-блокировок рассылок в PostgreSQL
+BROADCAST_LOCK_NAMESPACE = 5001
+
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+@dataclass
+class BroadcastReport:
+    """Прогресс и итоги рассылки"""
+    broadcast_id: int
+    total: int
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    flood_waits: int = 0
+    finished: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    sent_this_run: int = 0
+    
+    @property
+    def processed(self) -> int:
+        """Обработано получателей"""
+        return self.sent + self.blocked + self.failed
+    
+    @property
+    def elapsed(self) -> float:
+        """Длительность текущего запуска в секундах"""
+        return time.monotonic() - self.started_at
+    
+    @property
+    def throughput(self) -> float:
+        """Скорость отправки текущего запуска, сообщений в секунду"""
+        elapsed = self.elapsed
+        return self.sent_this_run / elapsed if elapsed > 0 else 0.0
+    
+    def format(self) -> str:
+        """Текст для администратора"""
+        title = "✅ завершена" if self.finished else "⏳ идет"
+        minutes, seconds = divmod(int(self.elapsed), 60)
+        
+        return (
+            f"📣 <b>Рассылка #{self.broadcast_id}</b> {title}\n\n"
+            f"Обработано: {self.processed} из ~{self.total}\n"
+            f"Доставлено: {self.sent}\n"
+            f"Заблокировали бота: {self.blocked}\n"
+            f"Ошибок: {self.failed}\n"
+            f"Flood wait: {self.flood_waits}\n\n"
+            f"⚡ Скорость: {self.throughput:.1f} сообщ/с\n"
+            f"⏱ Время: {minutes} мин {seconds} с"
+        )
+
+
+class BroadcastEngine:
+    """
+    Отправка рассылки всем пользователям
+    
+    Получатели читаются из БД порциями по telegram_id (keyset-пагинация),
+    сообщения идут через общий token bucket. После каждой порции курсор
+    и счетчики сохраняются в одной транзакции, поэтому перезапуск
+    продолжает рассылку с места остановки. Одновременно одну рассылку
+    ведет только один процесс (advisory-блокировка PostgreSQL).
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None,
+        bucket: Optional[TokenBucket] = None,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_attempts: int = 5
+    ):
+        """
+        Args:
+            bot: Бот
+            session_maker: Фабрика сессий БД
+            bucket: Ограничитель скорости (по умолчанию общий для бота)
+            chunk_size: Размер порции получателей
+            concurrency: Одновременных запросов к Bot API
+            max_attempts: Попыток отправки одному получателю
+        """
+        self.bot = bot
+        self._session_maker = session_maker or async_session_maker
+        self.bucket = bucket or telegram_bucket
+        self.chunk_size = chunk_size or settings.broadcast_chunk_size
+        self.concurrency = concurrency or settings.broadcast_concurrency
+        self.max_attempts = max_attempts
+    
+    async def run(
+        self,
+        broadcast_id: int,
+        on_progress: Optional[Callable[[BroadcastReport], Awaitable[None]]] = None
+    ) -> Optional[BroadcastReport]:
+        """
+        Выполнить (или продолжить) рассылку
+        
+        Args:
+            broadcast_id: ID рассылки
+            on_progress: Вызывается после каждой порции
+            
+        Returns:
+            Optional[BroadcastReport]: Итоги или None, если рассылку ведет другой процесс
+        """
+        async with advisory_lock_session(self._session_maker) as lock_session:
+            locked = await lock_session.scalar(
+                select(func.pg_try_advisory_lock(BROADCAST_LOCK_NAMESPACE, broadcast_id))
+            )
+            if not locked:
+                logger.info(f"Рассылка {broadcast_id} уже выполняется другим процессом")
+                return None
+            
+            try:
+                return await self._run_locked(broadcast_id, on_progress)
+            finally:
+                await lock_session.scalar(
+                    select(func.pg_advisory_unlock(BROADCAST_LOCK_NAMESPACE, broadcast_id))
+                )
+    
+    async def _run_locked(
+        self,
+        broadcast_id: int,
+        on_progress: Optional[Callable[[BroadcastReport], Awaitable[None]]]
+    ) -> Optional[BroadcastReport]:
+        async with self._session_maker() as session:
+            service = BroadcastService(session)
+            broadcast = await service.get_broadcast(broadcast_id)
+            if not broadcast:
+                logger.warning(f"Рассылка {broadcast_id} не найдена")
+                return None
+            
+            report = BroadcastReport(
+                broadcast_id=broadcast_id,
+                total=broadcast.total_count,
+                sent=broadcast.sent_count,
+                blocked=broadcast.blocked_count,
+                failed=broadcast.failed_count,
+                flood_waits=broadcast.flood_wait_count,
+                finished=broadcast.status == BroadcastStatus.FINISHED
+            )
+            if report.finished:
+                return report
+            
+            text = broadcast.text
+            markup = self._build_markup(broadcast)
+            cursor = broadcast.last_user_id
+            await service.set_status(broadcast_id, BroadcastStatus.RUNNING)
+        
+        logger.info(f"Рассылка {broadcast_id} запущена с telegram_id > {cursor}")
+        
+        while True:
+            async with self._session_maker() as session:
+                recipients = await BroadcastService(session).get_recipients_chunk(cursor, self.chunk_size)
+            
+            if not recipients:
+                break
+            
+            results, flood_waits = await self.send_many(recipients, text, markup)
+            
+            blocked_ids = [chat_id for chat_id, result in zip(recipients, results) if result == BLOCKED]
+            sent = results.count(SENT)
+            failed = results.count(FAILED)
+            cursor = recipients[-1]
+            
+            async with self._session_maker() as session:
+                await BroadcastService(session).save_progress(
+                    broadcast_id,
+                    last_user_id=cursor,
+                    sent=sent,
+                    blocked_user_ids=blocked_ids,
+                    failed=failed,
+                    flood_waits=flood_waits
+                )
+            
+            report.sent += sent
+            report.sent_this_run += sent
+            report.blocked += len(blocked_ids)
+            report.failed += failed
+            report.flood_waits += flood_waits
+            
+            if on_progress:
+                await on_progress(report)
+        
+        async with self._session_maker() as session:
+            await BroadcastService(session).set_status(broadcast_id, BroadcastStatus.FINISHED)
+        
+        report.finished = True
+        logger.success(
+            f"Рассылка {broadcast_id} завершена: доставлено {report.sent}, "
+            f"заблокировали {report.blocked}, ошибок {report.failed}, "
+            f"{report.throughput:.1f} сообщ/с"
+        )
+        
+        if on_progress:
+            await on_progress(report)
+        
+        return report
+    
+    async def send_many(
+        self,
+        chat_ids: Sequence[int],
+        text: str,
+        markup: Optional[InlineKeyboardMarkup] = None
+    ) -> Tuple[List[str], int]:
+        """
+        Отправить сообщение порции получателей
+        
+        Args:
+            chat_ids: Получатели
+            text: Текст
+            markup: Клавиатура
+            
+        Returns:
+            Tuple[List[str], int]: Результат по каждому получателю (SENT, BLOCKED, FAILED)
+                и количество flood wait
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        flood_waits: List[int] = []
+        
+        async def send(chat_id: int) -> str:
+            async with semaphore:
+                return await self._send(chat_id, text, markup, flood_waits)
+        
+        results = await asyncio.gather(*(send(chat_id) for chat_id in chat_ids))
+        return list(results), len(flood_waits)
+    
+    async def _send(
+        self,
+        chat_id: int,
+        text: str,
+        markup: Optional[InlineKeyboardMarkup],
+        flood_waits: List[int]
+    ) -> str:
+        """Отправить сообщение одному получателю с учетом лимитов Telegram"""
+        for attempt in range(self.max_attempts):
+            await self.bucket.acquire()
+            
+            try:
+                await self.bot.send_message(chat_id, text, reply_markup=markup)
+                return SENT
+            except TelegramRetryAfter as e:
+                # Flood wait касается всего бота: останавливаем общий bucket
+                logger.warning(f"Flood wait {e.retry_after} с при рассылке")
+                flood_waits.append(e.retry_after)
+                await self.bucket.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramBadRequest as e:
+                logger.debug(f"Не удалось отправить сообщение {chat_id}: {e}")
+                return FAILED
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning(f"Ошибка Telegram при отправке {chat_id} (попытка {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        
+        return FAILED
+    
+    @staticmethod
+    def _build_markup(broadcast: Broadcast) -> Optional[InlineKeyboardMarkup]:
+        """Кнопка перехода к анонсируемому событию"""
+        if not broadcast.event_id:
+            return None
+        
+        return InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text="🎭 Подробнее", callback_data=f"event_{broadcast.event_id}")
+        ]])
+
+
+class BroadcastProgressMessage:
+    """Сообщение с прогрессом рассылки в чате администратора"""
+    
+    def __init__(self, bot: Bot, chat_id: int, interval: Optional[float] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.interval = interval or settings.broadcast_progress_interval
+        self._message_id: Optional[int] = None
+        self._last_update = 0.0
+    
+    async def __call__(self, report: BroadcastReport) -> None:
+        """Обновить сообщение (не чаще interval, итог отправляется всегда)"""
+        now = time.monotonic()
+        if not report.finished and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        
+        try:
+            if self._message_id is None:
+                message = await self.bot.send_message(self.chat_id, report.format())
+                self._message_id = message.message_id
+            else:
+                await self.bot.edit_message_text(
+                    report.format(),
+                    chat_id=self.chat_id,
+                    message_id=self._message_id
+                )
+        except Exception as e:
+            logger.warning(f"Не удалось обновить прогресс рассылки {report.broadcast_id}: {e}")
+
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_running_tasks: Set[asyncio.Task] = set()
+
+
+def start_broadcast(bot: Bot, broadcast_id: int, notify_chat_id: Optional[int] = None) -> asyncio.Task:
+    """
+    Запустить рассылку в фоне
+    
+    Args:
+        bot: Бот
+        broadcast_id: ID рассылки
+        notify_chat_id: Чат, куда присылать прогресс и итоговый отчет
+        
+    Returns:
+        asyncio.Task: Задача рассылки
+    """
+    progress = BroadcastProgressMessage(bot, notify_chat_id) if notify_chat_id else None
+    
+    async def runner():
+        try:
+            await BroadcastEngine(bot).run(broadcast_id, on_progress=progress)
+        except Exception as e:
+            logger.exception(f"Рассылка {broadcast_id} прервана: {e}")
+    
+    task = asyncio.create_task(runner())
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return task
+
+
+async def resume_broadcasts(bot: Bot) -> int:
+    """
+    Продолжить рассылки, прерванные остановкой процесса
+    
+    Returns:
+        int: Количество возобновленных рассылок
+    """
+    async with async_session_maker() as session:
+        broadcasts = await BroadcastService(session).get_unfinished_broadcasts()
+    
+    for broadcast in broadcasts:
+        start_broadcast(bot, broadcast.id, broadcast.created_by)
+    
+    if broadcasts:
+        logger.info(f"Возобновлено рассылок: {len(broadcasts)}")
+    return len(broadcasts)
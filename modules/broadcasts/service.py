@@ -0,0 +1,140 @@
+"""
+Сервис для работы с рассылками
+"""
+from typing import Optional, List, Sequence
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from database.models import Broadcast, BroadcastStatus, User
+
+
+class BroadcastService:
+    """Сервис для работы с рассылками"""
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def create_broadcast(
+        self,
+        text: str,
+        event_id: Optional[int] = None,
+        created_by: Optional[int] = None
+    ) -> Broadcast:
+        """
+        Создать рассылку
+        
+        Args:
+            text: Текст сообщения (HTML)
+            event_id: ID анонсируемого события
+            created_by: Telegram ID администратора
+            
+        Returns:
+            Broadcast: Созданная рассылка
+        """
+        total = await self.session.scalar(
+            select(func.count()).select_from(User).where(User.is_blocked.is_(False))
+        )
+        
+        broadcast = Broadcast(
+            text=text,
+            event_id=event_id,
+            created_by=created_by,
+            total_count=total or 0,
+            status=BroadcastStatus.PENDING
+        )
+        
+        self.session.add(broadcast)
+        await self.session.commit()
+        await self.session.refresh(broadcast)
+        
+        logger.info(f"Создана рассылка {broadcast.id} на {broadcast.total_count} получателей")
+        return broadcast
+    
+    async def get_broadcast(self, broadcast_id: int) -> Optional[Broadcast]:
+        """Получить рассылку по ID"""
+        return await self.session.get(Broadcast, broadcast_id)
+    
+    async def get_unfinished_broadcasts(self) -> List[Broadcast]:
+        """Получить рассылки, прерванные остановкой процесса"""
+        result = await self.session.execute(
+            select(Broadcast)
+            .where(Broadcast.status.in_([BroadcastStatus.PENDING, BroadcastStatus.RUNNING]))
+            .order_by(Broadcast.id)
+        )
+        return list(result.scalars().all())
+    
+    async def get_recipients_chunk(self, after_user_id: int, limit: int) -> List[int]:
+        """
+        Следующая порция получателей (keyset-пагинация по telegram_id)
+        
+        Args:
+            after_user_id: Последний обработанный telegram_id
+            limit: Размер порции
+            
+        Returns:
+            List[int]: telegram_id получателей по возрастанию
+        """
+        result = await self.session.execute(
+            select(User.telegram_id)
+            .where(User.telegram_id > after_user_id)
+            .where(User.is_blocked.is_(False))
+            .order_by(User.telegram_id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    async def save_progress(
+        self,
+        broadcast_id: int,
+        last_user_id: int,
+        sent: int,
+        blocked_user_ids: Sequence[int],
+        failed: int,
+        flood_waits: int
+    ) -> None:
+        """
+        Сохранить результат порции одной транзакцией
+        
+        Курсор и счетчики двигаются вместе с пометкой заблокировавших
+        бота пользователей, поэтому после падения рассылка продолжается
+        с первой необработанной порции.
+        """
+        if blocked_user_ids:
+            await self.session.execute(
+                update(User)
+                .where(User.telegram_id.in_(blocked_user_ids))
+                .values(is_blocked=True)
+            )
+        
+        await self.session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(
+                last_user_id=last_user_id,
+                sent_count=Broadcast.sent_count + sent,
+                blocked_count=Broadcast.blocked_count + len(blocked_user_ids),
+                failed_count=Broadcast.failed_count + failed,
+                flood_wait_count=Broadcast.flood_wait_count + flood_waits
+            )
+        )
+        await self.session.commit()
+    
+    async def set_status(self, broadcast_id: int, status: BroadcastStatus) -> None:
+        """Обновить статус рассылки (с отметками времени начала и окончания)"""
+        values = {"status": status}
+        now = datetime.utcnow()
+        
+        if status == BroadcastStatus.RUNNING:
+            values["started_at"] = func.coalesce(Broadcast.started_at, now)
+        elif status == BroadcastStatus.FINISHED:
+            values["finished_at"] = now
+        
+        await self.session.execute(
+            update(Broadcast).where(Broadcast.id == broadcast_id).values(**values)
+        )
+        await self.session.commit()
+        
+        logger.info(f"Статус рассылки {broadcast_id} изменен на {status}")
@@ -0,0 +1,7 @@
+"""
+Модуль контента
+"""
+from modules.content.service import ContentService
+from modules.content.publisher import ContentPublisher
+
+__all__ = ['ContentService', 'ContentPublisher']
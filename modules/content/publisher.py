@@ -0,0 +1,200 @@
+"""
+Публикация запланированных постов в канал
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.models import ContentPost
+from database.session import async_session_maker
+from modules.content.service import ContentService, CONTENT_CHANNEL
+from utils.rate_limit import RedisTokenBucket, TokenBucket, telegram_bucket
+from utils.redis_client import get_redis
+
+
+class ContentPublisher:
+    """
+    Публикует посты, у которых наступил scheduled_time
+    
+    Посты забираются пачками через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому публикаторы на нескольких репликах не публикуют пост дважды.
+    Между пачками публикатор спит до ближайшего scheduled_time (но не
+    дольше content_max_idle), а новый пост будит его через канал Redis.
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None,
+        bucket: Optional[TokenBucket] = None,
+        channel_bucket: Optional[TokenBucket] = None,
+        batch_size: Optional[int] = None,
+        max_attempts: int = 5
+    ):
+        """
+        Args:
+            bot: Бот
+            session_maker: Фабрика сессий БД
+            bucket: Общий ограничитель скорости бота
+            channel_bucket: Ограничитель скорости публикаций во все каналы (по умолчанию
+                свой bucket в Redis на каждый канал, общий для всех реплик)
+            batch_size: Постов в одной пачке
+            max_attempts: Попыток отправки одного поста
+        """
+        self.bot = bot
+        self._session_maker = session_maker or async_session_maker
+        self.bucket = bucket or telegram_bucket
+        self.channel_bucket = channel_bucket
+        self._channel_buckets: Dict[int, TokenBucket] = {}
+        self.batch_size = batch_size or settings.content_batch_size
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """Запустить публикацию"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Остановить публикацию"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def publish_due(self) -> int:
+        """
+        Опубликовать одну пачку наступивших постов
+        
+        Returns:
+            int: Количество забранных постов
+        """
+        async with self._session_maker() as session:
+            service = ContentService(session)
+            await service.fail_stale_claims(settings.content_claim_timeout)
+            posts = await service.claim_due_posts(self.batch_size)
+        
+        for post in posts:
+            await self._publish(post)
+        
+        return len(posts)
+    
+    async def _publish(self, post: ContentPost) -> None:
+        """Отправить пост и записать результат"""
+        channel_id = post.channel_id or settings.stream_channel_id
+        
+        try:
+            message = await self._send(post, channel_id)
+        except Exception as e:
+            logger.error(f"Пост {post.id} не опубликован: {e}")
+            async with self._session_maker() as session:
+                await ContentService(session).mark_failed(post.id, str(e))
+            return
+        
+        async with self._session_maker() as session:
+            await ContentService(session).mark_published(post.id, channel_id, message.message_id)
+        
+        logger.info(f"Пост {post.id} опубликован в {channel_id} (сообщение {message.message_id})")
+    
+    def _channel_bucket(self, channel_id: int) -> TokenBucket:
+        """Ограничитель публикаций в канал (лимит Telegram считается на канал)"""
+        if self.channel_bucket is not None:
+            return self.channel_bucket
+        
+        bucket = self._channel_buckets.get(channel_id)
+        if bucket is None:
+            bucket = RedisTokenBucket(
+                f"rate:channel:{channel_id}",
+                rate=settings.content_rate_per_minute / 60,
+                capacity=1
+            )
+            self._channel_buckets[channel_id] = bucket
+        return bucket
+    
+    async def _send(self, post: ContentPost, channel_id: int) -> Message:
+        """Отправить пост с учетом лимитов Telegram"""
+        channel_bucket = self._channel_bucket(channel_id)
+        for attempt in range(self.max_attempts):
+            await channel_bucket.acquire()
+            await self.bucket.acquire()
+            
+            try:
+                if post.content_type == "image":
+                    return await self.bot.send_photo(channel_id, post.content_url, caption=post.content_text)
+                if post.content_type == "video":
+                    return await self.bot.send_video(channel_id, post.content_url, caption=post.content_text)
+                return await self.bot.send_message(channel_id, post.content_text)
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood wait {e.retry_after} с при публикации поста {post.id}")
+                await self.bucket.pause(e.retry_after)
+                await channel_bucket.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if attempt + 1 == self.max_attempts:
+                    raise
+                logger.warning(f"Ошибка Telegram при публикации поста {post.id} (попытка {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        
+        raise RuntimeError(f"Flood wait не закончился за {self.max_attempts} попыток")
+    
+    async def _idle_delay(self) -> float:
+        """Сколько спать до ближайшего поста"""
+        async with self._session_maker() as session:
+            next_time = await ContentService(session).next_scheduled_time()
+        
+        if next_time is None:
+            return settings.content_max_idle
+        
+        delay = (next_time - datetime.utcnow()).total_seconds()
+        return min(max(delay, 0.0), settings.content_max_idle)
+    
+    async def _run(self) -> None:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(CONTENT_CHANNEL)
+        except Exception as e:
+            logger.warning(f"Канал новых постов недоступен, публикатор просыпается по таймеру: {e}")
+            pubsub = None
+        
+        try:
+            while True:
+                try:
+                    if await self.publish_due():
+                        # Пачка могла быть не последней
+                        continue
+                    delay = await self._idle_delay()
+                except Exception as e:
+                    logger.error(f"Ошибка публикации постов: {e}")
+                    delay = settings.content_max_idle
+                
+                await self._sleep(pubsub, delay)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+    
+    async def _sleep(self, pubsub, delay: float) -> None:
+        """Спать delay секунд или до оповещения о новом посте"""
+        if delay <= 0:
+            return
+        if pubsub is None:
+            await asyncio.sleep(delay)
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                if await pubsub.get_message(timeout=remaining) is not None:
+                    return
+        except Exception as e:
+            logger.warning(f"Ошибка канала новых постов: {e}")
+            await asyncio.sleep(max(deadline - loop.time(), 0.0))
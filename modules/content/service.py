@@ -0,0 +1,156 @@
+"""
+Сервис для работы с постами контента
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from database.models import ContentPost, ContentPostStatus
+from utils.redis_client import get_redis
+
+
+# Канал Redis, в который публикуются ID новых постов
+CONTENT_CHANNEL = "content:posts"
+
+
+class ContentService:
+    """Сервис для работы с постами контента"""
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def create_post(
+        self,
+        content_type: str,
+        content_text: Optional[str] = None,
+        content_url: Optional[str] = None,
+        scheduled_time: Optional[datetime] = None,
+        channel_id: Optional[int] = None
+    ) -> ContentPost:
+        """
+        Создать пост
+        
+        Args:
+            content_type: Тип контента (text, image, video)
+            content_text: Текст или подпись (HTML)
+            content_url: URL или file_id картинки/видео
+            scheduled_time: Время публикации (UTC, по умолчанию сейчас)
+            channel_id: Канал (по умолчанию канал трансляций)
+            
+        Returns:
+            ContentPost: Созданный пост
+        """
+        post = ContentPost(
+            content_type=content_type,
+            content_text=content_text,
+            content_url=content_url,
+            scheduled_time=scheduled_time or datetime.utcnow(),
+            channel_id=channel_id,
+            status=ContentPostStatus.PENDING.value
+        )
+        
+        self.session.add(post)
+        await self.session.commit()
+        await self.session.refresh(post)
+        
+        try:
+            # Будим публикатор, если пост раньше того, до которого он спит
+            await get_redis().publish(CONTENT_CHANNEL, post.id)
+        except Exception as e:
+            logger.warning(f"Не удалось оповестить публикатор о посте {post.id}: {e}")
+        
+        logger.info(f"Создан пост {post.id} ({content_type}) на {post.scheduled_time}")
+        return post
+    
+    async def claim_due_posts(self, limit: int) -> List[ContentPost]:
+        """
+        Забрать пачку постов, время публикации которых наступило
+        
+        Строки выбираются FOR UPDATE SKIP LOCKED и в той же транзакции
+        переводятся в PUBLISHING, поэтому параллельные публикаторы получают
+        разные посты и не ждут друг друга.
+        
+        Args:
+            limit: Размер пачки
+            
+        Returns:
+            List[ContentPost]: Забранные посты по scheduled_time
+        """
+        now = datetime.utcnow()
+        result = await self.session.execute(
+            select(ContentPost)
+            .where(ContentPost.status == ContentPostStatus.PENDING.value)
+            .where(ContentPost.scheduled_time <= now)
+            .order_by(ContentPost.scheduled_time)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        posts = list(result.scalars().all())
+        
+        for post in posts:
+            post.status = ContentPostStatus.PUBLISHING.value
+            post.claimed_at = now
+        
+        await self.session.commit()
+        return posts
+    
+    async def next_scheduled_time(self) -> Optional[datetime]:
+        """Время ближайшего ожидающего поста"""
+        return await self.session.scalar(
+            select(func.min(ContentPost.scheduled_time))
+            .where(ContentPost.status == ContentPostStatus.PENDING.value)
+        )
+    
+    async def mark_published(self, post_id: int, channel_id: int, message_id: int) -> None:
+        """Отметить пост опубликованным"""
+        await self.session.execute(
+            update(ContentPost)
+            .where(ContentPost.id == post_id)
+            .values(
+                status=ContentPostStatus.PUBLISHED.value,
+                channel_id=channel_id,
+                message_id=message_id,
+                published_at=datetime.utcnow(),
+                error=None
+            )
+        )
+        await self.session.commit()
+    
+    async def mark_failed(self, post_id: int, error: str) -> None:
+        """Отметить пост неопубликованным"""
+        await self.session.execute(
+            update(ContentPost)
+            .where(ContentPost.id == post_id)
+            .values(status=ContentPostStatus.FAILED.value, error=error[:1000])
+        )
+        await self.session.commit()
+    
+    async def fail_stale_claims(self, timeout: float) -> int:
+        """
+        Закрыть посты, забранные публикатором, который не отчитался
+        
+        Отправка могла и дойти до Telegram, поэтому такие посты не
+        возвращаются в очередь (это грозит дублем), а отмечаются failed.
+        
+        Args:
+            timeout: Сколько секунд пост может провести в PUBLISHING
+            
+        Returns:
+            int: Количество закрытых постов
+        """
+        result = await self.session.execute(
+            update(ContentPost)
+            .where(ContentPost.status == ContentPostStatus.PUBLISHING.value)
+            .where(ContentPost.claimed_at < datetime.utcnow() - timedelta(seconds=timeout))
+            .values(status=ContentPostStatus.FAILED.value, error="Публикатор не подтвердил отправку")
+            .returning(ContentPost.id)
+        )
+        post_ids = result.scalars().all()
+        await self.session.commit()
+        
+        if post_ids:
+            logger.warning(f"Посты без подтверждения публикации отмечены failed: {post_ids}")
+        return len(post_ids)
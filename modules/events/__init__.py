@@ -2,5 +2,7 @@
 Модуль событий
 """
 from modules.events.service import EventService
+from modules.events.cache import EventCache, event_cache
+from modules.events.scheduler import EventScheduler
 
-__all__ = ['EventService']
+__all__ = ['EventService', 'EventCache', 'event_cache', 'EventScheduler']
@@ -0,0 +1,266 @@
+"""
+Двухуровневый кэш событий: L1 в памяти процесса, L2 в Redis
+"""
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from loguru import logger
+
+from config.settings import settings
+from database.models import Event, EventStatus
+from utils.cache import TTLCache
+from utils.redis_client import get_redis
+
+
+UPCOMING_KEY = "events:upcoming:first"  # Первая страница афиши
+UPCOMING_COUNT_KEY = "events:upcoming:count"
+EVENTS_COUNT_KEY = "events:count"
+
+# Поколение ключа L2 живет дольше любой загрузки из БД; истечение безопасно:
+# INCR после него дает новое значение, и запись со старым поколением отклоняется
+GENERATION_TTL = 86400
+
+# Признак, что L2 недоступен и записывать в него не нужно
+_NO_L2 = object()
+
+
+def generation_key(key: str) -> str:
+    """Ключ счетчика поколений L2 для ключа кэша"""
+    return f"{key}:gen"
+
+
+def event_key(event_id: int) -> str:
+    """Ключ кэша для события"""
+    return f"event:{event_id}"
+
+
+def event_to_dict(event: Event) -> Dict[str, Any]:
+    """Сериализовать событие в JSON-совместимый словарь"""
+    return {
+        "id": event.id,
+        "title": event.title,
+        "description": event.description,
+        "poster_url": event.poster_url,
+        "start_time": event.start_time.isoformat(),
+        "duration_minutes": event.duration_minutes,
+        "price": str(event.price),
+        "max_viewers": event.max_viewers,
+        "reserved_seats": event.reserved_seats,
+        "sold_tickets": event.sold_tickets,
+        "revenue": str(event.revenue),
+        "version": event.version,
+        "stream_url": event.stream_url,
+        "invite_link": event.invite_link,
+        "status": event.status.value,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+def event_from_dict(data: Dict[str, Any]) -> Event:
+    """
+    Восстановить событие из словаря
+    
+    Возвращается новый объект, не привязанный к сессии, поэтому
+    изменять его и сохранять через сессию нельзя.
+    """
+    return Event(
+        id=data["id"],
+        title=data["title"],
+        description=data["description"],
+        poster_url=data["poster_url"],
+        start_time=datetime.fromisoformat(data["start_time"]),
+        duration_minutes=data["duration_minutes"],
+        price=Decimal(data["price"]),
+        max_viewers=data["max_viewers"],
+        reserved_seats=data.get("reserved_seats", 0),
+        sold_tickets=data.get("sold_tickets", 0),
+        revenue=Decimal(data.get("revenue", "0")),
+        version=data.get("version", 0),
+        stream_url=data["stream_url"],
+        invite_link=data["invite_link"],
+        status=EventStatus(data["status"]),
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+    )
+
+
+class EventCache:
+    """
+    Кэш чтений EventService
+    
+    Промах проверяет L1 (LRU с TTL в памяти), затем L2 (Redis) и только
+    потом вызывает загрузчик. Одновременные промахи по одному ключу
+    схлопываются в один запрос к БД (single-flight); если ведущий запрос
+    отменен, загрузку повторяет один из ожидающих. Значения хранятся
+    в виде словарей, чтобы не делить ORM-объекты между сессиями.
+    
+    Запись в L2 условная: вместе со значением читается счетчик поколений
+    ключа в Redis, который invalidate увеличивает на любой реплике, и
+    загруженное значение пишется, только если поколение не изменилось
+    (WATCH/MULTI). Иначе реплика, читавшая БД до чужого изменения, могла бы
+    записать устаревшее значение после чужой инвалидации.
+    """
+    
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        maxsize: Optional[int] = None,
+        l1_ttl: Optional[float] = None,
+        l2_ttl: Optional[int] = None,
+        use_redis: bool = True
+    ):
+        """
+        Args:
+            redis: Клиент Redis (по умолчанию общий из utils.redis_client)
+            maxsize: Размер L1
+            l1_ttl: TTL записей L1 в секундах
+            l2_ttl: TTL записей L2 в секундах
+            use_redis: Использовать ли L2
+        """
+        self._redis = redis
+        self.use_redis = use_redis
+        self.l2_ttl = l2_ttl or settings.event_cache_l2_ttl
+        self._l1 = TTLCache(
+            maxsize=maxsize or settings.event_cache_size,
+            ttl=l1_ttl or settings.event_cache_l1_ttl
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+    
+    @property
+    def redis(self) -> Optional[Redis]:
+        """Клиент L2 или None, если L2 отключен"""
+        if not self.use_redis:
+            return None
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Получить значение из кэша или загрузить его
+        
+        Args:
+            key: Ключ кэша
+            loader: Корутина-загрузчик, возвращающая JSON-совместимое значение или None
+            
+        Returns:
+            Any: Значение (None не кэшируется)
+        """
+        value = self._l1.get(key)
+        if value is not None:
+            return value
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Отменили ведущий запрос, а не этот: загрузку берет на себя ожидающий
+                return await self.get_or_load(key, loader)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(key, 0)
+        
+        try:
+            value, l2_generation = await self._l2_get(key)
+            if value is None:
+                value = await loader()
+                if value is not None and generation == self._generations.get(key, 0):
+                    await self._l2_set(key, value, l2_generation)
+            
+            # Пока шла загрузка, ключ могли инвалидировать: такое значение не кэшируем
+            if value is not None and generation == self._generations.get(key, 0):
+                self._l1.set(key, value)
+            
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Помечаем исключение полученным, даже если ожидающих не было
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Инвалидировать ключи в обоих уровнях
+        
+        Args:
+            keys: Ключи кэша
+        """
+        for key in keys:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._l1.pop(key)
+        
+        redis = self.redis
+        if redis is None or not keys:
+            return
+        
+        try:
+            # Новое поколение отклоняет запись значений, загруженных до изменения
+            async with redis.pipeline(transaction=True) as pipe:
+                for key in keys:
+                    pipe.incr(generation_key(key))
+                    pipe.expire(generation_key(key), GENERATION_TTL)
+                pipe.delete(*keys)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось инвалидировать кэш событий в Redis {keys}: {e}")
+    
+    def clear_local(self) -> None:
+        """Очистить L1"""
+        self._l1.clear()
+    
+    async def _l2_get(self, key: str) -> Tuple[Any, Any]:
+        """
+        Прочитать значение и его поколение из Redis (ошибки Redis не прерывают чтение из БД)
+        
+        Returns:
+            Tuple[Any, Any]: Значение или None и поколение (_NO_L2, если Redis недоступен)
+        """
+        redis = self.redis
+        if redis is None:
+            return None, _NO_L2
+        
+        try:
+            raw, generation = await redis.mget(key, generation_key(key))
+        except Exception as e:
+            logger.warning(f"Redis недоступен, чтение {key} из БД: {e}")
+            return None, _NO_L2
+        
+        return (json.loads(raw) if raw is not None else None), generation
+    
+    async def _l2_set(self, key: str, value: Any, generation: Any) -> None:
+        """Записать значение в Redis, если поколение ключа не изменилось с чтения"""
+        redis = self.redis
+        if redis is None or generation is _NO_L2:
+            return
+        
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(generation_key(key))
+                if await pipe.get(generation_key(key)) != generation:
+                    return
+                pipe.multi()
+                pipe.set(key, json.dumps(value), ex=self.l2_ttl)
+                await pipe.execute()
+        except WatchError:
+            logger.debug(f"{key} инвалидирован во время загрузки, в Redis не записан")
+        except Exception as e:
+            logger.warning(f"Не удалось записать {key} в Redis: {e}")
+
+
+# Общий кэш событий процесса
+event_cache = EventCache()
@@ -0,0 +1,339 @@
+"""
+Планировщик жизненного цикла событий: смена статусов и напоминания
+"""
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import Hashable, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.models import Event, EventStatus, Ticket
+from database.session import async_session_maker, advisory_lock_session
+from modules.broadcasts.engine import BroadcastEngine, SENT, BLOCKED
+from modules.events.service import EventService, EPOCH, SCHEDULE_CHANNEL
+from utils.redis_client import get_redis
+from utils.timer_wheel import TimerWheel
+
+
+# Advisory-блокировка ведущего планировщика в PostgreSQL
+SCHEDULER_LOCK_NAMESPACE = 5002
+SCHEDULER_LOCK_ID = 0
+
+# Действия таймеров
+GO_LIVE = "live"
+FINISH = "finish"
+REMIND = "remind"
+
+
+def event_timestamp(moment: datetime) -> float:
+    """Время события (naive UTC) в unix time"""
+    return (moment - EPOCH).total_seconds()
+
+
+def format_lead(minutes: int) -> str:
+    """«1 ч», «10 мин»"""
+    if minutes % 60 == 0:
+        return f"{minutes // 60} ч"
+    return f"{minutes} мин"
+
+
+class EventScheduler:
+    """
+    Переводит события UPCOMING → LIVE → FINISHED и напоминает о начале
+    
+    Расписание строится из start_time и duration_minutes в колесо таймеров
+    в памяти: таблица событий читается при старте, при получении роли
+    ведущего и раз в scheduler_resync_interval, а точечные изменения
+    (создание, смена статуса, удаление) приходят через канал Redis.
+    
+    Таймеры ведет одна реплика: та, что держит advisory-блокировку
+    PostgreSQL. Блокировка живет, пока живо соединение, поэтому при падении
+    ведущего ее подхватывает резервная реплика и пересобирает расписание.
+    Напоминание сначала отмечается в событии (reminded_before) и только
+    потом рассылается, так что смена ведущего не приводит к повторной рассылке.
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None,
+        engine: Optional[BroadcastEngine] = None,
+        reminders: Optional[List[int]] = None,
+        tick: Optional[float] = None
+    ):
+        """
+        Args:
+            bot: Бот
+            session_maker: Фабрика сессий БД
+            engine: Отправка сообщений с ограничением скорости
+            reminders: Напоминания, минут до начала
+            tick: Точность таймеров в секундах
+        """
+        self.bot = bot
+        self._session_maker = session_maker or async_session_maker
+        self.engine = engine or BroadcastEngine(bot, session_maker=self._session_maker)
+        self.reminders = sorted(reminders if reminders is not None else settings.reminder_minutes, reverse=True)
+        self.tick = tick or settings.scheduler_tick
+        self.wheel = TimerWheel(resolution=self.tick)
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._actions: Set[asyncio.Task] = set()
+    
+    async def start(self) -> None:
+        """Запустить планировщик"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Остановить планировщик (начатые рассылки напоминаний прерываются)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        for task in list(self._actions):
+            task.cancel()
+        await asyncio.gather(*self._actions, return_exceptions=True)
+    
+    async def rebuild(self) -> int:
+        """
+        Пересобрать расписание из БД
+        
+        Returns:
+            int: Количество активных событий
+        """
+        async with self._session_maker() as session:
+            result = await session.scalars(
+                select(Event).where(Event.status.in_([EventStatus.UPCOMING, EventStatus.LIVE]))
+            )
+            events = result.all()
+        
+        self.wheel.clear()
+        for event in events:
+            self._schedule(event)
+        
+        logger.info(f"Расписание событий пересобрано: событий {len(events)}, таймеров {len(self.wheel)}")
+        return len(events)
+    
+    async def reload_event(self, event_id: int) -> None:
+        """Перечитать одно событие и переставить его таймеры"""
+        async with self._session_maker() as session:
+            event = await session.scalar(select(Event).where(Event.id == event_id))
+        
+        self._cancel(event_id)
+        if event is not None:
+            self._schedule(event)
+    
+    def _schedule(self, event: Event) -> None:
+        """Поставить таймеры события по его статусу"""
+        start = event_timestamp(event.start_time)
+        
+        if event.status == EventStatus.UPCOMING:
+            now = time.time()
+            pending = [
+                minutes for minutes in self.reminders
+                if event.reminded_before is None or minutes < event.reminded_before
+            ]
+            # Из пропущенных (например, за время простоя) напоминаний отправляем только последнее
+            overdue = [minutes for minutes in pending if start - minutes * 60 <= now]
+            for minutes in pending:
+                if start > now and (minutes not in overdue or minutes == overdue[-1]):
+                    self.wheel.add((REMIND, event.id, minutes), start - minutes * 60)
+            
+            self.wheel.add((GO_LIVE, event.id), start)
+            
+        elif event.status == EventStatus.LIVE:
+            self.wheel.add((FINISH, event.id), start + event.duration_minutes * 60)
+    
+    def _cancel(self, event_id: int) -> None:
+        """Снять все таймеры события"""
+        self.wheel.cancel((GO_LIVE, event_id))
+        self.wheel.cancel((FINISH, event_id))
+        for minutes in self.reminders:
+            self.wheel.cancel((REMIND, event_id, minutes))
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with advisory_lock_session(self._session_maker) as lock_session:
+                    locked = await lock_session.scalar(
+                        select(func.pg_try_advisory_lock(SCHEDULER_LOCK_NAMESPACE, SCHEDULER_LOCK_ID))
+                    )
+                    if locked:
+                        try:
+                            await self._lead(lock_session)
+                        finally:
+                            self.is_leader = False
+                            await self._unlock(lock_session)
+            except Exception as e:
+                logger.error(f"Ошибка планировщика событий: {e}")
+            
+            await asyncio.sleep(settings.scheduler_lease_interval)
+    
+    async def _lead(self, lock_session: AsyncSession) -> None:
+        """Вести расписание, пока держится блокировка"""
+        self.is_leader = True
+        logger.info("📅 Планировщик событий: эта реплика ведущая")
+        
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(SCHEDULE_CHANNEL)
+        except Exception as e:
+            logger.warning(f"Канал изменений расписания недоступен, только периодическая пересборка: {e}")
+            pubsub = None
+        
+        try:
+            await self.rebuild()
+            loop = asyncio.get_running_loop()
+            next_heartbeat = loop.time() + settings.scheduler_lease_interval
+            next_resync = loop.time() + settings.scheduler_resync_interval
+            
+            while True:
+                for key, _ in self.wheel.advance(time.time()):
+                    self._fire(key)
+                
+                for event_id in await self._wait_changes(pubsub):
+                    await self.reload_event(event_id)
+                
+                now = loop.time()
+                if now >= next_heartbeat:
+                    # Разрыв соединения снимает блокировку: ошибка здесь завершает ведение
+                    await lock_session.execute(select(1))
+                    next_heartbeat = now + settings.scheduler_lease_interval
+                if now >= next_resync:
+                    await self.rebuild()
+                    next_resync = now + settings.scheduler_resync_interval
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+    
+    async def _wait_changes(self, pubsub) -> Set[int]:
+        """Подождать один тик изменений расписания из Redis"""
+        if pubsub is None:
+            await asyncio.sleep(self.tick)
+            return set()
+        
+        changed: Set[int] = set()
+        timeout = self.tick
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=timeout)
+                if message is None:
+                    break
+                changed.add(int(message["data"]))
+                timeout = 0.0
+        except Exception as e:
+            logger.warning(f"Ошибка канала изменений расписания: {e}")
+            await asyncio.sleep(self.tick)
+        
+        return changed
+    
+    @staticmethod
+    async def _unlock(lock_session: AsyncSession) -> None:
+        try:
+            await lock_session.scalar(
+                select(func.pg_advisory_unlock(SCHEDULER_LOCK_NAMESPACE, SCHEDULER_LOCK_ID))
+            )
+        except Exception:
+            # Соединение уже закрыто - блокировка снята вместе с ним
+            pass
+    
+    def _fire(self, key: Hashable) -> None:
+        """Выполнить действие таймера в фоне, не задерживая остальные таймеры"""
+        task = asyncio.create_task(self._handle(key))
+        self._actions.add(task)
+        task.add_done_callback(self._actions.discard)
+    
+    async def _handle(self, key: Hashable) -> None:
+        action, event_id = key[0], key[1]
+        
+        try:
+            if action == GO_LIVE:
+                await self._transition(event_id, EventStatus.LIVE, EventStatus.UPCOMING)
+            elif action == FINISH:
+                await self._transition(event_id, EventStatus.FINISHED, EventStatus.LIVE)
+            elif action == REMIND:
+                await self.remind(event_id, key[2])
+        except Exception as e:
+            logger.exception(f"Ошибка действия {action} события {event_id}: {e}")
+    
+    async def _transition(self, event_id: int, status: EventStatus, from_status: EventStatus) -> None:
+        async with self._session_maker() as session:
+            changed = await EventService(session).update_event_status(
+                event_id, status, from_statuses=[from_status]
+            )
+        
+        if changed:
+            logger.info(f"Планировщик: событие {event_id} {from_status.value} → {status.value}")
+            await self.reload_event(event_id)
+    
+    async def remind(self, event_id: int, minutes: int) -> int:
+        """
+        Напомнить владельцам билетов о скором начале события
+        
+        Args:
+            event_id: ID события
+            minutes: За сколько минут до начала напоминание
+            
+        Returns:
+            int: Доставлено сообщений (0, если напоминание уже отправлялось)
+        """
+        async with self._session_maker() as session:
+            result = await session.execute(
+                update(Event)
+                .where(Event.id == event_id)
+                .where(Event.status == EventStatus.UPCOMING)
+                .where(or_(Event.reminded_before.is_(None), Event.reminded_before > minutes))
+                .values(reminded_before=minutes)
+                .returning(Event.title, Event.start_time)
+            )
+            row = result.one_or_none()
+            await session.commit()
+        
+        if row is None:
+            return 0
+        
+        title, start_time = row
+        # Запоздавшее (после простоя) напоминание называет реальный срок
+        remaining = math.ceil((event_timestamp(start_time) - time.time()) / 60)
+        text = f"⏰ Через {format_lead(max(1, min(minutes, remaining)))} начнется спектакль «{title}»"
+        markup = InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text="🎭 Подробнее", callback_data=f"event_{event_id}")
+        ]])
+        
+        cursor = 0
+        sent = blocked = 0
+        while True:
+            async with self._session_maker() as session:
+                result = await session.scalars(
+                    select(Ticket.user_id)
+                    .where(Ticket.event_id == event_id)
+                    .where(Ticket.user_id > cursor)
+                    .order_by(Ticket.user_id)
+                    .limit(self.engine.chunk_size)
+                )
+                recipients = result.all()
+            
+            if not recipients:
+                break
+            
+            results, _ = await self.engine.send_many(recipients, text, markup)
+            sent += results.count(SENT)
+            blocked += results.count(BLOCKED)
+            cursor = recipients[-1]
+        
+        logger.info(
+            f"Напоминание за {format_lead(minutes)} о событии {event_id}: "
+            f"доставлено {sent}, заблокировали бота {blocked}"
+        )
+        return sent
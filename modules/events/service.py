@@ -1,21 +1,67 @@
 """
 Сервис для работы с событиями (спектаклями)
 """
-from typing import Optional, List
-from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, List, Tuple
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
+from sqlalchemy import select, func, tuple_, Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
+from config.settings import settings
 from database.models import Event, EventStatus
+from modules.events.cache import (
+    EventCache, event_cache, event_key, event_to_dict, event_from_dict,
+    UPCOMING_KEY, UPCOMING_COUNT_KEY, EVENTS_COUNT_KEY
+)
+from modules.tickets.showtime import showtime
+from utils.redis_client import get_redis
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# Канал Redis, в который публикуются ID событий с измененным расписанием
+SCHEDULE_CHANNEL = "events:schedule"
+
+
+def encode_cursor(event: Event) -> str:
+    """
+    Курсор страницы: позиция события в порядке (start_time, id)
+    
+    Время кодируется в микросекундах, чтобы курсор точно совпадал
+    со значением в БД, а числа пишутся в hex ради короткой callback_data.
+    """
+    micros = (event.start_time - EPOCH) // timedelta(microseconds=1)
+    return f"{micros:x}.{event.id:x}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Разобрать курсор
+    
+    Raises:
+        ValueError, OverflowError: Курсор поврежден
+    """
+    micros, event_id = cursor.split(".")
+    return EPOCH + timedelta(microseconds=int(micros, 16)), int(event_id, 16)
+
+
+@dataclass
+class EventPage:
+    """Страница событий"""
+    events: List[Event] = field(default_factory=list)
+    total: int = 0
+    next_cursor: Optional[str] = None  # Курсор для кнопки «вперед»
+    prev_cursor: Optional[str] = None  # Курсор для кнопки «назад»
 
 
 class EventService:
     """Сервис для работы с событиями"""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cache: Optional[EventCache] = None):
         self.session = session
+        self.cache = cache if cache is not None else event_cache
     
     async def create_event(
         self,
@@ -50,72 +96,274 @@ class EventService:
             price=price,
             max_viewers=max_viewers,
             poster_url=poster_url,
+            reserved_seats=0,
+            sold_tickets=0,
+            revenue=0,
+            version=1,
             status=EventStatus.UPCOMING
         )
         
         self.session.add(event)
         await self.session.commit()
         await self.session.refresh(event)
+        await self.cache.invalidate(UPCOMING_KEY, UPCOMING_COUNT_KEY, EVENTS_COUNT_KEY)
+        await self._publish_schedule_change(event.id)
         
         logger.info(f"Создано событие: {event.title} (ID: {event.id})")
         return event
     
     async def get_event(self, event_id: int) -> Optional[Event]:
-        """Получить событие по ID"""
-        result = await self.session.execute(
-            select(Event).where(Event.id == event_id)
+        """
+        Получить событие по ID (через кэш)
+        
+        Возвращаемый объект не привязан к сессии и предназначен только для чтения.
+        """
+        async def load() -> Optional[dict]:
+            event = await self._load_event(event_id)
+            return event_to_dict(event) if event else None
+        
+        data = await self.cache.get_or_load(event_key(event_id), load)
+        return event_from_dict(data) if data else None
+    
+    async def get_upcoming_events(
+        self,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: Optional[int] = None
+    ) -> EventPage:
+        """
+        Получить страницу предстоящих событий
+        
+        Первая страница читается через кэш, остальные - keyset-запросом
+        по индексу (start_time, id), поэтому стоимость не зависит от
+        номера страницы и размера архива.
+        
+        Args:
+            cursor: Курсор из предыдущей страницы (None - первая страница)
+            backward: Листать назад от курсора
+            limit: Размер страницы
+            
+        Returns:
+            EventPage: Страница
+        """
+        limit = limit or settings.events_page_size
+        total = await self.count_upcoming_events()
+        
+        if cursor is None:
+            async def load() -> dict:
+                events, next_cursor, _ = await self._get_page(self._upcoming_query(), None, False, limit)
+                return {"events": [event_to_dict(event) for event in events], "next": next_cursor}
+            
+            data = await self.cache.get_or_load(UPCOMING_KEY, load)
+            
+            # Страница могла устареть в пределах TTL: начавшиеся события отбрасываем
+            now = datetime.utcnow()
+            events = [event_from_dict(item) for item in data["events"]]
+            return EventPage(
+                events=[event for event in events if event.start_time > now],
+                total=total,
+                next_cursor=data["next"]
+            )
+        
+        events, next_cursor, prev_cursor = await self._get_page(
+            self._upcoming_query(), cursor, backward, limit
         )
-        return result.scalar_one_or_none()
+        return EventPage(events, total, next_cursor, prev_cursor)
     
-    async def get_upcoming_events(self) -> List[Event]:
-        """Получить список предстоящих событий"""
-        result = await self.session.execute(
+    async def count_upcoming_events(self) -> int:
+        """Количество предстоящих событий (через кэш)"""
+        async def load() -> int:
+            return await self.session.scalar(
+                self._upcoming_query().with_only_columns(func.count()).order_by(None)
+            )
+        
+        return await self.cache.get_or_load(UPCOMING_COUNT_KEY, load)
+    
+    async def get_all_events(
+        self,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: Optional[int] = None
+    ) -> EventPage:
+        """
+        Получить страницу всех событий, новые первыми
+        
+        Args:
+            cursor: Курсор из предыдущей страницы (None - первая страница)
+            backward: Листать назад от курсора
+            limit: Размер страницы
+            
+        Returns:
+            EventPage: Страница
+        """
+        limit = limit or settings.events_page_size
+        total = await self.count_events()
+        
+        events, next_cursor, prev_cursor = await self._get_page(
+            select(Event), cursor, backward, limit, descending=True
+        )
+        return EventPage(events, total, next_cursor, prev_cursor)
+    
+    async def count_events(self) -> int:
+        """Количество всех событий (через кэш)"""
+        async def load() -> int:
+            return await self.session.scalar(select(func.count()).select_from(Event))
+        
+        return await self.cache.get_or_load(EVENTS_COUNT_KEY, load)
+    
+    @staticmethod
+    def _upcoming_query() -> Select:
+        """Запрос предстоящих событий"""
+        return (
             select(Event)
             .where(Event.status == EventStatus.UPCOMING)
             .where(Event.start_time > datetime.utcnow())
-            .order_by(Event.start_time)
         )
-        return list(result.scalars().all())
     
-    async def get_all_events(self) -> List[Event]:
-        """Получить все события"""
+    async def _get_page(
+        self,
+        query: Select,
+        cursor: Optional[str],
+        backward: bool,
+        limit: int,
+        descending: bool = False
+    ) -> Tuple[List[Event], Optional[str], Optional[str]]:
+        """
+        Выбрать страницу keyset-запросом по (start_time, id)
+        
+        Читается limit + 1 строка: лишняя строка означает, что в направлении
+        чтения есть еще страница.
+        
+        Args:
+            query: Запрос событий без сортировки
+            cursor: Курсор (None - первая страница)
+            backward: Листать назад от курсора
+            limit: Размер страницы
+            descending: Порядок списка от поздних событий к ранним
+            
+        Returns:
+            Tuple[List[Event], Optional[str], Optional[str]]: События, курсоры вперед и назад
+        """
+        base_query = query
+        key = tuple_(Event.start_time, Event.id)
+        scan_descending = descending != backward
+        
+        if cursor is not None:
+            try:
+                position = tuple_(*decode_cursor(cursor))
+            except (ValueError, OverflowError):
+                logger.warning(f"Поврежденный курсор страницы событий: {cursor}")
+                return await self._get_page(query, None, False, limit, descending)
+            query = query.where(key < position if scan_descending else key > position)
+        
+        if scan_descending:
+            query = query.order_by(Event.start_time.desc(), Event.id.desc())
+        else:
+            query = query.order_by(Event.start_time, Event.id)
+        
+        result = await self.session.execute(query.limit(limit + 1))
+        events = list(result.scalars().all())
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        if not events:
+            # Соседние события удалили или они начались: возвращаемся к первой странице
+            if cursor is not None:
+                return await self._get_page(base_query, None, False, limit, descending)
+            return [], None, None
+        
+        if backward:
+            events.reverse()
+            return events, encode_cursor(events[-1]), encode_cursor(events[0]) if has_more else None
+        
+        next_cursor = encode_cursor(events[-1]) if has_more else None
+        prev_cursor = encode_cursor(events[0]) if cursor is not None else None
+        return events, next_cursor, prev_cursor
+    
+    async def _load_event(self, event_id: int) -> Optional[Event]:
+        """Загрузить событие из БД в текущую сессию (для изменений)"""
         result = await self.session.execute(
-            select(Event).order_by(Event.start_time.desc())
+            select(Event).where(Event.id == event_id)
         )
-        return list(result.scalars().all())
+        return result.scalar_one_or_none()
     
-    async def update_event_status(self, event_id: int, status: EventStatus) -> bool:
-        """Обновить статус события"""
-        event = await self.get_event(event_id)
-        if not event:
+    async def update_event_status(
+        self,
+        event_id: int,
+        status: EventStatus,
+        from_statuses: Optional[Iterable[EventStatus]] = None
+    ) -> bool:
+        """
+        Обновить статус события
+        
+        Переход в LIVE включает режим показа (владельцы билетов и ссылка
+        загружаются в Redis), FINISHED и CANCELLED его выключают.
+        
+        Args:
+            event_id: ID события
+            status: Новый статус
+            from_statuses: Разрешенные текущие статусы (по умолчанию любые)
+            
+        Returns:
+            bool: True, если статус изменен
+        """
+        result = await self.session.execute(
+            select(Event).where(Event.id == event_id).with_for_update()
+        )
+        event = result.scalar_one_or_none()
+        if not event or (from_statuses is not None and event.status not in from_statuses):
+            await self.session.commit()
             return False
         
         event.status = status
+        event.version = Event.version + 1
         await self.session.commit()
+        await self.cache.invalidate(event_key(event_id), UPCOMING_KEY, UPCOMING_COUNT_KEY)
+        
+        if status == EventStatus.LIVE:
+            await showtime.start(self.session, event)
+        elif status in (EventStatus.FINISHED, EventStatus.CANCELLED):
+            await showtime.stop(event_id)
+        await self._publish_schedule_change(event_id)
         
         logger.info(f"Статус события {event_id} изменен на {status}")
         return True
     
     async def set_stream_link(self, event_id: int, invite_link: str) -> bool:
         """Установить ссылку на трансляцию"""
-        event = await self.get_event(event_id)
+        event = await self._load_event(event_id)
         if not event:
             return False
         
         event.invite_link = invite_link
+        event.version = Event.version + 1
         await self.session.commit()
+        await self.cache.invalidate(event_key(event_id), UPCOMING_KEY)
+        await showtime.set_invite_link(event_id, invite_link)
         
         logger.info(f"Установлена ссылка на трансляцию для события {event_id}")
         return True
     
     async def delete_event(self, event_id: int) -> bool:
         """Удалить событие"""
-        event = await self.get_event(event_id)
+        event = await self._load_event(event_id)
         if not event:
             return False
         
         await self.session.delete(event)
         await self.session.commit()
+        await self.cache.invalidate(event_key(event_id), UPCOMING_KEY, UPCOMING_COUNT_KEY, EVENTS_COUNT_KEY)
+        await showtime.stop(event_id)
+        await self._publish_schedule_change(event_id)
         
         logger.info(f"Событие {event_id} удалено")
         return True
+    
+    @staticmethod
+    async def _publish_schedule_change(event_id: int) -> None:
+        """Сообщить планировщику жизненного цикла, что расписание события изменилось"""
+        try:
+            await get_redis().publish(SCHEDULE_CHANNEL, event_id)
+        except Exception as e:
+            # Планировщик подхватит изменение при периодической пересборке
+            logger.warning(f"Не удалось оповестить планировщик о событии {event_id}: {e}")
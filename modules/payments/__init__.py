@@ -0,0 +1,22 @@
+"""
+Модуль платежей
+"""
+from modules.payments.service import PaymentService, PaymentNotification, PaymentBatchResult, parse_notification
+from modules.payments.checkout import PaymentLink, PaymentError, create_payment, payments_enabled, close_payments_client
+from modules.payments.ingest import PaymentIngestor
+from modules.payments.webhook import PaymentWebhookHandler, PaymentWebhookServer
+
+__all__ = [
+    'PaymentService',
+    'PaymentNotification',
+    'PaymentBatchResult',
+    'parse_notification',
+    'PaymentLink',
+    'PaymentError',
+    'create_payment',
+    'payments_enabled',
+    'close_payments_client',
+    'PaymentIngestor',
+    'PaymentWebhookHandler',
+    'PaymentWebhookServer',
+]
@@ -0,0 +1,104 @@
+"""
+Создание платежей ЮKassa для заказов
+
+Платеж создается через REST API ЮKassa на общем aiohttp-клиенте: SDK
+yookassa синхронный и заблокировал бы event loop на время запроса.
+Ключ идемпотентности привязан к заказу, поэтому повторное нажатие
+"Купить" возвращает тот же платеж и ту же ссылку, а не создает новый.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+from loguru import logger
+
+from config.settings import settings
+from database.models import Order
+from modules.payments.service import CURRENCY
+
+
+# Описание платежа в ЮKassa ограничено 128 символами
+DESCRIPTION_LIMIT = 128
+
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+class PaymentError(Exception):
+    """ЮKassa не создала платеж"""
+
+
+@dataclass(frozen=True)
+class PaymentLink:
+    """Созданный платеж и ссылка на оплату"""
+    payment_id: str
+    confirmation_url: str
+
+
+def payments_enabled() -> bool:
+    """Настроен ли магазин ЮKassa"""
+    return bool(settings.yukassa_shop_id and settings.yukassa_secret_key and settings.yukassa_return_url)
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            base_url=settings.yukassa_api_url,
+            auth=aiohttp.BasicAuth(settings.yukassa_shop_id, settings.yukassa_secret_key),
+            timeout=aiohttp.ClientTimeout(total=settings.yukassa_timeout)
+        )
+    return _session
+
+
+async def create_payment(order: Order, title: str) -> PaymentLink:
+    """
+    Создать платеж за заказ (или получить уже созданный)
+    
+    Args:
+        order: Заказ в статусе PENDING
+        title: Название события для описания платежа
+        
+    Returns:
+        PaymentLink: ID платежа и ссылка на оплату
+        
+    Raises:
+        PaymentError: ЮKassa недоступна или отклонила запрос
+    """
+    payload = {
+        "amount": {"value": f"{order.amount:.2f}", "currency": CURRENCY},
+        "capture": True,
+        "confirmation": {"type": "redirect", "return_url": settings.yukassa_return_url},
+        "description": f"Заказ №{order.id}: {title}"[:DESCRIPTION_LIMIT],
+        # По metadata.order_id уведомление находит заказ (parse_notification)
+        "metadata": {"order_id": order.id}
+    }
+    
+    try:
+        async with _get_session().post(
+            "/v3/payments",
+            json=payload,
+            headers={"Idempotence-Key": f"order-{order.id}"}
+        ) as response:
+            data = await response.json(content_type=None)
+            if response.status != 200:
+                raise PaymentError(f"ЮKassa ответила {response.status}: {data.get('description', data)}")
+    except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+        raise PaymentError(f"ЮKassa недоступна: {e!r}") from e
+    
+    confirmation_url = (data.get("confirmation") or {}).get("confirmation_url")
+    if not data.get("id") or not confirmation_url:
+        raise PaymentError(f"В ответе ЮKassa нет платежа или ссылки: {data}")
+    
+    logger.info(f"Платеж {data['id']} за заказ {order.id} создан ({data.get('status')})")
+    return PaymentLink(payment_id=data["id"], confirmation_url=confirmation_url)
+
+
+async def close_payments_client() -> None:
+    """Закрыть HTTP-клиент ЮKassa"""
+    global _session
+    
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -0,0 +1,258 @@
+"""
+Очередь уведомлений ЮKassa и их пакетная обработка
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.models import Event, Order
+from database.session import async_session_maker
+from modules.broadcasts.engine import BroadcastEngine
+from modules.payments.service import PaymentService, PaymentNotification, PaymentBatchResult, parse_notification
+from utils.redis_client import get_redis
+
+
+# Поток Redis с принятыми уведомлениями и группа его читателей
+PAYMENTS_STREAM = "payments:notifications"
+PAYMENTS_GROUP = "ingest"
+# Уведомления, которые не удалось применить (разбор вручную)
+PAYMENTS_DEAD_STREAM = "payments:dead"
+
+
+def seen_key(notification: PaymentNotification) -> str:
+    """Ключ принятого уведомления"""
+    return f"payments:seen:{notification.key}"
+
+
+class PaymentIngestor:
+    """
+    Прием уведомлений ЮKassa
+    
+    Обработчик HTTP только кладет уведомление в поток Redis и сразу отвечает,
+    а применяют уведомления пачками читатели группы потока (по одному на
+    реплику). Повторы отсекаются трижды: ключом payments:seen при приеме,
+    схлопыванием пачки по payment_id и проверкой статуса заказа под
+    блокировкой. Запись потока подтверждается (XACK) только после commit,
+    поэтому уведомления упавшей реплики забирает другая (XAUTOCLAIM).
+    """
+    
+    def __init__(
+        self,
+        bot: Optional[Bot] = None,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None,
+        redis: Optional[Redis] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Args:
+            bot: Бот для уведомления покупателей об оплате (None - без уведомлений)
+            session_maker: Фабрика сессий БД
+            redis: Клиент Redis (по умолчанию общий из utils.redis_client)
+            batch_size: Уведомлений в одной транзакции
+        """
+        self.bot = bot
+        self._session_maker = session_maker or async_session_maker
+        self._redis = redis
+        self.batch_size = batch_size or settings.payments_batch_size
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = BroadcastEngine(bot, session_maker=self._session_maker) if bot else None
+        self._task: Optional[asyncio.Task] = None
+        self._receipts: Set[asyncio.Task] = set()
+    
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+    
+    async def enqueue(self, notification: PaymentNotification, raw: bytes) -> bool:
+        """
+        Поставить уведомление в очередь
+        
+        Args:
+            notification: Разобранное уведомление
+            raw: Тело запроса (сохраняется в потоке как есть)
+            
+        Returns:
+            bool: False, если уведомление уже было принято
+        """
+        key = seen_key(notification)
+        if not await self.redis.set(key, 1, nx=True, ex=settings.payments_dedupe_ttl):
+            return False
+        
+        try:
+            await self.redis.xadd(PAYMENTS_STREAM, {"data": raw})
+        except Exception:
+            # Без записи в поток ЮKassa должна доставить уведомление повторно
+            await self.redis.delete(key)
+            raise
+        
+        return True
+    
+    async def start(self) -> None:
+        """Запустить обработку очереди"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Остановить обработку (необработанное останется в потоке)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        if self._receipts:
+            await asyncio.gather(*self._receipts, return_exceptions=True)
+    
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(PAYMENTS_STREAM, PAYMENTS_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_reclaim = 0.0
+        group_ready = False
+        
+        while True:
+            try:
+                if not group_ready:
+                    await self._ensure_group()
+                    group_ready = True
+                
+                if loop.time() >= next_reclaim:
+                    # Записи, забранные, но не подтвержденные упавшими читателями
+                    _, entries, _ = await self.redis.xautoclaim(
+                        PAYMENTS_STREAM, PAYMENTS_GROUP, self.consumer,
+                        min_idle_time=int(settings.payments_claim_timeout * 1000),
+                        start_id="0-0",
+                        count=self.batch_size
+                    )
+                    if entries:
+                        logger.warning(f"Подобрано {len(entries)} необработанных уведомлений об оплате")
+                        await self.process(entries)
+                        continue
+                    next_reclaim = loop.time() + settings.payments_claim_timeout
+                
+                response = await self.redis.xreadgroup(
+                    PAYMENTS_GROUP, self.consumer, {PAYMENTS_STREAM: ">"},
+                    count=self.batch_size,
+                    block=1000
+                )
+                for _, entries in response or []:
+                    await self.process(entries)
+            except Exception as e:
+                # NOGROUP после потери данных Redis: группа создается заново
+                group_ready = group_ready and "NOGROUP" not in str(e)
+                logger.error(f"Ошибка обработки уведомлений об оплате: {e}")
+                await asyncio.sleep(1)
+    
+    async def process(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]) -> PaymentBatchResult:
+        """
+        Применить записи потока и подтвердить их
+        
+        Пачка применяется одной транзакцией; если она падает на ошибке данных,
+        уведомления применяются по одному, а не применимые уходят в
+        PAYMENTS_DEAD_STREAM. Ошибки соединения с БД пробрасываются, и записи
+        остаются в потоке до повторной попытки.
+        
+        Args:
+            entries: Записи XREADGROUP / XAUTOCLAIM
+            
+        Returns:
+            PaymentBatchResult: Итог
+        """
+        started = time.perf_counter()
+        notifications: Dict[str, PaymentNotification] = {}
+        raw_by_key: Dict[str, bytes] = {}
+        
+        for entry_id, fields in entries:
+            raw = fields.get(b"data", b"")
+            try:
+                notification = parse_notification(json.loads(raw))
+            except ValueError as e:
+                logger.error(f"Уведомление {entry_id!r} не разобрано: {e}")
+                continue
+            if notification is not None and notification.key not in notifications:
+                notifications[notification.key] = notification
+                raw_by_key[notification.key] = raw
+        
+        result = PaymentBatchResult()
+        if notifications:
+            try:
+                result = await self._apply(list(notifications.values()))
+            except (IntegrityError, DataError) as e:
+                logger.warning(f"Пачка уведомлений не применена ({e.orig}), применяем по одному")
+                for key, notification in notifications.items():
+                    try:
+                        result.merge(await self._apply([notification]))
+                    except (IntegrityError, DataError) as e:
+                        logger.error(f"Уведомление {key} не применено: {e.orig}")
+                        await self.redis.xadd(PAYMENTS_DEAD_STREAM, {"data": raw_by_key[key], "error": str(e.orig)})
+        
+        entry_ids = [entry_id for entry_id, _ in entries]
+        await self.redis.xack(PAYMENTS_STREAM, PAYMENTS_GROUP, *entry_ids)
+        await self.redis.xdel(PAYMENTS_STREAM, *entry_ids)
+        
+        logger.info(
+            f"Уведомления об оплате: записей {len(entries)}, оплачено {len(result.paid)}, "
+            f"отменено {result.cancelled}, возвратов {result.refunded}, пропущено {result.skipped} "
+            f"за {(time.perf_counter() - started) * 1000:.0f} мс"
+        )
+        return result
+    
+    async def _apply(self, notifications: List[PaymentNotification]) -> PaymentBatchResult:
+        async with self._session_maker() as session:
+            result = await PaymentService(session).apply_notifications(notifications)
+        
+        if result.paid and self.engine is not None:
+            # Сообщения покупателям не задерживают следующую пачку
+            task = asyncio.create_task(self._send_receipts(result.paid))
+            self._receipts.add(task)
+            task.add_done_callback(self._receipts.discard)
+        
+        return result
+    
+    async def _send_receipts(self, orders: List[Order]) -> None:
+        """Сообщить покупателям об оплате"""
+        buyers: Dict[int, List[int]] = defaultdict(list)
+        for order in orders:
+            buyers[order.event_id].append(order.user_id)
+        
+        try:
+            async with self._session_maker() as session:
+                result = await session.execute(
+                    select(Event.id, Event.title).where(Event.id.in_(buyers.keys()))
+                )
+                titles = dict(result.all())
+            
+            markup = InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text="🎫 Мои билеты", callback_data="my_tickets")
+            ]])
+            for event_id, user_ids in buyers.items():
+                text = (
+                    f"✅ <b>Оплата получена!</b>\n\n"
+                    f"Билет на спектакль «{titles.get(event_id, '')}» ждет вас в разделе «Мои билеты»."
+                )
+                await self.engine.send_many(user_ids, text, markup)
+        except Exception as e:
+            logger.error(f"Не удалось отправить подтверждения оплаты: {e}")
@@ -0,0 +1,241 @@
+"""
+Применение уведомлений ЮKassa к заказам
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from database.models import Order, OrderStatus
+from modules.tickets.service import TicketService
+
+
+# Обрабатываемые события ЮKassa (остальные подтверждаются и пропускаются)
+PAYMENT_SUCCEEDED = "payment.succeeded"
+PAYMENT_CANCELED = "payment.canceled"
+REFUND_SUCCEEDED = "refund.succeeded"
+
+# Порядок применения внутри пачки: возврат идет после оплаты того же платежа
+EVENT_ORDER = {PAYMENT_SUCCEEDED: 0, PAYMENT_CANCELED: 1, REFUND_SUCCEEDED: 2}
+
+CURRENCY = "RUB"
+
+
+@dataclass(frozen=True)
+class PaymentNotification:
+    """Уведомление ЮKassa в разобранном виде"""
+    event: str
+    payment_id: str  # Для возврата - ID возвращенного платежа
+    order_id: Optional[int]  # Из metadata.order_id платежа
+    amount: Decimal
+    currency: str
+    
+    @property
+    def key(self) -> str:
+        """Ключ дедупликации: повторная доставка дает тот же ключ"""
+        return f"{self.event}:{self.payment_id}"
+
+
+def parse_notification(data: Dict[str, Any]) -> Optional[PaymentNotification]:
+    """
+    Разобрать тело уведомления ЮKassa
+    
+    Args:
+        data: JSON уведомления ({"type": "notification", "event": ..., "object": {...}})
+        
+    Returns:
+        Optional[PaymentNotification]: Уведомление или None, если событие не обрабатывается
+        
+    Raises:
+        ValueError: Тело не похоже на уведомление ЮKassa
+    """
+    if not isinstance(data, dict) or data.get("type") != "notification":
+        raise ValueError("Не уведомление ЮKassa")
+    
+    event = data.get("event")
+    if event not in EVENT_ORDER:
+        return None
+    
+    obj = data.get("object")
+    if not isinstance(obj, dict):
+        raise ValueError("Нет объекта платежа")
+    
+    payment_id = obj.get("payment_id") if event == REFUND_SUCCEEDED else obj.get("id")
+    if not payment_id or not isinstance(payment_id, str):
+        raise ValueError("Нет ID платежа")
+    
+    metadata = obj.get("metadata") or {}
+    order_id = metadata.get("order_id")
+    amount = obj.get("amount") or {}
+    
+    try:
+        return PaymentNotification(
+            event=event,
+            payment_id=payment_id,
+            order_id=int(order_id) if order_id is not None else None,
+            amount=Decimal(str(amount.get("value", "0"))),
+            currency=str(amount.get("currency", ""))
+        )
+    except (TypeError, ValueError, InvalidOperation) as e:
+        raise ValueError(f"Некорректное уведомление: {e}") from e
+
+
+@dataclass
+class PaymentBatchResult:
+    """Итог применения пачки уведомлений"""
+    paid: List[Order] = field(default_factory=list)  # Оплаченные заказы (билеты выданы)
+    cancelled: int = 0
+    refunded: int = 0
+    skipped: int = 0  # Повторы и неприменимые уведомления
+    
+    def merge(self, other: "PaymentBatchResult") -> None:
+        self.paid.extend(other.paid)
+        self.cancelled += other.cancelled
+        self.refunded += other.refunded
+        self.skipped += other.skipped
+
+
+class PaymentService:
+    """Сервис подтверждения платежей"""
+    
+    def __init__(self, session: AsyncSession):
+        """
+        Args:
+            session: Сессия БД
+        """
+        self.session = session
+    
+    async def apply_notifications(self, notifications: Iterable[PaymentNotification]) -> PaymentBatchResult:
+        """
+        Применить пачку уведомлений одной транзакцией
+        
+        Затронутые заказы блокируются одним SELECT ... FOR UPDATE в порядке id
+        (параллельные пачки на разных репликах не взаимоблокируются), переходы
+        статусов и выдача билетов идут через TicketService.transition_order.
+        Переход применяется, только если заказ в ожидаемом статусе, поэтому
+        повторная доставка уведомления ничего не меняет.
+        
+        Отмена платежа отменяет заказ, только если платеж привязан к заказу
+        (payment_id): иначе покупатель может оплатить повторно, а место
+        освободит истечение брони.
+        
+        Args:
+            notifications: Уведомления (без повторов одного ключа)
+            
+        Returns:
+            PaymentBatchResult: Итог
+        """
+        notifications = sorted(notifications, key=lambda n: EVENT_ORDER[n.event])
+        order_ids = {n.order_id for n in notifications if n.order_id is not None}
+        payment_ids = {n.payment_id for n in notifications}
+        
+        result = await self.session.execute(
+            select(Order)
+            .where(or_(Order.id.in_(order_ids), Order.payment_id.in_(payment_ids)))
+            .order_by(Order.id)
+            .with_for_update()
+        )
+        orders = result.scalars().all()
+        by_id = {order.id: order for order in orders}
+        by_payment = {order.payment_id: order for order in orders if order.payment_id}
+        
+        tickets = TicketService(self.session)
+        batch = PaymentBatchResult()
+        
+        for notification in notifications:
+            order = by_payment.get(notification.payment_id) or by_id.get(notification.order_id)
+            
+            if order is None:
+                logger.warning(f"Платеж {notification.payment_id} ({notification.event}): заказ не найден")
+                batch.skipped += 1
+            elif notification.event == PAYMENT_SUCCEEDED:
+                if await self._pay(tickets, order, notification):
+                    by_payment[notification.payment_id] = order
+                    batch.paid.append(order)
+                else:
+                    batch.skipped += 1
+            elif notification.event == PAYMENT_CANCELED:
+                if order.payment_id == notification.payment_id and order.status == OrderStatus.PENDING:
+                    await tickets.transition_order(order, OrderStatus.CANCELLED)
+                    batch.cancelled += 1
+                else:
+                    batch.skipped += 1
+            elif notification.event == REFUND_SUCCEEDED:
+                if await self._refund(tickets, order, notification):
+                    batch.refunded += 1
+                else:
+                    batch.skipped += 1
+        
+        await self.session.commit()
+        await tickets.publish_entitlements()
+        return batch
+    
+    async def attach_payment(self, order_id: int, payment_id: str) -> bool:
+        """
+        Привязать созданный платеж к ожидающему оплаты заказу
+        
+        По привязке уведомление об отмене платежа отменяет заказ и
+        освобождает место, не дожидаясь истечения брони.
+        
+        Args:
+            order_id: ID заказа
+            payment_id: ID платежа ЮKassa
+            
+        Returns:
+            bool: True, если платеж привязан сейчас или был привязан раньше
+        """
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.id == order_id)
+            .where(Order.status == OrderStatus.PENDING)
+            .where(or_(Order.payment_id.is_(None), Order.payment_id == payment_id))
+            .values(payment_id=payment_id)
+        )
+        await self.session.commit()
+        return result.rowcount > 0
+    
+    async def _pay(self, tickets: TicketService, order: Order, notification: PaymentNotification) -> bool:
+        """Оплатить заказ (True, если заказ перешел в PAID)"""
+        if order.payment_id not in (None, notification.payment_id):
+            logger.error(
+                f"Заказ {order.id} уже оплачен платежом {order.payment_id}: "
+                f"платеж {notification.payment_id} требует возврата"
+            )
+            return False
+        
+        if order.status == OrderStatus.PAID:
+            return False
+        
+        if order.status != OrderStatus.PENDING:
+            logger.error(
+                f"Платеж {notification.payment_id} за заказ {order.id} в статусе {order.status.value}: "
+                f"требуется возврат"
+            )
+            return False
+        
+        if notification.amount != order.amount or notification.currency != CURRENCY:
+            logger.error(
+                f"Платеж {notification.payment_id}: сумма {notification.amount} {notification.currency} "
+                f"не совпадает с заказом {order.id} ({order.amount} {CURRENCY})"
+            )
+            return False
+        
+        order.payment_id = notification.payment_id
+        await tickets.transition_order(order, OrderStatus.PAID)
+        return True
+    
+    async def _refund(self, tickets: TicketService, order: Order, notification: PaymentNotification) -> bool:
+        """Вернуть заказ (True, если заказ перешел в REFUNDED)"""
+        if order.payment_id != notification.payment_id or order.status != OrderStatus.PAID:
+            return False
+        
+        if notification.amount < order.amount:
+            # Частичный возврат не отзывает билет
+            logger.info(f"Частичный возврат {notification.amount} по заказу {order.id}")
+            return False
+        
+        await tickets.transition_order(order, OrderStatus.REFUNDED)
+        return True
@@ -0,0 +1,106 @@
+"""
+HTTP-обработчик уведомлений ЮKassa
+"""
+import ipaddress
+import json
+from typing import List, Optional, Union
+
+from aiohttp import web
+from loguru import logger
+
+from config.settings import settings
+from modules.payments.ingest import PaymentIngestor
+from modules.payments.service import parse_notification
+
+
+class PaymentWebhookHandler:
+    """
+    Прием уведомлений ЮKassa
+    
+    Отвечает 200 сразу после постановки уведомления в очередь (повтор -
+    тоже 200). 503 при недоступном Redis заставляет ЮKassa повторить
+    доставку. ЮKassa не подписывает уведомления, поэтому источник
+    проверяется по IP-адресам из payments_trusted_ips.
+    """
+    
+    def __init__(self, ingestor: PaymentIngestor, trusted_ips: Optional[str] = None):
+        """
+        Args:
+            ingestor: Очередь уведомлений
+            trusted_ips: Сети через запятую (по умолчанию payments_trusted_ips; пусто - без проверки)
+        """
+        self.ingestor = ingestor
+        ips = settings.payments_trusted_ips if trusted_ips is None else trusted_ips
+        self.trusted_networks: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = [
+            ipaddress.ip_network(item.strip()) for item in ips.split(",") if item.strip()
+        ]
+    
+    def register(self, app: web.Application, path: str) -> None:
+        """Зарегистрировать маршрут"""
+        app.router.add_post(path, self.handle)
+    
+    def is_trusted(self, remote: Optional[str]) -> bool:
+        """Адрес отправителя из разрешенных сетей"""
+        if not self.trusted_networks:
+            return True
+        try:
+            address = ipaddress.ip_address(remote or "")
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_networks)
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        if not self.is_trusted(request.remote):
+            logger.warning(f"Уведомление об оплате с недоверенного адреса {request.remote}")
+            return web.Response(status=403)
+        
+        raw = await request.read()
+        try:
+            notification = parse_notification(json.loads(raw))
+        except ValueError as e:
+            logger.warning(f"Некорректное уведомление об оплате: {e}")
+            return web.Response(status=400)
+        
+        if notification is None:
+            # Событие, которое бот не обрабатывает
+            return web.Response()
+        
+        try:
+            await self.ingestor.enqueue(notification, raw)
+        except Exception as e:
+            logger.error(f"Не удалось поставить уведомление {notification.key} в очередь: {e}")
+            return web.Response(status=503)
+        
+        return web.Response()
+
+
+class PaymentWebhookServer:
+    """Отдельный HTTP-сервер уведомлений (в режиме polling нет webhook-сервера бота)"""
+    
+    def __init__(self, handler: PaymentWebhookHandler, host: Optional[str] = None, port: Optional[int] = None):
+        """
+        Args:
+            handler: Обработчик уведомлений
+            host: Адрес (по умолчанию webhook_host)
+            port: Порт (по умолчанию payments_port)
+        """
+        self.handler = handler
+        self.host = host or settings.webhook_host
+        self.port = port or settings.payments_port
+        self._runner: Optional[web.AppRunner] = None
+    
+    async def start(self) -> None:
+        """Запустить сервер"""
+        app = web.Application()
+        self.handler.register(app, settings.payments_webhook_path)
+        
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Уведомления ЮKassa принимаются на {self.host}:{self.port}{settings.payments_webhook_path}")
+    
+    async def stop(self) -> None:
+        """Остановить сервер"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,6 @@
+"""
+Модуль статистики
+"""
+from modules.stats.service import StatsService
+
+__all__ = ['StatsService']
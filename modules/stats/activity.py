@@ -0,0 +1,86 @@
+"""
+Часовые корзины активности пользователей
+
+Корзина хранит, у скольких пользователей last_active попадает в этот час.
+last_active меняет только сброс буфера активности (UserActivityBuffer.flush):
+в той же транзакции он переносит пользователей между корзинами, поэтому
+активные за сутки и неделю - сумма 25 и 169 строк вместо подсчета users.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import ActivityBucket
+
+
+# Окно самой длинной статистики (активные за неделю)
+ACTIVITY_WINDOW = timedelta(days=7)
+
+# Корзины старше удаляются; перенос из них не вычитается, чтобы
+# не создавать отрицательных корзин на месте удаленных
+ACTIVITY_RETENTION = timedelta(days=8)
+
+
+def activity_hour(moment: datetime) -> datetime:
+    """Начало часа, в корзину которого попадает момент"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+async def move_activity(
+    session: AsyncSession,
+    moves: Iterable[Tuple[Optional[datetime], datetime]]
+) -> None:
+    """
+    Перенести пользователей в корзины новой активности (без commit)
+    
+    Вызывается в транзакции, которая меняет last_active: старые значения
+    должны быть прочитаны под блокировкой строк users.
+    
+    Args:
+        session: Сессия БД
+        moves: Пары (прежний last_active или None для нового пользователя, новый last_active)
+    """
+    keep_after = activity_hour(datetime.utcnow() - ACTIVITY_WINDOW - timedelta(hours=1))
+    deltas: Counter = Counter()
+    
+    for previous, current in moves:
+        hour = activity_hour(current)
+        if previous is not None:
+            previous_hour = activity_hour(previous)
+            if previous_hour >= hour:
+                continue
+            if previous_hour >= keep_after:
+                deltas[previous_hour] -= 1
+        deltas[hour] += 1
+    
+    rows = [{"hour": hour, "users": delta} for hour, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    
+    # Порядок по часу: параллельные сбросы блокируют корзины в одном порядке
+    stmt = insert(ActivityBucket).values(rows)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ActivityBucket.hour],
+            set_={"users": ActivityBucket.users + stmt.excluded.users}
+        )
+    )
+
+
+async def count_active(session: AsyncSession, since: datetime) -> int:
+    """Пользователи, активные с начала часа since"""
+    return await session.scalar(
+        select(func.coalesce(func.sum(ActivityBucket.users), 0))
+        .where(ActivityBucket.hour >= activity_hour(since))
+    )
+
+
+async def prune_activity(session: AsyncSession) -> None:
+    """Удалить корзины старше ACTIVITY_RETENTION (без commit)"""
+    await session.execute(
+        delete(ActivityBucket).where(ActivityBucket.hour < datetime.utcnow() - ACTIVITY_RETENTION)
+    )
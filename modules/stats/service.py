@@ -0,0 +1,134 @@
+"""
+Сервис статистики для админ-панели
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from config.settings import settings
+from database.models import User, Event, EventStatus, StatsSnapshot
+from modules.stats.activity import ACTIVITY_WINDOW, count_active, prune_activity
+
+
+SNAPSHOT_ID = 1
+
+
+class StatsService:
+    """
+    Сервис статистики
+    
+    Цифры читаются из снимка stats_snapshots и пересчитываются, только
+    когда снимок устарел. Пересчет не сканирует таблицы целиком:
+    пользователи досчитываются по водяному знаку на created_at, активные -
+    сумма часовых корзин активности (modules/stats/activity.py), а продажи
+    берутся из счетчиков событий, которые поддерживает TicketService.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def get_stats(self, max_age: Optional[float] = None) -> StatsSnapshot:
+        """
+        Получить статистику, при необходимости обновив снимок
+        
+        Args:
+            max_age: Допустимый возраст снимка в секундах (по умолчанию из настроек)
+            
+        Returns:
+            StatsSnapshot: Снимок
+        """
+        max_age = settings.stats_max_age if max_age is None else max_age
+        
+        snapshot = await self.session.get(StatsSnapshot, SNAPSHOT_ID)
+        if snapshot and self._is_fresh(snapshot, max_age):
+            return snapshot
+        
+        return await self.refresh(max_age)
+    
+    async def refresh(self, max_age: float = 0) -> StatsSnapshot:
+        """
+        Обновить снимок статистики
+        
+        Строка снимка блокируется на время пересчета, поэтому одновременные
+        запросы администраторов не считают одно и то же дважды: второй
+        дождется первого и получит свежий снимок.
+        
+        Args:
+            max_age: Не пересчитывать, если снимок моложе (в секундах)
+            
+        Returns:
+            StatsSnapshot: Снимок
+        """
+        await self.session.execute(
+            insert(StatsSnapshot).values(id=SNAPSHOT_ID).on_conflict_do_nothing()
+        )
+        result = await self.session.execute(
+            select(StatsSnapshot)
+            .where(StatsSnapshot.id == SNAPSHOT_ID)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        snapshot = result.scalar_one()
+        
+        if self._is_fresh(snapshot, max_age):
+            await self.session.commit()
+            return snapshot
+        
+        now = datetime.utcnow()
+        # Строки моложе lag могут принадлежать еще не закоммиченным транзакциям,
+        # поэтому водяной знак отстает от текущего времени и «хвост» считается заново
+        watermark = now - timedelta(seconds=settings.stats_watermark_lag)
+        if snapshot.users_watermark and snapshot.users_watermark > watermark:
+            watermark = snapshot.users_watermark
+        
+        snapshot.users_counted += await self._count_users(snapshot.users_watermark, watermark)
+        snapshot.users_watermark = watermark
+        snapshot.users_total = snapshot.users_counted + await self._count_users(watermark, None)
+        
+        # Окна округлены до начала часа корзины
+        await prune_activity(self.session)
+        snapshot.active_day = await count_active(self.session, now - timedelta(days=1))
+        snapshot.active_week = await count_active(self.session, now - ACTIVITY_WINDOW)
+        
+        result = await self.session.execute(
+            select(Event.status, func.count()).group_by(Event.status)
+        )
+        events = dict(result.all())
+        snapshot.events_upcoming = events.get(EventStatus.UPCOMING, 0)
+        snapshot.events_live = events.get(EventStatus.LIVE, 0)
+        snapshot.events_finished = events.get(EventStatus.FINISHED, 0)
+        snapshot.events_cancelled = events.get(EventStatus.CANCELLED, 0)
+        
+        result = await self.session.execute(
+            select(
+                func.coalesce(func.sum(Event.sold_tickets), 0),
+                func.coalesce(func.sum(Event.revenue), 0)
+            )
+        )
+        snapshot.tickets_sold, snapshot.revenue = result.one()
+        
+        snapshot.refreshed_at = now
+        await self.session.commit()
+        
+        logger.debug(f"Статистика обновлена за {(datetime.utcnow() - now).total_seconds():.3f} с")
+        return snapshot
+    
+    async def _count_users(self, after: Optional[datetime], until: Optional[datetime]) -> int:
+        """Пользователи с created_at в полуинтервале (after, until]"""
+        stmt = select(func.count()).select_from(User)
+        if after is not None:
+            stmt = stmt.where(User.created_at > after)
+        if until is not None:
+            stmt = stmt.where(User.created_at <= until)
+        return await self.session.scalar(stmt)
+    
+    @staticmethod
+    def _is_fresh(snapshot: StatsSnapshot, max_age: float) -> bool:
+        """Снимок моложе max_age секунд"""
+        if snapshot.refreshed_at is None:
+            return False
+        return datetime.utcnow() - snapshot.refreshed_at < timedelta(seconds=max_age)
@@ -0,0 +1,8 @@
+"""
+Модуль билетов
+"""
+from modules.tickets.service import TicketService, Reservation, ReservationStatus, CounterDrift
+from modules.tickets.sweeper import ReservationSweeper
+from modules.tickets.qr import TicketQRService
+
+__all__ = ['TicketService', 'Reservation', 'ReservationStatus', 'CounterDrift', 'ReservationSweeper', 'TicketQRService']
@@ -0,0 +1,178 @@
+"""
+QR-коды билетов
+"""
+import hashlib
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+from redis.asyncio import Redis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from config.settings import settings
+from database.models import Ticket
+from utils.qr import QRRenderer
+from utils.redis_client import get_redis
+
+
+# Билетов за один проход предварительной генерации
+PRERENDER_BATCH_SIZE = 1000
+
+_renderer: Optional[QRRenderer] = None
+
+
+def get_qr_renderer() -> QRRenderer:
+    """Общий пул генерации QR-кодов процесса (создается при первом обращении)"""
+    global _renderer
+    
+    if _renderer is None:
+        _renderer = QRRenderer(settings.qr_workers)
+    
+    return _renderer
+
+
+async def close_qr_renderer() -> None:
+    """Остановить общий пул генерации QR-кодов"""
+    global _renderer
+    
+    if _renderer is not None:
+        await _renderer.close()
+        _renderer = None
+
+
+def qr_key(access_token: str) -> str:
+    """Ключ PNG в Redis: хэш содержимого, сам токен в ключи не попадает"""
+    return f"qr:{hashlib.sha256(access_token.encode()).hexdigest()}"
+
+
+class TicketQRService:
+    """
+    QR-коды билетов
+    
+    PNG рисуется в пуле процессов и кэшируется в Redis по хэшу access_token.
+    После первой отправки в Ticket.qr_code сохраняется file_id фото в Telegram,
+    и дальше билет отправляется по file_id без генерации и загрузки.
+    """
+    
+    def __init__(
+        self,
+        session: AsyncSession,
+        renderer: Optional[QRRenderer] = None,
+        redis: Optional[Redis] = None
+    ):
+        """
+        Args:
+            session: Сессия БД
+            renderer: Пул генерации (по умолчанию общий)
+            redis: Клиент Redis (по умолчанию общий из utils.redis_client)
+        """
+        self.session = session
+        self.renderer = renderer or get_qr_renderer()
+        self.redis = redis or get_redis()
+    
+    async def send_ticket_qr(self, bot: Bot, chat_id: int, ticket: Ticket, caption: Optional[str] = None) -> None:
+        """
+        Отправить QR-код билета
+        
+        Args:
+            bot: Бот
+            chat_id: Чат получателя
+            ticket: Билет
+            caption: Подпись к фото
+        """
+        if ticket.qr_code:
+            try:
+                await bot.send_photo(chat_id, ticket.qr_code, caption=caption)
+                return
+            except TelegramBadRequest as e:
+                logger.warning(f"file_id QR билета {ticket.id} не принят Telegram, загружаем заново: {e}")
+        
+        png = await self.get_png(ticket.access_token)
+        message = await bot.send_photo(
+            chat_id,
+            BufferedInputFile(png, filename=f"ticket_{ticket.id}.png"),
+            caption=caption
+        )
+        
+        ticket.qr_code = message.photo[-1].file_id
+        await self.session.execute(
+            update(Ticket).where(Ticket.id == ticket.id).values(qr_code=ticket.qr_code)
+        )
+        await self.session.commit()
+        
+        try:
+            # PNG больше не нужен: дальше билет отправляется по file_id
+            await self.redis.delete(qr_key(ticket.access_token))
+        except Exception as e:
+            logger.warning(f"Не удалось удалить PNG билета {ticket.id} из Redis: {e}")
+    
+    async def get_png(self, access_token: str) -> bytes:
+        """
+        Получить PNG QR-кода из кэша или нарисовать его
+        
+        Args:
+            access_token: Токен билета (содержимое QR-кода)
+            
+        Returns:
+            bytes: PNG
+        """
+        key = qr_key(access_token)
+        
+        try:
+            png = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis недоступен, QR-код рисуется без кэша: {e}")
+            return await self.renderer.render(access_token)
+        
+        if png is None:
+            png = await self.renderer.render(access_token)
+            await self.redis.set(key, png, ex=settings.qr_cache_ttl)
+        
+        return png
+    
+    async def prerender_event(self, event_id: int) -> int:
+        """
+        Заранее нарисовать QR-коды всех еще не отправленных билетов события
+        
+        Пачки рисуются на всех процессах пула, уже закэшированные пропускаются.
+        
+        Args:
+            event_id: ID события
+            
+        Returns:
+            int: Количество нарисованных QR-кодов
+        """
+        result = await self.session.stream_scalars(
+            select(Ticket.access_token)
+            .where(Ticket.event_id == event_id)
+            .where(Ticket.qr_code.is_(None))
+            .execution_options(yield_per=PRERENDER_BATCH_SIZE)
+        )
+        
+        rendered = 0
+        async for tokens in result.partitions():
+            keys = [qr_key(token) for token in tokens]
+            
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.exists(key)
+                cached = await pipe.execute()
+            
+            missing = [(token, key) for token, key, exists in zip(tokens, keys, cached) if not exists]
+            if not missing:
+                continue
+            
+            images = await self.renderer.render_many([token for token, _ in missing])
+            
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (_, key), png in zip(missing, images):
+                    pipe.set(key, png, ex=settings.qr_cache_ttl)
+                await pipe.execute()
+            
+            rendered += len(missing)
+        
+        logger.info(f"QR-коды события {event_id}: нарисовано {rendered}")
+        return rendered
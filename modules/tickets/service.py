@@ -0,0 +1,405 @@
+"""
+Сервис для работы с заказами и билетами
+"""
+import enum
+import secrets
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional, List, Iterable, Tuple
+
+from sqlalchemy import select, update, insert, delete, literal, func, or_, BigInteger, Integer, DateTime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from loguru import logger
+
+from config.settings import settings
+from database.models import Event, EventStatus, Order, OrderStatus, Ticket
+from modules.tickets.showtime import Showtime, showtime as default_showtime
+
+
+# Допустимые переходы статусов заказа
+ORDER_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PAID, OrderStatus.CANCELLED},
+    OrderStatus.PAID: {OrderStatus.REFUNDED, OrderStatus.CANCELLED},
+    OrderStatus.CANCELLED: set(),
+    OrderStatus.REFUNDED: set(),
+}
+
+# Статусы, занимающие место на событии
+SEAT_HOLDING_STATUSES = (OrderStatus.PENDING, OrderStatus.PAID)
+
+
+class ReservationStatus(str, enum.Enum):
+    """Результат попытки бронирования"""
+    RESERVED = "reserved"  # Место забронировано, создан PENDING заказ
+    EXISTING = "existing"  # У пользователя уже есть активный заказ
+    SOLD_OUT = "sold_out"  # Свободных мест нет
+    NOT_FOUND = "not_found"  # Событие не найдено
+
+
+@dataclass
+class Reservation:
+    """Результат бронирования"""
+    status: ReservationStatus
+    order: Optional[Order] = None
+
+
+@dataclass
+class CounterDrift:
+    """Расхождение счетчиков события с заказами"""
+    event_id: int
+    stored: Tuple[int, int, Decimal]  # reserved_seats, sold_tickets, revenue в events
+    actual: Tuple[int, int, Decimal]  # то же, посчитанное по orders
+
+
+class TicketService:
+    """Сервис для работы с заказами и билетами"""
+    
+    def __init__(self, session: AsyncSession, showtime: Optional[Showtime] = None):
+        """
+        Args:
+            session: Сессия БД
+            showtime: Режим показа, получающий выданные и отозванные билеты
+        """
+        self.session = session
+        self.showtime = showtime or default_showtime
+        # Выданные (True) и отозванные (False) билеты, ждущие commit: (event_id, user_id, выдан)
+        self._entitlements: List[Tuple[int, int, bool]] = []
+    
+    async def reserve_seat(self, user_id: int, event_id: int) -> Reservation:
+        """
+        Забронировать место на событие
+        
+        Место занимается условным атомарным UPDATE счетчика reserved_seats,
+        и в том же запросе (CTE) вставляется PENDING заказ. Блокировка строки
+        события держится один запрос и commit, а не на время оплаты, и продать
+        больше max_viewers невозможно. Повторная покупка упирается в уникальный
+        индекс активных заказов. Неоплаченная бронь истекает через
+        settings.reservation_ttl_minutes.
+        
+        Args:
+            user_id: Telegram ID покупателя
+            event_id: ID события
+            
+        Returns:
+            Reservation: Статус и заказ
+        """
+        now = datetime.utcnow()
+        
+        # WITH seat AS (UPDATE events ... RETURNING price) INSERT INTO orders SELECT ... FROM seat
+        seat = (
+            update(Event)
+            .where(Event.id == event_id)
+            .where(or_(Event.max_viewers.is_(None), Event.reserved_seats < Event.max_viewers))
+            .values(reserved_seats=Event.reserved_seats + 1, version=Event.version + 1)
+            .returning(Event.price)
+            .cte("seat")
+        )
+        stmt = insert(Order).from_select(
+            ["user_id", "event_id", "amount", "status", "created_at", "reserved_until"],
+            select(
+                literal(user_id, BigInteger),
+                literal(event_id, Integer),
+                seat.c.price,
+                literal(OrderStatus.PENDING, Order.__table__.c.status.type),
+                literal(now, DateTime),
+                literal(now + timedelta(minutes=settings.reservation_ttl_minutes), DateTime)
+            )
+        ).returning(Order)
+        
+        try:
+            order = (await self.session.scalars(stmt)).one_or_none()
+            await self.session.commit()
+        except IntegrityError:
+            # У пользователя уже есть активный заказ (уникальный частичный индекс);
+            # откат возвращает и место в счетчике
+            await self.session.rollback()
+            existing = await self.get_active_order(user_id, event_id)
+            return Reservation(ReservationStatus.EXISTING, existing)
+        
+        if order is None:
+            exists = await self.session.scalar(select(Event.id).where(Event.id == event_id))
+            return Reservation(ReservationStatus.SOLD_OUT if exists else ReservationStatus.NOT_FOUND)
+        
+        logger.info(f"Пользователь {user_id} забронировал место на событие {event_id} (заказ {order.id})")
+        return Reservation(ReservationStatus.RESERVED, order)
+    
+    async def get_active_order(self, user_id: int, event_id: int) -> Optional[Order]:
+        """Получить PENDING или PAID заказ пользователя на событие"""
+        result = await self.session.execute(
+            select(Order)
+            .where(Order.user_id == user_id)
+            .where(Order.event_id == event_id)
+            .where(Order.status.in_([OrderStatus.PENDING, OrderStatus.PAID]))
+        )
+        return result.scalar_one_or_none()
+    
+    async def change_order_status(
+        self,
+        order_id: int,
+        status: OrderStatus,
+        from_statuses: Optional[Iterable[OrderStatus]] = None
+    ) -> Optional[Order]:
+        """
+        Перевести заказ в новый статус и обновить счетчики события
+        
+        Args:
+            order_id: ID заказа
+            status: Новый статус
+            from_statuses: Разрешенные текущие статусы (по умолчанию все из ORDER_TRANSITIONS)
+            
+        Returns:
+            Optional[Order]: Заказ или None, если переход недопустим
+        """
+        result = await self.session.execute(
+            select(Order).where(Order.id == order_id).with_for_update()
+        )
+        order = result.scalar_one_or_none()
+        
+        allowed = from_statuses is None or (order is not None and order.status in from_statuses)
+        if order is None or not allowed or status not in ORDER_TRANSITIONS[order.status]:
+            # Изменений нет: commit только снимает блокировку и, в отличие
+            # от rollback, не сбрасывает загруженные в сессию объекты
+            await self.session.commit()
+            return None
+        
+        previous = order.status
+        await self.transition_order(order, status)
+        await self.session.commit()
+        await self.publish_entitlements()
+        
+        logger.info(f"Заказ {order_id}: {previous.value} → {status.value}")
+        return order
+    
+    async def transition_order(self, order: Order, status: OrderStatus) -> None:
+        """
+        Сменить статус заблокированного заказа без commit
+        
+        Счетчики события меняются в той же транзакции, поэтому вызывающий
+        может провести пачку переходов одним commit. Оплата выдает билет,
+        уход из PAID его отзывает; после commit нужно вызвать publish_entitlements().
+        
+        Args:
+            order: Заказ, выбранный FOR UPDATE в текущей транзакции
+            status: Новый статус (переход должен быть допустим)
+        """
+        previous = order.status
+        order.status = status
+        
+        if status == OrderStatus.PAID:
+            order.paid_at = datetime.utcnow()
+            order.reserved_until = None
+            self.session.add(Ticket(
+                order_id=order.id,
+                user_id=order.user_id,
+                event_id=order.event_id,
+                access_token=secrets.token_urlsafe(32)
+            ))
+            self._entitlements.append((order.event_id, order.user_id, True))
+        elif previous == OrderStatus.PAID:
+            await self.session.execute(delete(Ticket).where(Ticket.order_id == order.id))
+            self._entitlements.append((order.event_id, order.user_id, False))
+        
+        seats = int(status in SEAT_HOLDING_STATUSES) - int(previous in SEAT_HOLDING_STATUSES)
+        sold = int(status == OrderStatus.PAID) - int(previous == OrderStatus.PAID)
+        await self._apply_counters(order.event_id, seats=seats, sold=sold, revenue=order.amount * sold)
+    
+    async def publish_entitlements(self) -> None:
+        """
+        Передать закоммиченные выдачи и отзывы билетов в режим показа
+        
+        Идущий показ проверяет доступ без БД, поэтому билеты, купленные
+        во время показа, добавляются в его список зрителей по одному.
+        """
+        entitlements, self._entitlements = self._entitlements, []
+        
+        for event_id, user_id, granted in entitlements:
+            if granted:
+                await self.showtime.grant(event_id, user_id)
+            else:
+                await self.showtime.revoke(event_id, user_id)
+    
+    async def has_ticket(self, user_id: int, event_id: int) -> bool:
+        """Есть ли у пользователя билет на событие"""
+        ticket_id = await self.session.scalar(
+            select(Ticket.id)
+            .where(Ticket.event_id == event_id)
+            .where(Ticket.user_id == user_id)
+            .limit(1)
+        )
+        return ticket_id is not None
+    
+    async def get_user_tickets(self, user_id: int) -> List[Ticket]:
+        """
+        Билеты пользователя на предстоящие и идущие события
+        
+        Returns:
+            List[Ticket]: Билеты с загруженными событиями, по времени начала
+        """
+        result = await self.session.execute(
+            select(Ticket)
+            .join(Ticket.event)
+            .options(joinedload(Ticket.event))
+            .where(Ticket.user_id == user_id)
+            .where(Event.status.in_([EventStatus.UPCOMING, EventStatus.LIVE]))
+            .order_by(Event.start_time)
+        )
+        return list(result.scalars().all())
+    
+    async def get_user_ticket(self, user_id: int, ticket_id: int) -> Optional[Ticket]:
+        """Получить билет, если он принадлежит пользователю"""
+        result = await self.session.execute(
+            select(Ticket)
+            .options(joinedload(Ticket.event))
+            .where(Ticket.id == ticket_id)
+            .where(Ticket.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+    
+    async def cancel_order(self, order_id: int) -> bool:
+        """
+        Отменить неоплаченный заказ и освободить место
+        
+        Returns:
+            bool: True, если заказ был в статусе PENDING и отменен
+        """
+        order = await self.change_order_status(
+            order_id, OrderStatus.CANCELLED, from_statuses=[OrderStatus.PENDING]
+        )
+        return order is not None
+    
+    async def release_expired_reservations(self) -> int:
+        """
+        Отменить PENDING заказы с истекшей бронью и вернуть места
+        
+        Условие status = PENDING перепроверяется под блокировкой строки,
+        поэтому параллельные запуски (например, на разных репликах) и
+        одновременная оплата не приводят к двойному освобождению места.
+        
+        Returns:
+            int: Количество отмененных заказов
+        """
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.status == OrderStatus.PENDING)
+            .where(Order.reserved_until < datetime.utcnow())
+            .values(status=OrderStatus.CANCELLED)
+            .returning(Order.event_id)
+        )
+        released = Counter(result.scalars().all())
+        
+        if not released:
+            await self.session.rollback()
+            return 0
+        
+        await self._release_seats(released)
+        await self.session.commit()
+        
+        total = sum(released.values())
+        logger.info(f"Истекли брони: {total} заказов по {len(released)} событиям")
+        return total
+    
+    async def _release_seats(self, seats_by_event: Counter) -> None:
+        """Уменьшить счетчики занятых мест (в текущей транзакции)"""
+        for event_id, count in sorted(seats_by_event.items()):
+            await self._apply_counters(event_id, seats=-count)
+    
+    async def _apply_counters(
+        self,
+        event_id: int,
+        seats: int = 0,
+        sold: int = 0,
+        revenue: Decimal = Decimal(0)
+    ) -> None:
+        """Изменить счетчики события на дельты (в текущей транзакции)"""
+        if not (seats or sold or revenue):
+            return
+        
+        await self.session.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(
+                reserved_seats=Event.reserved_seats + seats,
+                sold_tickets=Event.sold_tickets + sold,
+                revenue=Event.revenue + revenue,
+                version=Event.version + 1
+            )
+        )
+    
+    async def find_counter_drift(self) -> List[CounterDrift]:
+        """
+        Пересчитать счетчики всех событий по orders и найти расхождения
+        
+        Returns:
+            List[CounterDrift]: События, у которых счетчики не совпадают
+        """
+        actual = self._actual_counters_query().subquery()
+        actual_reserved = func.coalesce(actual.c.reserved, 0)
+        actual_sold = func.coalesce(actual.c.sold, 0)
+        actual_revenue = func.coalesce(actual.c.revenue, 0)
+        
+        result = await self.session.execute(
+            select(
+                Event.id,
+                Event.reserved_seats,
+                Event.sold_tickets,
+                Event.revenue,
+                actual_reserved,
+                actual_sold,
+                actual_revenue
+            )
+            .outerjoin(actual, actual.c.event_id == Event.id)
+            .where(or_(
+                Event.reserved_seats != actual_reserved,
+                Event.sold_tickets != actual_sold,
+                Event.revenue != actual_revenue
+            ))
+            .order_by(Event.id)
+        )
+        
+        return [
+            CounterDrift(event_id=row[0], stored=tuple(row[1:4]), actual=tuple(row[4:7]))
+            for row in result.all()
+        ]
+    
+    async def fix_counters(self, event_id: int) -> None:
+        """
+        Пересчитать счетчики события с нуля
+        
+        Строка события блокируется до пересчета, поэтому параллельные
+        брони и оплаты не теряются.
+        """
+        await self.session.execute(
+            select(Event.id).where(Event.id == event_id).with_for_update()
+        )
+        
+        result = await self.session.execute(
+            self._actual_counters_query().where(Order.event_id == event_id)
+        )
+        row = result.one_or_none()
+        reserved, sold, revenue = (row[1], row[2], row[3]) if row else (0, 0, 0)
+        
+        await self.session.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(reserved_seats=reserved, sold_tickets=sold, revenue=revenue, version=Event.version + 1)
+        )
+        await self.session.commit()
+        
+        logger.info(f"Счетчики события {event_id} пересчитаны: мест {reserved}, продано {sold}, выручка {revenue}")
+    
+    @staticmethod
+    def _actual_counters_query():
+        """Агрегаты по orders: занятые места, продано, выручка"""
+        return (
+            select(
+                Order.event_id.label("event_id"),
+                func.count().filter(Order.status.in_(SEAT_HOLDING_STATUSES)).label("reserved"),
+                func.count().filter(Order.status == OrderStatus.PAID).label("sold"),
+                func.coalesce(func.sum(Order.amount).filter(Order.status == OrderStatus.PAID), 0).label("revenue")
+            )
+            .group_by(Order.event_id)
+        )
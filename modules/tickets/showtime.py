@@ -0,0 +1,191 @@
+"""
+Режим показа: доступ к трансляции без запросов к БД
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from database.models import Event, Ticket
+from utils.redis_client import get_redis
+
+
+# Порция user_id при загрузке списка зрителей
+PRELOAD_CHUNK_SIZE = 5000
+
+# Поле hash показа: множество зрителей загружено полностью
+READY_FIELD = "ready"
+
+# Сколько держать ключи после окончания показа, если их не удалили явно
+SHOWTIME_TTL_MARGIN = 2 * 3600
+
+
+def info_key(event_id: int) -> str:
+    """Hash с данными идущего показа"""
+    return f"showtime:{event_id}"
+
+
+def viewers_key(event_id: int) -> str:
+    """Множество telegram_id владельцев билетов"""
+    return f"showtime:{event_id}:viewers"
+
+
+@dataclass
+class WatchAccess:
+    """Ответ режима показа на нажатие «Смотреть»"""
+    title: str
+    invite_link: Optional[str]
+    entitled: bool
+
+
+class Showtime:
+    """
+    Режим показа события
+    
+    При переходе события в LIVE все владельцы билетов загружаются из tickets
+    в множество Redis, а название и ссылка на трансляцию - в hash. Нажатие
+    «Смотреть» в это время проверяется одним запросом к Redis (pipeline
+    HGETALL + SISMEMBER), без обращений к БД. Новые покупки во время показа
+    добавляются в множество по одной.
+    
+    Пока множество загружается, в hash нет поля ready и check() отправляет
+    проверку в БД: отсутствие в неполном множестве ничего не значит.
+    """
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        """
+        Args:
+            redis: Клиент Redis (по умолчанию общий из utils.redis_client)
+        """
+        self._redis = redis
+    
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+    
+    async def start(self, session: AsyncSession, event: Event) -> int:
+        """
+        Включить режим показа
+        
+        Hash показа создается до чтения tickets: покупка, закоммиченная после
+        начала чтения, попадет в множество через grant(). Поле ready
+        ставится последним, когда загружено все множество; при повторном
+        включении hash пересоздается без него, и до конца загрузки доступ
+        проверяет БД.
+        
+        Args:
+            session: Сессия БД
+            event: Событие
+            
+        Returns:
+            int: Количество загруженных зрителей
+        """
+        ttl = event.duration_minutes * 60 + SHOWTIME_TTL_MARGIN
+        
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(viewers_key(event.id), info_key(event.id))
+                pipe.hset(info_key(event.id), mapping={
+                    "title": event.title,
+                    "invite_link": event.invite_link or "",
+                })
+                pipe.expire(info_key(event.id), ttl)
+                await pipe.execute()
+            
+            result = await session.stream_scalars(
+                select(Ticket.user_id)
+                .where(Ticket.event_id == event.id)
+                .execution_options(yield_per=PRELOAD_CHUNK_SIZE)
+            )
+            
+            total = 0
+            async for user_ids in result.partitions():
+                await self.redis.sadd(viewers_key(event.id), *user_ids)
+                total += len(user_ids)
+            
+            await self.redis.expire(viewers_key(event.id), ttl)
+            await self.redis.hset(info_key(event.id), READY_FIELD, 1)
+        except Exception as e:
+            # Неполный список зрителей хуже, чем его отсутствие: доступ проверит БД
+            logger.error(f"Не удалось включить режим показа события {event.id}: {e}")
+            await self.stop(event.id)
+            return 0
+        
+        logger.info(f"🔴 Режим показа события {event.id}: загружено зрителей {total}")
+        return total
+    
+    async def stop(self, event_id: int) -> None:
+        """Выключить режим показа"""
+        try:
+            await self.redis.delete(info_key(event_id), viewers_key(event_id))
+        except Exception as e:
+            logger.warning(f"Не удалось выключить режим показа события {event_id}: {e}")
+            return
+        
+        logger.info(f"Режим показа события {event_id} выключен")
+    
+    async def check(self, event_id: int, user_id: int) -> Optional[WatchAccess]:
+        """
+        Проверить доступ к трансляции
+        
+        Returns:
+            Optional[WatchAccess]: Ответ или None, если событие не в режиме
+                показа, зрители еще загружаются или Redis недоступен,
+                и проверять нужно по БД
+        """
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(info_key(event_id))
+                pipe.sismember(viewers_key(event_id), user_id)
+                info, entitled = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis недоступен, доступ к событию {event_id} проверяется по БД: {e}")
+            return None
+        
+        if not info or READY_FIELD.encode() not in info:
+            return None
+        
+        return WatchAccess(
+            title=info[b"title"].decode(),
+            invite_link=info[b"invite_link"].decode() or None,
+            entitled=bool(entitled)
+        )
+    
+    async def grant(self, event_id: int, user_id: int) -> None:
+        """Добавить зрителя, если событие в режиме показа"""
+        try:
+            ttl = await self.redis.ttl(info_key(event_id))
+            if ttl > 0:
+                # TTL повторяется, чтобы множество не пережило выключенный в этот момент показ
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.sadd(viewers_key(event_id), user_id)
+                    pipe.expire(viewers_key(event_id), ttl)
+                    await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось выдать доступ к показу {event_id} пользователю {user_id}: {e}")
+    
+    async def revoke(self, event_id: int, user_id: int) -> None:
+        """Убрать зрителя (возврат билета во время показа)"""
+        try:
+            await self.redis.srem(viewers_key(event_id), user_id)
+        except Exception as e:
+            logger.warning(f"Не удалось отозвать доступ к показу {event_id} у пользователя {user_id}: {e}")
+    
+    async def set_invite_link(self, event_id: int, invite_link: str) -> None:
+        """Обновить ссылку на трансляцию, если событие в режиме показа"""
+        try:
+            if await self.redis.exists(info_key(event_id)):
+                await self.redis.hset(info_key(event_id), "invite_link", invite_link)
+        except Exception as e:
+            # Старая ссылка в Redis опаснее промаха: выключаем режим, доступ проверит БД
+            logger.warning(f"Не удалось обновить ссылку показа {event_id}: {e}")
+            await self.stop(event_id)
+
+
+# Общий режим показа процесса
+showtime = Showtime()
@@ -0,0 +1,58 @@
+"""
+Фоновое освобождение мест по истекшим броням
+"""
+import asyncio
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.session import async_session_maker
+from modules.tickets.service import TicketService
+
+
+class ReservationSweeper:
+    """Периодически отменяет PENDING заказы с истекшей бронью"""
+    
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+    ):
+        """
+        Args:
+            interval: Период проверки в секундах
+            session_maker: Фабрика сессий БД
+        """
+        self.interval = interval or settings.reservation_sweep_interval
+        self._session_maker = session_maker or async_session_maker
+        self._task: Optional[asyncio.Task] = None
+    
+    async def sweep(self) -> int:
+        """Один проход: освободить места по истекшим броням"""
+        async with self._session_maker() as session:
+            return await TicketService(session).release_expired_reservations()
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Ошибка освобождения истекших броней: {e}")
+    
+    async def start(self) -> None:
+        """Запустить фоновую проверку"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Остановить фоновую проверку"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -2,5 +2,6 @@
 Модуль пользователей
 """
 from modules.users.service import UserService
+from modules.users.activity import UserActivityBuffer
 
-__all__ = ['UserService']
+__all__ = ['UserService', 'UserActivityBuffer']
@@ -0,0 +1,218 @@
+"""
+Буфер отложенной записи (write-behind) активности пользователей
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from loguru import logger
+
+from config.settings import settings
+from database.models import User
+from database.session import async_session_maker
+from modules.stats.activity import move_activity
+
+
+class UserActivityBuffer:
+    """
+    Буфер активности пользователей
+    
+    Известные пользователи обслуживаются из памяти без обращения к БД,
+    а изменения last_active, username, first_name, last_name и снятие
+    is_blocked копятся и сбрасываются одним bulk UPDATE раз
+    в flush_interval секунд или при накоплении flush_batch_size записей.
+    В той же транзакции пользователи переносятся в часовые корзины
+    активности, из которых считается статистика.
+    """
+    
+    PROFILE_FIELDS = ("username", "first_name", "last_name")
+    
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        flush_batch_size: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+    ):
+        """
+        Args:
+            flush_interval: Период сброса в секундах
+            flush_batch_size: Количество записей, при котором сброс происходит досрочно
+            cache_size: Максимальное количество пользователей в памяти
+            session_maker: Фабрика сессий БД
+        """
+        self.flush_interval = flush_interval or settings.user_flush_interval
+        self.flush_batch_size = flush_batch_size or settings.user_flush_batch_size
+        self.cache_size = cache_size or settings.user_cache_size
+        self._session_maker = session_maker or async_session_maker
+        
+        self._users: "OrderedDict[int, User]" = OrderedDict()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def pending_count(self) -> int:
+        """Количество пользователей с несохраненными изменениями"""
+        return len(self._pending)
+    
+    def remember(self, user: User, active: bool = False) -> None:
+        """
+        Запомнить пользователя, загруженного из БД
+        
+        Args:
+            user: Пользователь (отсоединенный от сессии)
+            active: Пользователь только что обратился к боту: last_active
+                запишет ближайший сброс, сам объект не меняется (он еще
+                может быть привязан к сессии обработчика)
+        """
+        self._users[user.telegram_id] = user
+        self._users.move_to_end(user.telegram_id)
+        
+        if active:
+            changes = self._pending.setdefault(user.telegram_id, {"telegram_id": user.telegram_id})
+            changes["last_active"] = datetime.utcnow()
+        
+        while len(self._users) > self.cache_size:
+            self._users.popitem(last=False)
+    
+    def touch(
+        self,
+        telegram_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> Optional[User]:
+        """
+        Отметить активность известного пользователя
+        
+        Args:
+            telegram_id: ID пользователя в Telegram
+            username: Username пользователя
+            first_name: Имя
+            last_name: Фамилия
+            
+        Returns:
+            Optional[User]: Пользователь из памяти или None, если он еще не встречался
+        """
+        user = self._users.get(telegram_id)
+        if user is None:
+            return None
+        
+        self._users.move_to_end(telegram_id)
+        
+        now = datetime.utcnow()
+        changes = self._pending.setdefault(telegram_id, {"telegram_id": telegram_id})
+        changes["last_active"] = now
+        user.last_active = now
+        
+        # Как и в UserService, пустые значения не затирают сохраненные
+        for field, value in zip(self.PROFILE_FIELDS, (username, first_name, last_name)):
+            if value and getattr(user, field) != value:
+                setattr(user, field, value)
+                changes[field] = value
+        
+        # Пользователь снова пишет боту, значит разблокировал его. Пишется всегда:
+        # рассылка отмечает блокировку только в БД (и, возможно, в другом процессе),
+        # а пользователь в памяти об этом не знает
+        user.is_blocked = False
+        changes["is_blocked"] = False
+        
+        if len(self._pending) >= self.flush_batch_size:
+            self._wakeup.set()
+        
+        return user
+    
+    async def flush(self) -> int:
+        """
+        Сбросить накопленные изменения в БД одним bulk UPDATE
+        
+        Returns:
+            int: Количество обновленных пользователей
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            
+            rows = list(self._pending.values())
+            self._pending = {}
+            
+            try:
+                async with self._session_maker() as session:
+                    # Прежний last_active под блокировкой: по нему пользователь уходит из старой корзины
+                    result = await session.execute(
+                        select(User.telegram_id, User.last_active)
+                        .where(User.telegram_id.in_([row["telegram_id"] for row in rows]))
+                        .order_by(User.telegram_id)
+                        .with_for_update()
+                    )
+                    previous = dict(result.all())
+                    
+                    updates, moves = [], []
+                    for row in rows:
+                        if row["telegram_id"] not in previous:
+                            continue
+                        last_active = previous[row["telegram_id"]]
+                        if last_active is not None and last_active >= row["last_active"]:
+                            # Другой процесс уже записал более позднюю активность
+                            row = {field: value for field, value in row.items() if field != "last_active"}
+                        else:
+                            moves.append((last_active, row["last_active"]))
+                        if len(row) > 1:
+                            updates.append(row)
+                    
+                    if updates:
+                        await session.execute(update(User), updates)
+                    await move_activity(session, moves)
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Не удалось сбросить активность {len(rows)} пользователей: {e}")
+                self._restore(rows)
+                return 0
+            
+            logger.debug(f"Сброшена активность {len(rows)} пользователей")
+            return len(rows)
+    
+    def _restore(self, rows: list[Dict[str, Any]]) -> None:
+        """Вернуть несохраненные изменения в буфер, не затирая более свежие"""
+        for row in rows:
+            changes = self._pending.setdefault(row["telegram_id"], {})
+            for field, value in row.items():
+                changes.setdefault(field, value)
+    
+    async def _run(self) -> None:
+        """Фоновый цикл периодического сброса"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            
+            self._wakeup.clear()
+            await self.flush()
+    
+    async def start(self) -> None:
+        """Запустить фоновый сброс"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Буфер активности запущен (интервал {self.flush_interval} с, "
+                f"пакет {self.flush_batch_size})"
+            )
+    
+    async def stop(self) -> None:
+        """Остановить фоновый сброс и сохранить остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
+        logger.info("Буфер активности остановлен")
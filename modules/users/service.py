@@ -1,10 +1,11 @@
 """
 Сервис для работы с пользователями
 """
-from typing import Optional
-from datetime import datetime
+from typing import Optional, Sequence, Dict, List, Any
 
-from sqlalchemy import select
+from aiogram.types import User as TelegramUser
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
@@ -28,6 +29,10 @@ class UserService:
         """
         Получить или создать пользователя
         
+        Выполняется одним запросом INSERT ... ON CONFLICT DO UPDATE ... RETURNING,
+        поэтому одновременные первые обращения одного пользователя не конфликтуют
+        по первичному ключу.
+        
         Args:
             telegram_id: ID пользователя в Telegram
             username: Username пользователя
@@ -38,41 +43,86 @@ class UserService:
         Returns:
             User: Объект пользователя
         """
-        # Пытаемся найти пользователя
-        result = await self.session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        user = result.scalar_one_or_none()
+        stmt = self._upsert_statement([{
+            "telegram_id": telegram_id,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "language_code": language_code,
+        }])
         
-        if user:
-            # Обновляем last_active
-            user.last_active = datetime.utcnow()
-            # Обновляем данные если изменились
-            if username:
-                user.username = username
-            if first_name:
-                user.first_name = first_name
-            if last_name:
-                user.last_name = last_name
-            
-            logger.info(f"Пользователь {telegram_id} обновлен")
-        else:
-            # Создаем нового пользователя
-            user = User(
-                telegram_id=telegram_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                language_code=language_code,
-                last_active=datetime.utcnow()
-            )
-            self.session.add(user)
+        result = await self.session.execute(stmt, execution_options={"populate_existing": True})
+        user, inserted = result.one()
+        await self.session.commit()
+        
+        if inserted:
             logger.info(f"Создан новый пользователь {telegram_id}")
+        else:
+            logger.info(f"Пользователь {telegram_id} обновлен")
         
+        return user
+    
+    async def get_or_create_users(self, telegram_users: Sequence[TelegramUser]) -> Dict[int, User]:
+        """
+        Получить или создать пачку пользователей одним запросом
+        
+        Args:
+            telegram_users: Пользователи Telegram (например, from_user из пачки апдейтов)
+            
+        Returns:
+            Dict[int, User]: Пользователи по telegram_id
+        """
+        # Одна строка не может обновляться дважды в одном ON CONFLICT,
+        # поэтому повторы схлопываются (побеждают последние данные).
+        # Сортировка по ключу сохраняет порядок блокировок между пачками.
+        rows = {
+            tg_user.id: {
+                "telegram_id": tg_user.id,
+                "username": tg_user.username,
+                "first_name": tg_user.first_name,
+                "last_name": tg_user.last_name,
+                "language_code": tg_user.language_code or "ru",
+            }
+            for tg_user in telegram_users
+        }
+        if not rows:
+            return {}
+        
+        stmt = self._upsert_statement([rows[key] for key in sorted(rows)])
+        
+        result = await self.session.execute(stmt, execution_options={"populate_existing": True})
+        users = {}
+        created = 0
+        for user, inserted in result:
+            users[user.telegram_id] = user
+            created += int(inserted)
         await self.session.commit()
-        await self.session.refresh(user)
         
-        return user
+        logger.info(f"Синхронизировано пользователей: {len(users)} (новых: {created})")
+        return users
+    
+    @staticmethod
+    def _upsert_statement(rows: List[Dict[str, Any]]):
+        """
+        Построить INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING
+        
+        Пустые username/first_name/last_name не затирают сохраненные значения.
+        last_active здесь не пишется: его вместе с часовыми корзинами
+        активности пишет сброс UserActivityBuffer.
+        Вторая колонка результата — признак того, что строка была вставлена.
+        """
+        stmt = insert(User).values(rows)
+        
+        return stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={
+                "username": func.coalesce(stmt.excluded.username, User.username),
+                "first_name": func.coalesce(stmt.excluded.first_name, User.first_name),
+                "last_name": func.coalesce(stmt.excluded.last_name, User.last_name),
+                # Раз пользователь написал боту, значит он его не блокирует
+                "is_blocked": False,
+            }
+        ).returning(User, literal_column("xmax = 0").label("inserted"))
     
     async def get_user(self, telegram_id: int) -> Optional[User]:
         """Получить пользователя по ID"""
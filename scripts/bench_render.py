@@ -0,0 +1,84 @@
+"""
+Микробенчмарк отрисовки экранов: построение с нуля против кэша
+
+Пример:
+    python scripts/bench_render.py --iterations 20000
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from loguru import logger
+
+from config import setup_logging
+from database.models import Event, EventStatus
+from modules.events.service import EventPage
+from bot.keyboards.inline import event_detail_keyboard, events_list_keyboard, main_menu_keyboard
+from bot.screens import event_detail_screen, events_page_screen, render_event_detail, render_events_page
+
+
+def make_events(count: int) -> list[Event]:
+    """Тестовые события"""
+    start = datetime.utcnow() + timedelta(days=1)
+    return [
+        Event(
+            id=index + 1,
+            title=f"Спектакль №{index + 1}",
+            description="Описание спектакля " * 10,
+            start_time=start + timedelta(days=index),
+            duration_minutes=120,
+            price=Decimal("500.00"),
+            max_viewers=300,
+            reserved_seats=120,
+            version=1,
+            status=EventStatus.UPCOMING
+        )
+        for index in range(count)
+    ]
+
+
+def bench(name: str, before, after, iterations: int) -> None:
+    """Сравнить среднее время одного вызова"""
+    before_us = timeit.timeit(before, number=iterations) / iterations * 1e6
+    after_us = timeit.timeit(after, number=iterations) / iterations * 1e6
+    logger.info(
+        f"{name}: без кэша {before_us:.1f} мкс, с кэшем {after_us:.2f} мкс "
+        f"(x{before_us / after_us:.0f})"
+    )
+
+
+def main(iterations: int):
+    """Бенчмарк отрисовки"""
+    setup_logging()
+    
+    events = make_events(8)
+    event = events[0]
+    page = EventPage(events=events, total=40, next_cursor="65e47fd082980.8")
+    
+    bench(
+        "Карточка события",
+        lambda: (render_event_detail(event), event_detail_keyboard.__wrapped__(event.id, False)),
+        lambda: event_detail_screen(event, False),
+        iterations
+    )
+    bench(
+        "Страница афиши",
+        lambda: (render_events_page(page), events_list_keyboard(page.events, page.prev_cursor, page.next_cursor)),
+        lambda: events_page_screen(page),
+        iterations
+    )
+    bench(
+        "Главное меню",
+        lambda: main_menu_keyboard.__wrapped__(),
+        lambda: main_menu_keyboard(),
+        iterations
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки экранов")
+    parser.add_argument("--iterations", type=int, default=20000, help="Вызовов на замер")
+    args = parser.parse_args()
+    
+    main(args.iterations)
@@ -0,0 +1,108 @@
+"""
+Нагрузочный тест бронирования: N одновременных покупателей на событие с M местами
+
+Пример:
+    python scripts/bench_reservations.py --buyers 1000 --seats 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from config import setup_logging
+from database import init_db, close_db, Event, Order, User, OrderStatus
+from database.session import async_session_maker
+from modules.tickets import TicketService, ReservationStatus
+from scripts.bench_stats import percentile
+
+
+# Диапазон telegram_id тестовых покупателей, не пересекающийся с реальными
+BENCH_USER_ID_BASE = 9_000_000_000
+
+
+async def main(buyers: int, seats: int):
+    """Бенчмарк бронирования"""
+    setup_logging()
+    await init_db()
+    
+    user_ids = [BENCH_USER_ID_BASE + i for i in range(buyers)]
+    
+    async with async_session_maker() as session:
+        await session.execute(
+            insert(User)
+            .values([{"telegram_id": user_id, "first_name": "bench"} for user_id in user_ids])
+            .on_conflict_do_nothing()
+        )
+        event = Event(
+            title="[bench] Премьера",
+            start_time=datetime.utcnow() + timedelta(days=1),
+            price=500,
+            max_viewers=seats,
+            reserved_seats=0
+        )
+        session.add(event)
+        await session.commit()
+        event_id = event.id
+    
+    latencies: list[float] = []
+    
+    async def buyer(user_id: int) -> ReservationStatus:
+        started = time.perf_counter()
+        async with async_session_maker() as session:
+            reservation = await TicketService(session).reserve_seat(user_id, event_id)
+        latencies.append(time.perf_counter() - started)
+        return reservation.status
+    
+    logger.info(f"Старт: {buyers} покупателей, {seats} мест")
+    started = time.perf_counter()
+    results = await asyncio.gather(*(buyer(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+    
+    try:
+        async with async_session_maker() as session:
+            reserved_seats = await session.scalar(select(Event.reserved_seats).where(Event.id == event_id))
+            orders = await session.scalar(
+                select(func.count())
+                .select_from(Order)
+                .where(Order.event_id == event_id)
+                .where(Order.status == OrderStatus.PENDING)
+            )
+        
+        latencies.sort()
+        reserved = results.count(ReservationStatus.RESERVED)
+        sold_out = results.count(ReservationStatus.SOLD_OUT)
+        
+        logger.info(
+            f"Готово за {elapsed:.2f} с: {buyers / elapsed:.0f} покупателей/с\n"
+            f"  забронировано: {reserved}, отказ (sold out): {sold_out}\n"
+            f"  счетчик мест: {reserved_seats}, PENDING заказов: {orders}\n"
+            f"  задержка p50={statistics.median(latencies) * 1000:.1f} мс "
+            f"p95={percentile(latencies, 95) * 1000:.1f} мс "
+            f"p99={percentile(latencies, 99) * 1000:.1f} мс"
+        )
+        
+        if reserved_seats != orders or orders > seats:
+            logger.error("❌ Рассинхрон счетчика или овербукинг!")
+        else:
+            logger.success("✅ Овербукинга нет")
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(Order).where(Order.event_id == event_id))
+            await session.execute(delete(Event).where(Event.id == event_id))
+            await session.execute(delete(User).where(User.telegram_id.in_(user_ids)))
+            await session.commit()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк бронирования мест")
+    parser.add_argument("--buyers", type=int, default=1000, help="Одновременных покупателей")
+    parser.add_argument("--seats", type=int, default=500, help="Мест на событии")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.buyers, args.seats))
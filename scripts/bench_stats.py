@@ -0,0 +1,10 @@
+"""
+Общие расчеты для нагрузочных скриптов
+"""
+from typing import List
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Перцентиль по отсортированному списку"""
+    index = min(int(len(values) * p / 100), len(values) - 1)
+    return values[index]
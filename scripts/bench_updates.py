@@ -0,0 +1,668 @@
+"""
+Бенчмарк обработки обновлений: реальный Dispatcher с AuthMiddleware и роутерами
+
+Обновления (синтетические по смеси типов или записанные) проходят через
+dp.feed_raw_update, как в воркерах; запросы к Bot API перехватывает сессия-
+заглушка. По каждому типу обновления считаются задержки p50/p95/p99, запросы
+к БД и вызовы Bot API; результат сохраняется в JSON для сравнения запусков.
+
+С --workers N обновления раздаются через WorkerPool настоящим процессам-
+воркерам (как в run_front), а Bot API имитирует локальный HTTP-сервер.
+Задержки отдельных обновлений в этом режиме не видны: замеряется пропускная
+способность - время, за которое воркеры обработали все обновления.
+
+Пример:
+    python scripts/bench_updates.py --updates 5000 --concurrency 50
+    python scripts/bench_updates.py --mix events=5,event=5,buy=1 --compare bench_results/before.json
+    python scripts/bench_updates.py --recorded updates.jsonl
+    python scripts/bench_updates.py --workers 4 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, User as TelegramUser
+from aiohttp import web
+from loguru import logger
+from sqlalchemy import event as sa_event, select, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from config import setup_logging, settings
+from database import init_db, close_db, engine, Event, Order, Ticket, User, OrderStatus
+from database.session import async_session_maker
+from modules.events import EventService
+from modules.users import UserActivityBuffer
+from bot.main import create_dispatcher
+from bot.workers import WorkerPool
+from scripts.bench_stats import percentile
+from utils.redis_client import close_redis
+
+
+# Диапазон telegram_id тестовых пользователей и администраторов, не пересекающийся с реальными
+BENCH_USER_ID_BASE = 9_200_000_000
+BENCH_ADMIN_ID_BASE = 9_299_999_000
+BENCH_ADMINS = 10
+BENCH_TITLE = "[bench]"
+
+DEFAULT_MIX = "start=1,events=3,event=4,buy=1,watch=2,admin_wizard=0.1"
+RESULTS_DIR = Path("bench_results")
+
+
+@dataclass
+class UpdateStats:
+    """Замер одного обновления"""
+    kind: str
+    latency: float = 0.0
+    queries: int = 0
+    api_calls: int = 0
+    error: bool = False
+
+
+# Замер обновления, которое сейчас обрабатывается (запросы БД и Bot API пишутся в него)
+current_stats: ContextVar[Optional[UpdateStats]] = ContextVar("current_stats", default=None)
+
+
+class RecordingSession(BaseSession):
+    """
+    Сессия Bot API без сети
+    
+    Запрос сериализуется так же, как в AiohttpSession, а ответ проходит
+    обычный разбор aiogram: в замер попадает вся работа, кроме сети.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self._message_id = 0
+    
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        files: Dict[str, Any] = {}
+        for value in method.model_dump(warnings=False).values():
+            self.prepare_value(value, bot=bot, files=files)
+        
+        self.calls[method.__api_method__] += 1
+        stats = current_stats.get()
+        if stats is not None:
+            stats.api_calls += 1
+        
+        response = self.check_response(
+            bot, method, status_code=200,
+            content=self.json_dumps({"ok": True, "result": self._result(method)})
+        )
+        return response.result
+    
+    def _result(self, method: TelegramMethod) -> Any:
+        """Правдоподобный ответ Telegram на метод"""
+        if method.__returning__ is Message:
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": getattr(method, "chat_id", 0), "type": "private"},
+                "text": getattr(method, "text", None)
+            }
+        if method.__returning__ is TelegramUser:
+            return {"id": 1, "is_bot": True, "first_name": "bench"}
+        return True
+    
+    async def close(self) -> None:
+        pass
+    
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+        yield b""
+
+
+class FakeBotServer:
+    """Имитация Bot API по HTTP для процессов-воркеров: отвечает сразу и считает вызовы"""
+    
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        
+        if method == "getMe":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "bench"}
+        elif method.startswith(("send", "edit")):
+            fields = dict(await request.post())
+            self._message_id += 1
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(fields.get("chat_id") or 0), "type": "private"},
+                "text": fields.get("text")
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+    
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+    
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Учесть запрос к БД в замере текущего обновления"""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+def update_kind(raw: Dict[str, Any]) -> str:
+    """Тип записанного обновления: команда, префикс callback_data или тип обновления"""
+    if "message" in raw:
+        text = raw["message"].get("text") or ""
+        return text.split()[0].split("@")[0] if text.startswith("/") else "message"
+    if "callback_query" in raw:
+        # event_12 -> event_, events_next_65e47fd082980.8 -> events_next_
+        return re.sub(r"_[^_]*\d[^_]*$", "_", raw["callback_query"].get("data") or "")
+    return next((key for key in raw if key != "update_id"), "unknown")
+
+
+class UpdateFactory:
+    """Синтетические обновления Telegram в сыром виде (как приходят в webhook)"""
+    
+    def __init__(self):
+        self._update_id = 0
+    
+    def _next_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+    
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"bench{user_id % 10000}", "language_code": "ru"}
+    
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        message = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": update_id, "message": message}
+    
+    def callback(self, user_id: int, data: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": "bench",
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "🎭"
+                }
+            }
+        }
+
+
+@dataclass
+class BenchData:
+    """Тестовые данные в БД"""
+    user_ids: List[int]
+    admin_ids: List[int]
+    event_ids: List[int]
+    watch_event_id: int
+
+
+def synthetic_scenarios(
+    data: BenchData,
+    mix: Dict[str, float],
+    count: int,
+    rng: random.Random
+) -> List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]:
+    """
+    Сценарии по смеси типов
+    
+    Сценарий - последовательность обновлений одного чата; мастер создания
+    события занимает 7 обновлений подряд.
+    
+    Returns:
+        List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]: (chat_id, [(тип, обновление)])
+    """
+    factory = UpdateFactory()
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    start_time = (datetime.utcnow() + timedelta(days=400)).strftime("%d.%m.%Y %H:%M")
+    scenarios = []
+    
+    for kind in kinds:
+        user_id = rng.choice(data.user_ids)
+        event_id = rng.choice(data.event_ids)
+        
+        if kind == "start":
+            updates = [factory.message(user_id, "/start")]
+        elif kind == "events":
+            updates = [factory.callback(user_id, "events_list")]
+        elif kind == "event":
+            updates = [factory.callback(user_id, f"event_{event_id}")]
+        elif kind == "buy":
+            updates = [factory.callback(user_id, f"buy_{event_id}")]
+        elif kind == "watch":
+            updates = [factory.callback(user_id, f"watch_{data.watch_event_id}")]
+        elif kind == "tickets":
+            updates = [factory.callback(user_id, "my_tickets")]
+        elif kind == "admin_wizard":
+            user_id = rng.choice(data.admin_ids)
+            updates = [factory.callback(user_id, "admin_create_event")] + [
+                factory.message(user_id, text)
+                for text in (f"{BENCH_TITLE} Мастер", "-", start_time, "120", "500", "100")
+            ]
+        else:
+            raise ValueError(f"Неизвестный тип обновления: {kind}")
+        
+        scenarios.append((user_id, [(kind, update) for update in updates]))
+    
+    return scenarios
+
+
+def recorded_scenarios(path: Path) -> List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]:
+    """Записанные обновления (JSONL, по обновлению Telegram на строку)"""
+    scenarios = []
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            body = raw.get("message") or raw.get("callback_query") or {}
+            chat_id = (body.get("from") or {}).get("id", 0)
+            scenarios.append((chat_id, [(update_kind(raw), raw)]))
+    return scenarios
+
+
+async def seed(users: int, events: int) -> BenchData:
+    """Тестовые пользователи, события и билеты на событие для watch_"""
+    user_ids = [BENCH_USER_ID_BASE + i for i in range(users)]
+    admin_ids = [BENCH_ADMIN_ID_BASE + i for i in range(BENCH_ADMINS)]
+    start = datetime.utcnow() + timedelta(days=1)
+    
+    async with async_session_maker() as session:
+        await session.execute(
+            insert(User)
+            .values([{"telegram_id": user_id, "first_name": "bench"} for user_id in user_ids + admin_ids])
+            .on_conflict_do_nothing()
+        )
+        bench_events = [
+            Event(
+                title=f"{BENCH_TITLE} Спектакль №{index + 1}",
+                description="Описание спектакля " * 10,
+                start_time=start + timedelta(days=index),
+                price=500,
+                max_viewers=users * 10,
+                reserved_seats=0,
+                invite_link="https://t.me/+bench" if index == 0 else None
+            )
+            for index in range(events)
+        ]
+        session.add_all(bench_events)
+        await session.flush()
+        
+        watch_event = bench_events[0]
+        orders = [
+            Order(
+                user_id=user_id,
+                event_id=watch_event.id,
+                amount=watch_event.price,
+                status=OrderStatus.PAID,
+                payment_id=f"bench-{uuid.uuid4()}",
+                paid_at=datetime.utcnow()
+            )
+            for user_id in user_ids
+        ]
+        session.add_all(orders)
+        await session.flush()
+        session.add_all([
+            Ticket(order_id=order.id, user_id=order.user_id, event_id=order.event_id, access_token=uuid.uuid4().hex)
+            for order in orders
+        ])
+        watch_event.reserved_seats = watch_event.sold_tickets = len(orders)
+        await session.commit()
+        
+        return BenchData(
+            user_ids=user_ids,
+            admin_ids=admin_ids,
+            event_ids=[event.id for event in bench_events[1:]],
+            watch_event_id=watch_event.id
+        )
+
+
+async def cleanup(data: BenchData) -> None:
+    """Удалить тестовые данные (события - через сервис, чтобы сбросить кэш афиши)"""
+    user_ids = data.user_ids + data.admin_ids
+    
+    async with async_session_maker() as session:
+        event_ids = list((await session.scalars(
+            select(Event.id).where(Event.title.startswith(BENCH_TITLE))
+        )).all())
+        condition = or_(Order.user_id.in_(user_ids), Order.event_id.in_(event_ids))
+        await session.execute(delete(Ticket).where(Ticket.order_id.in_(select(Order.id).where(condition))))
+        await session.execute(delete(Order).where(condition))
+        await session.commit()
+        
+        event_service = EventService(session)
+        for event_id in event_ids:
+            await event_service.delete_event(event_id)
+        
+        await session.execute(delete(User).where(User.telegram_id.in_(user_ids)))
+        await session.commit()
+
+
+async def run_scenarios(
+    dp: Dispatcher,
+    bot: Bot,
+    scenarios: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]],
+    concurrency: int
+) -> List[UpdateStats]:
+    """Обработать сценарии; обновления одного чата идут по порядку"""
+    results: List[UpdateStats] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    chat_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    async def run(chat_id: int, updates: List[Tuple[str, Dict[str, Any]]]) -> None:
+        async with semaphore, chat_locks[chat_id]:
+            for kind, raw in updates:
+                stats = UpdateStats(kind)
+                token = current_stats.set(stats)
+                started = time.perf_counter()
+                try:
+                    await dp.feed_raw_update(bot, raw)
+                except Exception as e:
+                    stats.error = True
+                    logger.error(f"Обновление {kind} упало: {e!r}")
+                finally:
+                    stats.latency = time.perf_counter() - started
+                    current_stats.reset(token)
+                results.append(stats)
+    
+    await asyncio.gather(*(run(chat_id, updates) for chat_id, updates in scenarios))
+    return results
+
+
+async def run_in_workers(
+    pool: WorkerPool,
+    scenarios: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]
+) -> int:
+    """
+    Раздать сценарии воркерам и дождаться обработки
+    
+    Returns:
+        int: Сколько обновлений обработано с ошибкой
+    """
+    processed, errors = pool.processed(), pool.errors()
+    count = 0
+    for _, updates in scenarios:
+        for _, raw in updates:
+            if await pool.submit(raw):
+                count += 1
+    
+    while pool.processed() - processed < count:
+        await asyncio.sleep(0.01)
+    return pool.errors() - errors
+
+
+def summarize(results: List[UpdateStats], elapsed: float) -> Dict[str, Any]:
+    """Сводка по типам обновлений"""
+    by_kind: Dict[str, List[UpdateStats]] = defaultdict(list)
+    for stats in results:
+        by_kind[stats.kind].append(stats)
+    
+    def describe(items: List[UpdateStats]) -> Dict[str, Any]:
+        latencies = sorted(stats.latency * 1000 for stats in items)
+        return {
+            "count": len(items),
+            "errors": sum(stats.error for stats in items),
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries_per_update": round(statistics.fmean(stats.queries for stats in items), 2),
+            "api_calls_per_update": round(statistics.fmean(stats.api_calls for stats in items), 2)
+        }
+    
+    return {
+        "total": {**describe(results), "updates_per_second": round(len(results) / elapsed, 1)},
+        "kinds": {kind: describe(items) for kind, items in sorted(by_kind.items())}
+    }
+
+
+def log_summary(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Вывести сводку (и изменение относительно прошлого запуска)"""
+    def delta(kind: str, key: str, value: float) -> str:
+        previous = (baseline or {}).get("kinds", {}).get(kind, {}).get(key)
+        if not previous:
+            return ""
+        return f" ({(value - previous) / previous * 100:+.0f}%)"
+    
+    lines = [f"{'тип':<16}{'кол-во':>8}{'p50 мс':>16}{'p95 мс':>10}{'p99 мс':>16}{'запросов':>16}{'API':>6}"]
+    for kind, row in summary["kinds"].items():
+        lines.append(
+            f"{kind:<16}{row['count']:>8}"
+            f"{row['p50_ms']:>9.2f}{delta(kind, 'p50_ms', row['p50_ms']):<7}"
+            f"{row['p95_ms']:>10.2f}"
+            f"{row['p99_ms']:>9.2f}{delta(kind, 'p99_ms', row['p99_ms']):<7}"
+            f"{row['queries_per_update']:>9.2f}{delta(kind, 'queries_per_update', row['queries_per_update']):<7}"
+            f"{row['api_calls_per_update']:>6.1f}"
+        )
+    
+    total = summary["total"]
+    lines.append(
+        f"Всего {total['count']} обновлений, {total['updates_per_second']}/с, ошибок {total['errors']}, "
+        f"p50={total['p50_ms']:.2f} мс p99={total['p99_ms']:.2f} мс"
+    )
+    logger.info("Обработка обновлений:\n" + "\n".join(lines))
+
+
+def git_commit() -> Optional[str]:
+    """Текущий коммит (для подписи результатов)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """start=1,events=3 -> {"start": 1.0, "events": 3.0}"""
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+async def main(args: argparse.Namespace):
+    """Бенчмарк обработки обновлений"""
+    setup_logging()
+    await init_db()
+    
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    data = await seed(args.users, args.events)
+    # Тестовые администраторы проходят IsAdminFilter
+    settings.admin_ids = ",".join(map(str, settings.admin_list + data.admin_ids))
+    
+    if args.recorded:
+        scenarios = recorded_scenarios(Path(args.recorded))
+    else:
+        scenarios = synthetic_scenarios(data, mix, args.warmup + args.updates, rng)
+    warmup, scenarios = scenarios[:args.warmup], scenarios[args.warmup:]
+    
+    try:
+        if args.workers:
+            summary, calls = await bench_workers(args, warmup, scenarios)
+        else:
+            summary, calls = await bench_in_process(args, warmup, scenarios)
+    finally:
+        await cleanup(data)
+    
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    if args.workers:
+        log_workers_summary(summary, baseline)
+    else:
+        log_summary(summary, baseline)
+    logger.info(f"Вызовы Bot API: {dict(calls)}")
+    
+    output = Path(args.output) if args.output else RESULTS_DIR / f"updates_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "params": {
+            "updates": args.updates,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mix": args.mix if not args.recorded else None,
+            "recorded": args.recorded,
+            "users": args.users,
+            "events": args.events,
+            "seed": args.seed
+        },
+        **summary
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.success(f"Результаты сохранены в {output}")
+    
+    await close_redis()
+    await close_db()
+
+
+async def bench_in_process(
+    args: argparse.Namespace,
+    warmup: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]],
+    scenarios: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]
+) -> Tuple[Dict[str, Any], Counter]:
+    """Замер в этом процессе: задержки, запросы и вызовы API по каждому обновлению"""
+    session = RecordingSession()
+    bot = Bot(token="123456:bench", session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    activity_buffer = UserActivityBuffer()
+    dp = create_dispatcher(activity_buffer)
+    sa_event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+    await activity_buffer.start()
+    
+    try:
+        logger.info(f"Прогрев: {len(warmup)} сценариев")
+        await run_scenarios(dp, bot, warmup, args.concurrency)
+        
+        logger.info(f"Замер: {len(scenarios)} сценариев, параллельно {args.concurrency}")
+        started = time.perf_counter()
+        results = await run_scenarios(dp, bot, scenarios, args.concurrency)
+        elapsed = time.perf_counter() - started
+    finally:
+        sa_event.remove(engine.sync_engine, "before_cursor_execute", count_query)
+        await activity_buffer.stop()
+        await dp.storage.close()
+    
+    return summarize(results, elapsed), session.calls
+
+
+async def bench_workers(
+    args: argparse.Namespace,
+    warmup: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]],
+    scenarios: List[Tuple[int, List[Tuple[str, Dict[str, Any]]]]]
+) -> Tuple[Dict[str, Any], Counter]:
+    """Замер через WorkerPool: пропускная способность N процессов-воркеров"""
+    server = FakeBotServer()
+    await server.start()
+    
+    # Воркеры запускаются через spawn и читают настройки из окружения
+    os.environ["TELEGRAM_API_URL"] = server.url
+    os.environ["ADMIN_IDS"] = settings.admin_ids
+    os.environ["WORKER_CONCURRENCY"] = str(args.concurrency)
+    
+    pool = WorkerPool(args.workers)
+    pool.start()
+    try:
+        logger.info(f"Прогрев: {len(warmup)} сценариев (и запуск воркеров)")
+        await run_in_workers(pool, warmup)
+        server.calls.clear()
+        
+        count = sum(len(updates) for _, updates in scenarios)
+        logger.info(
+            f"Замер: {len(scenarios)} сценариев, воркеров {args.workers}, "
+            f"параллельно {args.concurrency} в каждом"
+        )
+        started = time.perf_counter()
+        errors = await run_in_workers(pool, scenarios)
+        elapsed = time.perf_counter() - started
+    finally:
+        await pool.stop()
+        await server.stop()
+    
+    summary = {
+        "total": {
+            "count": count,
+            "errors": errors,
+            "updates_per_second": round(count / elapsed, 1),
+            "api_calls_per_update": round(sum(server.calls.values()) / count, 2) if count else 0
+        },
+        "kinds": {}
+    }
+    return summary, server.calls
+
+
+def log_workers_summary(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Вывести пропускную способность воркеров (и изменение относительно прошлого запуска)"""
+    total = summary["total"]
+    previous = (baseline or {}).get("total", {}).get("updates_per_second")
+    change = f" ({(total['updates_per_second'] - previous) / previous * 100:+.0f}%)" if previous else ""
+    logger.info(
+        f"Воркеры: {total['count']} обновлений, {total['updates_per_second']}/с{change}, "
+        f"ошибок {total['errors']}, вызовов API на обновление {total['api_calls_per_update']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк обработки обновлений через Dispatcher")
+    parser.add_argument("--updates", type=int, default=2000, help="Сценариев в замере")
+    parser.add_argument("--warmup", type=int, default=200, help="Сценариев прогрева (не учитываются)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Одновременно обрабатываемых чатов (в каждом воркере)")
+    parser.add_argument("--workers", type=int, default=0, help="Процессов-воркеров через WorkerPool (0 - в этом процессе)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Веса типов: start, events, event, buy, watch, tickets, admin_wizard")
+    parser.add_argument("--recorded", help="Записанные обновления (JSONL) вместо синтетических")
+    parser.add_argument("--users", type=int, default=500, help="Тестовых пользователей")
+    parser.add_argument("--events", type=int, default=30, help="Тестовых событий")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора смеси")
+    parser.add_argument("--output", help=f"Файл результатов (по умолчанию {RESULTS_DIR}/updates_<время>.json)")
+    parser.add_argument("--compare", help="Результаты прошлого запуска для сравнения")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,214 @@
+"""
+Проверка планов горячих запросов: ни один не должен читать большую таблицу целиком
+
+Создает временную БД, накатывает на нее миграции, заполняет ~1 млн строк
+и выполняет вызовы сервисов бота (афиша, заказы, билеты, оплаты, рассылки).
+SQL, который они отправили, перехватывается и прогоняется через EXPLAIN;
+Seq Scan по users, events, orders или tickets считается регрессией
+(код выхода 1).
+
+Пример:
+    python scripts/explain_hot_queries.py --rows 1000000 --events 100000
+"""
+import argparse
+import asyncio
+import json
+import sys
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import event, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+
+from config import setup_logging, settings
+from database import Event
+from database.migrate import upgrade_database
+from modules.broadcasts import BroadcastService
+from modules.events.service import EventService
+from modules.payments.service import PaymentService, PaymentNotification, PAYMENT_SUCCEEDED
+from modules.tickets import TicketService
+
+
+# Таблицы, полный проход по которым недопустим
+LARGE_TABLES = {"users", "events", "orders", "tickets"}
+
+# Заполнение: события в основном прошедшие, ~200 предстоящих; заказы в основном
+# оплачены (с билетом), каждый двадцатый - PENDING с действующей бронью
+SEED = (
+    """
+    INSERT INTO users (telegram_id, first_name, language_code, role, is_premium, balance, created_at, is_blocked)
+    SELECT g, 'user' || g, 'ru', 'USER', false, 0, now() - g * interval '1 second', g % 50 = 0
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO events (
+        title, start_time, duration_minutes, price, max_viewers, reserved_seats,
+        sold_tickets, revenue, version, status, created_at
+    )
+    SELECT
+        'Спектакль ' || g,
+        CASE WHEN g > :events - 200 THEN now() + (g - :events + 200) * interval '1 day'
+             ELSE now() - (:events - g) * interval '1 hour' END,
+        120, 500, 1000, 0, 0, 0, 1,
+        CASE WHEN g > :events - 200 THEN 'UPCOMING' ELSE 'FINISHED' END::eventstatus,
+        now()
+    FROM generate_series(1, :events) g
+    """,
+    """
+    INSERT INTO orders (user_id, event_id, amount, status, payment_id, created_at, paid_at, reserved_until)
+    SELECT
+        g,
+        1 + g % :events,
+        500,
+        CASE WHEN g % 20 = 0 THEN 'PENDING' ELSE 'PAID' END::orderstatus,
+        CASE WHEN g % 20 = 0 THEN NULL ELSE 'p' || g END,
+        now(),
+        CASE WHEN g % 20 = 0 THEN NULL ELSE now() END,
+        CASE WHEN g % 20 = 0 THEN now() + interval '15 minutes' END
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO tickets (order_id, user_id, event_id, access_token, is_used, created_at)
+    SELECT id, user_id, event_id, md5(id::text), false, now()
+    FROM orders
+    WHERE status = 'PAID'
+    """,
+)
+
+
+class StatementRecorder:
+    """Перехват SQL, который отправляет движок"""
+    
+    def __init__(self):
+        self.statements: List[Tuple[str, Any]] = []
+        self.enabled = False
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and not executemany:
+            self.statements.append((statement, parameters))
+
+
+async def hot_queries(session: AsyncSession, rows: int, events: int) -> None:
+    """Вызовы сервисов, SQL которых проверяется"""
+    service = EventService(session)
+    
+    # Афиша: первая страница, следующая, число предстоящих
+    _, next_cursor, _ = await service._get_page(service._upcoming_query(), None, False, 10)
+    await service._get_page(service._upcoming_query(), next_cursor, False, 10)
+    await session.scalar(service._upcoming_query().with_only_columns(func.count()).order_by(None))
+    
+    # Админка: все события, новые первыми, и страница из середины архива
+    _, next_cursor, _ = await service._get_page(select(Event), None, False, 10, descending=True)
+    await service._get_page(select(Event), next_cursor, False, 10, descending=True)
+    await service._load_event(events // 2)
+    
+    # Покупатель: заказ, билеты
+    tickets = TicketService(session)
+    user_id = 12345
+    event_id = 1 + user_id % events
+    await tickets.get_active_order(user_id, event_id)
+    await tickets.has_ticket(user_id, event_id)
+    await tickets.get_user_tickets(user_id)
+    await tickets.get_user_ticket(user_id, 1)
+    
+    # Фоновые задачи: истекшие брони, пересчет счетчиков события
+    await tickets.release_expired_reservations()
+    await tickets.fix_counters(event_id)
+    
+    # Уведомление ЮKassa о неизвестном заказе: поиск по id и payment_id под блокировкой
+    await PaymentService(session).apply_notifications([
+        PaymentNotification(PAYMENT_SUCCEEDED, "p-unknown", rows + 1, amount=Decimal(500), currency="RUB")
+    ])
+    
+    # Рассылка: порция получателей из середины
+    await BroadcastService(session).get_recipients_chunk(500_000, settings.broadcast_chunk_size)
+
+
+def seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Таблицы из LARGE_TABLES, читаемые Seq Scan в плане"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain(connection: AsyncConnection, statement: str, parameters: Any) -> Dict[str, Any]:
+    """План запроса (EXPLAIN без выполнения)"""
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def main(rows: int, events: int, keep: bool) -> int:
+    """Проверка планов; код выхода"""
+    setup_logging()
+    
+    url = make_url(settings.database_url)
+    scratch = f"{url.database}_explain"
+    admin = dict(host=url.host, port=url.port, user=url.username, password=url.password, database=url.database)
+    
+    connection = await asyncpg.connect(**admin)
+    await connection.execute(f'DROP DATABASE IF EXISTS "{scratch}"')
+    await connection.execute(f'CREATE DATABASE "{scratch}"')
+    await connection.close()
+    
+    engine = create_async_engine(url.set(database=scratch))
+    recorder = StatementRecorder()
+    event.listen(engine.sync_engine, "before_cursor_execute", recorder)
+    
+    try:
+        await upgrade_database(engine)
+        
+        logger.info(f"Заполнение: {rows} пользователей и заказов, {events} событий...")
+        async with engine.begin() as conn:
+            for statement in SEED:
+                await conn.execute(text(statement), {"rows": rows, "events": events})
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql("VACUUM ANALYZE")
+        
+        recorder.enabled = True
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await hot_queries(session, rows, events)
+        recorder.enabled = False
+        
+        failures = 0
+        async with engine.connect() as conn:
+            for statement, parameters in recorder.statements:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                    continue
+                plan = await explain(conn, statement, parameters)
+                scans = seq_scans(plan)
+                summary = " ".join(statement.split())[:110]
+                if scans:
+                    failures += 1
+                    logger.error(f"❌ Seq Scan {', '.join(scans)}: {summary}")
+                else:
+                    logger.info(f"✅ {plan['Node Type']}, cost {plan['Total Cost']:.0f}: {summary}")
+        
+        if failures:
+            logger.error(f"Запросов с полным проходом по таблице: {failures}")
+            return 1
+        logger.success(f"Проверено запросов: {len(recorder.statements)}, полных проходов нет")
+        return 0
+    finally:
+        await engine.dispose()
+        if not keep:
+            connection = await asyncpg.connect(**admin)
+            await connection.execute(f'DROP DATABASE IF EXISTS "{scratch}"')
+            await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка планов горячих запросов (EXPLAIN)")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Пользователей и заказов")
+    parser.add_argument("--events", type=int, default=100_000, help="Событий")
+    parser.add_argument("--keep", action="store_true", help="Не удалять временную БД")
+    args = parser.parse_args()
+    
+    sys.exit(asyncio.run(main(args.rows, args.events, args.keep)))
@@ -0,0 +1,523 @@
+"""
+Нагрузочный тест показа: тысячи зрителей открывают бота перед началом спектакля
+
+Бот (настоящий Dispatcher с polling) работает в этом процессе, а в дочернем
+процессе поднимается имитация Telegram Bot API (getUpdates, sendMessage,
+editMessageText, answerCallbackQuery, sendPhoto и 429 с retry_after) и
+генератор зрителей по кривой прихода. Каждый зритель проходит шаги
+(/start, «Мои билеты», QR-код, «Смотреть») с паузами и ждет ответа бота.
+
+Отчет: время ответа от отправки обновления до первого ответа бота в чат,
+число 429 (flood wait), загрузка пула соединений БД и задержка event loop.
+Сеть не нужна: нужны только локальные PostgreSQL и Redis.
+
+Пример:
+    python scripts/load_showtime.py --users 10000 --duration 300 --curve ramp
+    python scripts/load_showtime.py --users 2000 --duration 60 --showtime --global-rate 0
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from loguru import logger
+from sqlalchemy import select, delete, text
+
+from config import setup_logging, settings
+from database import init_db, close_db, engine, Event, Order, Ticket, User
+from database.session import async_session_maker
+from modules.events import EventService
+from modules.tickets.showtime import showtime
+from modules.users import UserActivityBuffer
+from bot.main import create_bot, create_dispatcher
+from scripts.bench_stats import percentile
+from utils.redis_client import close_redis
+
+
+# Диапазон telegram_id тестовых зрителей, не пересекающийся с реальными
+BENCH_USER_ID_BASE = 9_300_000_000
+BENCH_TITLE = "[bench] Премьера"
+
+STEPS = ("start", "tickets", "ticket", "watch")
+CURVES = ("uniform", "ramp", "spike")
+
+# Методы, на которые распространяются лимиты Telegram на отправку сообщений
+LIMITED_METHODS = {"sendMessage", "sendPhoto", "editMessageText"}
+
+
+@dataclass
+class LoadParams:
+    """Параметры генератора нагрузки (передаются в дочерний процесс)"""
+    port: int
+    viewers: List[Tuple[int, int]]  # (telegram_id, id билета)
+    event_id: int
+    duration: float
+    curve: str
+    steps: List[str]
+    think: float
+    timeout: float
+    global_rate: float
+    chat_rate: float
+    seed: int
+
+
+def describe(values: List[float]) -> str:
+    """p50/p95/p99/max в миллисекундах"""
+    if not values:
+        return "нет данных"
+    values = sorted(values)
+    return (
+        f"p50={statistics.median(values) * 1000:.0f} p95={percentile(values, 95) * 1000:.0f} "
+        f"p99={percentile(values, 99) * 1000:.0f} max={values[-1] * 1000:.0f} мс"
+    )
+
+
+def arrival_time(fraction: float, duration: float, curve: str) -> float:
+    """
+    Момент прихода зрителя с долей fraction в общей очереди
+    
+    uniform - равномерно, ramp - поток растет линейно к началу спектакля,
+    spike - 80% зрителей приходят в последние 20% времени.
+    """
+    if curve == "ramp":
+        return duration * math.sqrt(fraction)
+    if curve == "spike":
+        if fraction < 0.2:
+            return duration * 0.8 * fraction / 0.2
+        return duration * (0.8 + 0.2 * (fraction - 0.2) / 0.8)
+    return duration * fraction
+
+
+class TokenBucket:
+    """Лимит частоты с запасом в одну секунду"""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+    
+    def take(self) -> float:
+        """Взять токен; 0 или сколько секунд ждать"""
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeBotAPI:
+    """
+    Имитация Telegram Bot API
+    
+    Обновления выдаются через getUpdates (long polling). Ответ бота в чат
+    (сообщение, правка или ответ на callback) завершает ожидание зрителя.
+    Отправка сообщений ограничена общим и почтовым (на чат) лимитом, как
+    в Telegram; превышение - 429 с retry_after.
+    """
+    
+    def __init__(self, global_rate: float, chat_rate: float):
+        self.global_bucket = TokenBucket(global_rate) if global_rate > 0 else None
+        self.chat_rate = chat_rate
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.updates: List[Dict[str, Any]] = []
+        self.new_updates = asyncio.Event()
+        self.update_id = 0
+        self.message_id = 0
+        self.waiting: Dict[int, Tuple[float, asyncio.Future]] = {}
+        self.callback_chats: Dict[str, int] = {}
+        self.calls: Counter = Counter()
+        self.flood_waits: Counter = Counter()
+    
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=20 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+    
+    def push(self, chat_id: int, update: Dict[str, Any]) -> asyncio.Future:
+        """Отдать обновление боту; future получит время до ответа"""
+        self.update_id += 1
+        update["update_id"] = self.update_id
+        if "callback_query" in update:
+            self.callback_chats[update["callback_query"]["id"]] = chat_id
+        
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[chat_id] = (time.perf_counter(), future)
+        self.updates.append(update)
+        self.new_updates.set()
+        return future
+    
+    def _answered(self, chat_id: Optional[int]) -> None:
+        started, future = self.waiting.pop(chat_id, (None, None))
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter() - started)
+    
+    def _flood_wait(self, method: str, chat_id: Optional[int]) -> Optional[float]:
+        """Задержка до разрешенной отправки (None - можно отправлять)"""
+        if method not in LIMITED_METHODS:
+            return None
+        if chat_id is not None and self.chat_rate > 0:
+            bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate))
+            wait = bucket.take()
+            if wait:
+                return wait
+        if self.global_bucket is not None:
+            wait = self.global_bucket.take()
+            if wait:
+                return wait
+        return None
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+        
+        if method == "getUpdates":
+            return await self._get_updates(params)
+        
+        chat_id = int(params["chat_id"]) if "chat_id" in params else self.callback_chats.pop(
+            params.get("callback_query_id"), None
+        )
+        
+        wait = self._flood_wait(method, chat_id)
+        if wait is not None:
+            self.flood_waits[method] += 1
+            retry_after = max(1, math.ceil(wait))
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after}
+            })
+        
+        self._answered(chat_id)
+        return web.json_response({"ok": True, "result": self._result(method, params, chat_id)})
+    
+    async def _get_updates(self, params: Dict[str, Any]) -> web.Response:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        
+        self.updates = [update for update in self.updates if update["update_id"] >= offset]
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        
+        return web.json_response({"ok": True, "result": self.updates[:limit]})
+    
+    def _result(self, method: str, params: Dict[str, Any], chat_id: Optional[int]) -> Any:
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+        if method not in LIMITED_METHODS:
+            return True
+        
+        self.message_id += 1
+        message: Dict[str, Any] = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id or 0, "type": "private"},
+        }
+        if method == "sendPhoto":
+            message["photo"] = [{
+                "file_id": f"load-photo-{self.message_id}",
+                "file_unique_id": f"u{self.message_id}",
+                "width": 400,
+                "height": 400
+            }]
+        else:
+            message["text"] = params.get("text", "")
+        return message
+
+
+def make_update(step: str, user_id: int, ticket_id: int, event_id: int) -> Dict[str, Any]:
+    """Обновление шага зрителя"""
+    sender = {"id": user_id, "is_bot": False, "first_name": "viewer", "language_code": "ru"}
+    chat = {"id": user_id, "type": "private"}
+    now = int(time.time())
+    
+    if step == "start":
+        return {"message": {
+            "message_id": 1, "date": now, "chat": chat, "from": sender, "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}]
+        }}
+    
+    data = {"tickets": "my_tickets", "ticket": f"ticket_{ticket_id}", "watch": f"watch_{event_id}"}[step]
+    return {"callback_query": {
+        "id": f"{user_id}-{step}-{time.monotonic_ns()}",
+        "from": sender,
+        "chat_instance": "load",
+        "data": data,
+        "message": {"message_id": 1, "date": now, "chat": chat, "text": "🎭"}
+    }}
+
+
+async def generate_load(params: LoadParams, ready, start) -> Dict[str, Any]:
+    """Поднять имитацию Bot API и провести зрителей по шагам"""
+    api = FakeBotAPI(params.global_rate, params.chat_rate)
+    runner = web.AppRunner(api.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", params.port).start()
+    
+    ready.set()
+    await asyncio.get_running_loop().run_in_executor(None, start.wait)
+    
+    rng = random.Random(params.seed)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    timeouts: Counter = Counter()
+    arrived = 0
+    started = time.perf_counter()
+    
+    async def viewer(index: int, user_id: int, ticket_id: int) -> None:
+        nonlocal arrived
+        at = arrival_time((index + 0.5) / len(params.viewers), params.duration, params.curve)
+        await asyncio.sleep(max(0.0, started + at - time.perf_counter()))
+        arrived += 1
+        
+        for number, step in enumerate(params.steps):
+            if number:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * params.think)
+            future = api.push(user_id, make_update(step, user_id, ticket_id, params.event_id))
+            try:
+                latencies[step].append(await asyncio.wait_for(future, params.timeout))
+            except asyncio.TimeoutError:
+                # Бот не ответил (например, ответ отклонен с 429): зритель уходит
+                api.waiting.pop(user_id, None)
+                timeouts[step] += 1
+                return
+    
+    async def progress() -> None:
+        while True:
+            await asyncio.sleep(5)
+            logger.info(
+                f"Пришло {arrived}/{len(params.viewers)} зрителей, "
+                f"ответов {sum(map(len, latencies.values()))}, без ответа {sum(timeouts.values())}, "
+                f"429: {sum(api.flood_waits.values())}"
+            )
+    
+    reporter = asyncio.create_task(progress())
+    await asyncio.gather(*(
+        viewer(index, user_id, ticket_id) for index, (user_id, ticket_id) in enumerate(params.viewers)
+    ))
+    reporter.cancel()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    
+    return {
+        "elapsed": elapsed,
+        "latencies": dict(latencies),
+        "timeouts": dict(timeouts),
+        "calls": dict(api.calls),
+        "flood_waits": dict(api.flood_waits)
+    }
+
+
+def load_process(params: LoadParams, ready, start, connection) -> None:
+    """Точка входа дочернего процесса"""
+    connection.send(asyncio.run(generate_load(params, ready, start)))
+    connection.close()
+
+
+class Sampler:
+    """Замеры в процессе бота: задержка event loop и занятость пула соединений БД"""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.loop_lag: List[float] = []
+        self.pool_checked_out: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def pool_limit(self) -> int:
+        return engine.pool.size() + getattr(engine.pool, "_max_overflow", 0)
+    
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.loop_lag.append(max(0.0, loop.time() - expected))
+            self.pool_checked_out.append(engine.pool.checkedout())
+
+
+async def seed(viewers: int, minutes_to_start: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """Событие и зрители с билетами на него"""
+    async with async_session_maker() as session:
+        event = Event(
+            title=BENCH_TITLE,
+            start_time=datetime.utcnow() + timedelta(minutes=minutes_to_start),
+            price=500,
+            max_viewers=viewers,
+            invite_link="https://t.me/+load",
+            reserved_seats=viewers,
+            sold_tickets=viewers
+        )
+        session.add(event)
+        await session.flush()
+        
+        params = {"base": BENCH_USER_ID_BASE, "viewers": viewers, "event_id": event.id}
+        await session.execute(text(
+            "INSERT INTO users (telegram_id, first_name, language_code, role, is_premium, balance, created_at, is_blocked) "
+            "SELECT CAST(:base AS bigint) + g, 'viewer', 'ru', 'USER', false, 0, now(), false "
+            "FROM generate_series(0, CAST(:viewers AS integer) - 1) g ON CONFLICT DO NOTHING"
+        ), params)
+        await session.execute(text(
+            "INSERT INTO orders (user_id, event_id, amount, status, payment_id, created_at, paid_at) "
+            "SELECT CAST(:base AS bigint) + g, CAST(:event_id AS integer), 500, 'PAID', 'load-' || CAST(:event_id AS integer) || '-' || g, now(), now() "
+            "FROM generate_series(0, CAST(:viewers AS integer) - 1) g"
+        ), params)
+        await session.execute(text(
+            "INSERT INTO tickets (order_id, user_id, event_id, access_token, is_used, created_at) "
+            "SELECT id, user_id, event_id, md5(random()::text || id), false, now() "
+            "FROM orders WHERE event_id = :event_id"
+        ), params)
+        await session.commit()
+        
+        result = await session.execute(
+            select(Ticket.user_id, Ticket.id).where(Ticket.event_id == event.id).order_by(Ticket.user_id)
+        )
+        return event.id, [tuple(row) for row in result.all()]
+
+
+async def cleanup(event_id: int, viewers: int) -> None:
+    """Удалить тестовые данные"""
+    await showtime.stop(event_id)
+    async with async_session_maker() as session:
+        await session.execute(delete(Ticket).where(Ticket.event_id == event_id))
+        await session.execute(delete(Order).where(Order.event_id == event_id))
+        await session.commit()
+        await EventService(session).delete_event(event_id)
+        await session.execute(delete(User).where(
+            User.telegram_id.between(BENCH_USER_ID_BASE, BENCH_USER_ID_BASE + viewers - 1)
+        ))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace):
+    """Нагрузочный тест показа"""
+    setup_logging()
+    await init_db()
+    
+    steps = [step.strip() for step in args.steps.split(",")]
+    if not set(steps) <= set(STEPS):
+        raise SystemExit(f"Шаги: {', '.join(STEPS)}")
+    
+    event_id, viewers = await seed(args.users, args.minutes_to_start)
+    logger.info(f"Событие {event_id}: {len(viewers)} зрителей с билетами")
+    
+    if args.showtime:
+        async with async_session_maker() as session:
+            event = await session.get(Event, event_id)
+            await showtime.start(session, event)
+    
+    params = LoadParams(
+        port=args.port,
+        viewers=viewers,
+        event_id=event_id,
+        duration=args.duration,
+        curve=args.curve,
+        steps=steps,
+        think=args.think,
+        timeout=args.timeout,
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate,
+        seed=args.seed
+    )
+    
+    # Имитация Bot API и зрители в отдельном процессе: их работа не искажает задержку loop бота
+    context = multiprocessing.get_context("spawn")
+    ready, start = context.Event(), context.Event()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=load_process, args=(params, ready, start, sender), daemon=True)
+    process.start()
+    
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, ready.wait)
+    
+    settings.telegram_api_url = f"http://127.0.0.1:{args.port}"
+    bot = create_bot()
+    activity_buffer = UserActivityBuffer()
+    dp = create_dispatcher(activity_buffer)
+    sampler = Sampler()
+    
+    await activity_buffer.start()
+    sampler.start()
+    polling = asyncio.create_task(dp.start_polling(
+        bot, handle_signals=False, close_bot_session=True, allowed_updates=dp.resolve_used_update_types()
+    ))
+    
+    try:
+        logger.info(
+            f"Старт: {args.users} зрителей за {args.duration:.0f} с ({args.curve}), шаги {', '.join(steps)}"
+        )
+        start.set()
+        result = await loop.run_in_executor(None, receiver.recv)
+    finally:
+        await dp.stop_polling()
+        await polling
+        await sampler.stop()
+        await activity_buffer.stop()
+        await dp.storage.close()
+        process.join(timeout=5)
+        await cleanup(event_id, args.users)
+    
+    lines = [f"Зрителей {args.users} за {result['elapsed']:.0f} с, кривая {args.curve}"]
+    for step in steps:
+        answered = result["latencies"].get(step, [])
+        lines.append(
+            f"  {step:<8} ответов {len(answered):>6}, без ответа {result['timeouts'].get(step, 0):>5}: "
+            f"{describe(answered)}"
+        )
+    lines.append(f"Bot API: {json.dumps(result['calls'], ensure_ascii=False)}")
+    lines.append(f"429 (flood wait): {sum(result['flood_waits'].values())} {json.dumps(result['flood_waits'])}")
+    
+    checked_out = sorted(sampler.pool_checked_out)
+    saturated = sum(value >= sampler.pool_limit for value in checked_out)
+    lines.append(
+        f"Пул БД: занято p50={statistics.median(checked_out):.0f} p99={percentile(checked_out, 99)} "
+        f"max={checked_out[-1]} из {sampler.pool_limit}, исчерпан {saturated / len(checked_out) * 100:.1f}% времени"
+    )
+    lines.append(f"Задержка event loop: {describe(sampler.loop_lag)}")
+    logger.info("Итоги нагрузочного теста:\n" + "\n".join(lines))
+    
+    await close_redis()
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест показа с имитацией Telegram Bot API")
+    parser.add_argument("--users", type=int, default=10000, help="Зрителей")
+    parser.add_argument("--duration", type=float, default=300, help="Время прихода зрителей, сек")
+    parser.add_argument("--curve", choices=CURVES, default="ramp", help="Кривая прихода")
+    parser.add_argument("--steps", default="start,tickets,watch", help=f"Шаги зрителя: {', '.join(STEPS)}")
+    parser.add_argument("--think", type=float, default=2.0, help="Пауза между шагами, сек")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Ожидание ответа бота, сек")
+    parser.add_argument("--global-rate", type=float, default=30, help="Лимит сообщений бота в секунду (0 - без лимита)")
+    parser.add_argument("--chat-rate", type=float, default=1, help="Лимит сообщений в один чат в секунду (0 - без лимита)")
+    parser.add_argument("--minutes-to-start", type=int, default=10, help="Минут до начала спектакля")
+    parser.add_argument("--showtime", action="store_true", help="Включить режим показа (проверка доступа через Redis)")
+    parser.add_argument("--port", type=int, default=8099, help="Порт имитации Bot API")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора пауз")
+    asyncio.run(main(parser.parse_args()))
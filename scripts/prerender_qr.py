@@ -0,0 +1,43 @@
+"""
+Предварительная генерация QR-кодов билетов события на всех ядрах
+
+Пример:
+    python scripts/prerender_qr.py 42
+"""
+import argparse
+import asyncio
+import os
+from loguru import logger
+
+from config import setup_logging
+from database import close_db
+from database.session import async_session_maker
+from modules.tickets import TicketQRService
+from utils.qr import QRRenderer
+from utils.redis_client import close_redis
+
+
+async def main(event_id: int, workers: int):
+    """Генерация QR-кодов"""
+    setup_logging()
+    
+    renderer = QRRenderer(workers)
+    logger.info(f"Генерация QR-кодов события {event_id} на {renderer.workers} процессах...")
+    
+    try:
+        async with async_session_maker() as session:
+            rendered = await TicketQRService(session, renderer=renderer).prerender_event(event_id)
+        logger.success(f"✅ Нарисовано QR-кодов: {rendered}")
+    finally:
+        await renderer.close()
+        await close_redis()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Предварительная генерация QR-кодов билетов события")
+    parser.add_argument("event_id", type=int, help="ID события")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Количество процессов")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.event_id, args.workers))
@@ -0,0 +1,56 @@
+"""
+Сверка денормализованных счетчиков продаж событий с заказами
+
+Пример:
+    python scripts/reconcile_counters.py         # только отчет
+    python scripts/reconcile_counters.py --fix   # отчет и исправление
+"""
+import argparse
+import asyncio
+from loguru import logger
+
+from config import setup_logging
+from database import close_db
+from database.session import async_session_maker
+from modules.tickets import TicketService
+
+
+async def main(fix: bool):
+    """Сверка счетчиков"""
+    setup_logging()
+    
+    logger.info("Сверка счетчиков продаж...")
+    
+    try:
+        async with async_session_maker() as session:
+            ticket_service = TicketService(session)
+            drifts = await ticket_service.find_counter_drift()
+            
+            if not drifts:
+                logger.success("✅ Расхождений нет")
+                return
+            
+            for drift in drifts:
+                logger.warning(
+                    f"Событие {drift.event_id}: "
+                    f"мест {drift.stored[0]} → {drift.actual[0]}, "
+                    f"продано {drift.stored[1]} → {drift.actual[1]}, "
+                    f"выручка {drift.stored[2]} → {drift.actual[2]}"
+                )
+            
+            logger.warning(f"⚠️ Событий с расхождениями: {len(drifts)}")
+            
+            if fix:
+                for drift in drifts:
+                    await ticket_service.fix_counters(drift.event_id)
+                logger.success(f"✅ Исправлено событий: {len(drifts)}")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка счетчиков продаж событий")
+    parser.add_argument("--fix", action="store_true", help="Исправить найденные расхождения")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.fix))
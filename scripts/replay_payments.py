@@ -0,0 +1,216 @@
+"""
+Нагрузочный тест приема платежей: поток уведомлений ЮKassa с повторами
+
+Создает тестовое событие и PENDING заказы, шлет на webhook уведомления
+payment.succeeded (часть - повторно) и refund.succeeded с заданной частотой,
+затем проверяет, что каждый заказ оплачен ровно один раз.
+
+Без --url поднимает в процессе свой прием уведомлений (без бота), иначе
+шлет на запущенный бот (PAYMENTS_WEBHOOK_ENABLED=true, PAYMENTS_TRUSTED_IPS=).
+
+Пример:
+    python scripts/replay_payments.py --orders 2000 --rate 1000 --duplicates 0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import aiohttp
+from loguru import logger
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from config import setup_logging, settings
+from database import init_db, close_db, Event, Order, Ticket, User, OrderStatus
+from database.session import async_session_maker
+from modules.payments import PaymentIngestor, PaymentWebhookHandler, PaymentWebhookServer
+from modules.tickets import TicketService
+from scripts.bench_stats import percentile
+from utils.redis_client import close_redis
+
+
+# Диапазон telegram_id тестовых покупателей, не пересекающийся с реальными
+BENCH_USER_ID_BASE = 9_100_000_000
+
+
+def notification(event: str, payment_id: str, order: Order, refund: bool = False) -> bytes:
+    """Тело уведомления ЮKassa"""
+    amount = {"value": f"{order.amount:.2f}", "currency": "RUB"}
+    if refund:
+        obj = {"id": str(uuid.uuid4()), "payment_id": payment_id, "status": "succeeded", "amount": amount}
+    else:
+        obj = {
+            "id": payment_id,
+            "status": "succeeded",
+            "paid": True,
+            "amount": amount,
+            "metadata": {"order_id": str(order.id)}
+        }
+    return json.dumps({"type": "notification", "event": event, "object": obj}).encode()
+
+
+async def replay(url: str, bodies: List[bytes], rate: float, concurrency: int) -> None:
+    """Отправить уведомления с заданной частотой и вывести задержки подтверждения"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with aiohttp.ClientSession(headers={"Content-Type": "application/json"}) as http:
+        async def send(body: bytes) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with http.post(url, data=body) as response:
+                        statuses[response.status] += 1
+                except aiohttp.ClientError:
+                    statuses["error"] += 1
+                latencies.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        tasks = []
+        for index, body in enumerate(bodies):
+            # Равномерный поток: index-е уведомление уходит в момент index / rate
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(body)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    logger.info(
+        f"Отправлено {len(bodies)} за {elapsed:.2f} с ({len(bodies) / elapsed:.0f}/с), ответы {dict(statuses)}\n"
+        f"  подтверждение p50={statistics.median(latencies) * 1000:.1f} мс "
+        f"p99={percentile(latencies, 99) * 1000:.1f} мс"
+    )
+
+
+async def wait_status(event_id: int, status: OrderStatus, count: int, timeout: float) -> float:
+    """Дождаться count заказов в статусе status; время ожидания"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        async with async_session_maker() as session:
+            current = await session.scalar(
+                select(func.count())
+                .select_from(Order)
+                .where(Order.event_id == event_id)
+                .where(Order.status == status)
+            )
+        if current >= count:
+            break
+        await asyncio.sleep(0.1)
+    return time.perf_counter() - started
+
+
+async def main(orders: int, rate: float, duplicates: float, refunds: int, concurrency: int, url: Optional[str]):
+    """Нагрузочный тест приема платежей"""
+    setup_logging()
+    await init_db()
+    
+    server: Optional[PaymentWebhookServer] = None
+    ingestor: Optional[PaymentIngestor] = None
+    if url is None:
+        ingestor = PaymentIngestor()
+        server = PaymentWebhookServer(PaymentWebhookHandler(ingestor, trusted_ips=""), host="127.0.0.1")
+        await ingestor.start()
+        await server.start()
+        url = f"http://127.0.0.1:{server.port}{settings.payments_webhook_path}"
+    
+    user_ids = [BENCH_USER_ID_BASE + i for i in range(orders)]
+    
+    async with async_session_maker() as session:
+        await session.execute(
+            insert(User)
+            .values([{"telegram_id": user_id, "first_name": "bench"} for user_id in user_ids])
+            .on_conflict_do_nothing()
+        )
+        event = Event(
+            title="[bench] Платежи",
+            start_time=datetime.utcnow() + timedelta(days=1),
+            price=500,
+            max_viewers=orders,
+            reserved_seats=0
+        )
+        session.add(event)
+        await session.commit()
+        event_id = event.id
+    
+    try:
+        pending = []
+        for user_id in user_ids:
+            async with async_session_maker() as session:
+                pending.append((await TicketService(session).reserve_seat(user_id, event_id)).order)
+        
+        payment_ids = {order.id: str(uuid.uuid4()) for order in pending}
+        bodies = [notification("payment.succeeded", payment_ids[order.id], order) for order in pending]
+        bodies += random.choices(bodies, k=int(len(bodies) * duplicates))
+        random.shuffle(bodies)
+        
+        logger.info(f"Оплаты: {orders} заказов, {len(bodies)} уведомлений, {rate:.0f}/с")
+        await replay(url, bodies, rate, concurrency)
+        waited = await wait_status(event_id, OrderStatus.PAID, orders, timeout=60)
+        logger.info(f"Все заказы оплачены через {waited:.2f} с после последнего уведомления")
+        
+        refunded = pending[:refunds]
+        if refunded:
+            bodies = [
+                notification("refund.succeeded", payment_ids[order.id], order, refund=True)
+                for order in refunded
+            ] * 2
+            logger.info(f"Возвраты: {len(refunded)} заказов, {len(bodies)} уведомлений")
+            await replay(url, bodies, rate, concurrency)
+            await wait_status(event_id, OrderStatus.REFUNDED, len(refunded), timeout=60)
+        
+        async with async_session_maker() as session:
+            paid = await session.scalar(
+                select(func.count())
+                .select_from(Order)
+                .where(Order.event_id == event_id)
+                .where(Order.status == OrderStatus.PAID)
+            )
+            tickets = await session.scalar(
+                select(func.count()).select_from(Ticket).where(Ticket.event_id == event_id)
+            )
+            sold = await session.scalar(select(Event.sold_tickets).where(Event.id == event_id))
+            drift = [d for d in await TicketService(session).find_counter_drift() if d.event_id == event_id]
+        
+        expected = orders - len(refunded)
+        logger.info(f"Оплачено {paid}, билетов {tickets}, счетчик продаж {sold} (ожидалось {expected})")
+        
+        if paid == tickets == sold == expected and not drift:
+            logger.success("✅ Каждый заказ оплачен ровно один раз")
+        else:
+            logger.error("❌ Расхождение оплат, билетов или счетчиков!")
+    finally:
+        if server is not None:
+            await server.stop()
+            await ingestor.stop()
+        
+        async with async_session_maker() as session:
+            await session.execute(delete(Ticket).where(Ticket.event_id == event_id))
+            await session.execute(delete(Order).where(Order.event_id == event_id))
+            await session.execute(delete(Event).where(Event.id == event_id))
+            await session.execute(delete(User).where(User.telegram_id.in_(user_ids)))
+            await session.commit()
+        await close_redis()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест приема уведомлений ЮKassa")
+    parser.add_argument("--orders", type=int, default=2000, help="Заказов к оплате")
+    parser.add_argument("--rate", type=float, default=1000, help="Уведомлений в секунду")
+    parser.add_argument("--duplicates", type=float, default=0.5, help="Доля повторных уведомлений")
+    parser.add_argument("--refunds", type=int, default=100, help="Возвратов после оплаты")
+    parser.add_argument("--concurrency", type=int, default=100, help="Одновременных запросов")
+    parser.add_argument("--url", help="Адрес webhook уведомлений (по умолчанию свой прием в процессе)")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.orders, args.rate, args.duplicates, args.refunds, args.concurrency, args.url))
@@ -0,0 +1,59 @@
+"""
+Общие фикстуры тестов
+
+Обязательные настройки подставляются до импорта модулей бота, поэтому
+тесты не требуют .env. Redis заменяется fakeredis в памяти процесса.
+Тесты с PostgreSQL запускаются, только если задан TEST_DATABASE_URL
+(postgresql+asyncpg://...); таблицы этой базы пересоздаются.
+"""
+import os
+
+for name, value in {
+    "BOT_TOKEN": "123456:TEST",
+    "ADMIN_IDS": "1",
+    "DB_PASSWORD": "test",
+    "OPENAI_API_KEY": "test",
+    "STREAM_CHANNEL_ID": "-100",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+def redis_server() -> FakeServer:
+    """Общий сервер: клиенты на нем видят одни данные, как реплики бота"""
+    return FakeServer()
+
+
+@pytest.fixture
+async def redis(redis_server: FakeServer):
+    """Клиент fakeredis"""
+    client = FakeRedis(server=redis_server)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def db_session_maker():
+    """Фабрика сессий чистой тестовой базы PostgreSQL"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL не задан")
+    
+    from database import Base
+    import database.models  # noqa: F401 - регистрирует таблицы в Base.metadata
+    
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
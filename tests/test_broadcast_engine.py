@@ -0,0 +1,183 @@
+"""
+Тесты движка рассылок (modules/broadcasts/engine.py)
+"""
+from typing import List, Optional, Set
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy import select, text
+
+from database.models import Broadcast, BroadcastStatus, User
+from modules.broadcasts.engine import BLOCKED, BROADCAST_LOCK_NAMESPACE, SENT, BroadcastEngine
+from modules.broadcasts.service import BroadcastService
+from utils.rate_limit import TokenBucket
+
+
+USERS = list(range(1, 36))
+
+
+class Crash(Exception):
+    """Процесс упал посреди рассылки"""
+
+
+class StubBot:
+    """Бот, запоминающий отправки вместо запросов к Telegram"""
+    
+    def __init__(
+        self,
+        crash_after: Optional[int] = None,
+        blocked: Set[int] = frozenset(),
+        retry_after: Set[int] = frozenset()
+    ):
+        self.crash_after = crash_after
+        self.blocked = blocked
+        self.retry_after = set(retry_after)
+        self.sent: List[int] = []
+    
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if self.crash_after is not None and len(self.sent) >= self.crash_after:
+            raise Crash()
+        if chat_id in self.retry_after:
+            # Flood wait только на первую попытку
+            self.retry_after.discard(chat_id)
+            raise TelegramRetryAfter(method, "Too Many Requests", retry_after=1)
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method, "bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+class PauseSpy(TokenBucket):
+    """Bucket без ограничения скорости, запоминающий паузы"""
+    
+    def __init__(self):
+        super().__init__(rate=10_000)
+        self.pauses: List[float] = []
+    
+    async def pause(self, seconds: float) -> None:
+        self.pauses.append(seconds)
+
+
+@pytest.fixture
+async def broadcast_id(db_session_maker) -> int:
+    async with db_session_maker() as session:
+        session.add_all(User(telegram_id=telegram_id) for telegram_id in USERS)
+        await session.commit()
+        broadcast = await BroadcastService(session).create_broadcast("Премьера!")
+        return broadcast.id
+
+
+def engine(bot: StubBot, session_maker, bucket: Optional[TokenBucket] = None) -> BroadcastEngine:
+    return BroadcastEngine(
+        bot,
+        session_maker=session_maker,
+        bucket=bucket or PauseSpy(),
+        chunk_size=10,
+        concurrency=1
+    )
+
+
+async def load(session_maker, broadcast_id: int) -> Broadcast:
+    async with session_maker() as session:
+        return await session.get(Broadcast, broadcast_id)
+
+
+async def test_sends_to_everyone_once(db_session_maker, broadcast_id):
+    bot = StubBot()
+    
+    report = await engine(bot, db_session_maker).run(broadcast_id)
+    
+    assert bot.sent == USERS
+    assert report.finished and report.sent == len(USERS)
+    broadcast = await load(db_session_maker, broadcast_id)
+    assert broadcast.status == BroadcastStatus.FINISHED
+    assert broadcast.last_user_id == USERS[-1]
+
+
+async def test_resumes_from_saved_progress_after_crash(db_session_maker, broadcast_id):
+    crashed = StubBot(crash_after=15)
+    with pytest.raises(Crash):
+        await engine(crashed, db_session_maker).run(broadcast_id)
+    
+    # Сохранена только первая порция; вторая была прервана посередине
+    broadcast = await load(db_session_maker, broadcast_id)
+    assert broadcast.status == BroadcastStatus.RUNNING
+    assert broadcast.last_user_id == 10
+    assert broadcast.sent_count == 10
+    
+    restarted = StubBot()
+    report = await engine(restarted, db_session_maker).run(broadcast_id)
+    
+    # Повторно уходит только прерванная порция, первая не дублируется
+    assert restarted.sent == USERS[10:]
+    assert report.finished
+    assert report.sent == len(USERS)
+    assert report.sent_this_run == len(USERS) - 10
+    broadcast = await load(db_session_maker, broadcast_id)
+    assert broadcast.status == BroadcastStatus.FINISHED
+    assert broadcast.sent_count == len(USERS)
+
+
+async def test_finished_broadcast_is_not_resent(db_session_maker, broadcast_id):
+    await engine(StubBot(), db_session_maker).run(broadcast_id)
+    bot = StubBot()
+    
+    report = await engine(bot, db_session_maker).run(broadcast_id)
+    
+    assert report.finished
+    assert bot.sent == []
+
+
+async def test_blocked_users_are_marked(db_session_maker, broadcast_id):
+    bot = StubBot(blocked={3, 17})
+    
+    report = await engine(bot, db_session_maker).run(broadcast_id)
+    
+    assert report.blocked == 2
+    assert report.sent == len(USERS) - 2
+    async with db_session_maker() as session:
+        blocked = await session.scalars(select(User.telegram_id).where(User.is_blocked.is_(True)))
+        assert sorted(blocked) == [3, 17]
+
+
+async def test_retry_after_pauses_bucket_and_retries(db_session_maker, broadcast_id):
+    bot = StubBot(retry_after={5})
+    bucket = PauseSpy()
+    
+    report = await engine(bot, db_session_maker, bucket).run(broadcast_id)
+    
+    assert bucket.pauses == [1]
+    assert report.flood_waits == 1
+    assert bot.sent == USERS
+    broadcast = await load(db_session_maker, broadcast_id)
+    assert broadcast.flood_wait_count == 1
+
+
+async def test_send_many_reports_result_per_recipient():
+    bot = StubBot(blocked={2})
+    
+    results, flood_waits = await engine(bot, None).send_many([1, 2, 3], "Премьера!")
+    
+    assert results == [SENT, BLOCKED, SENT]
+    assert flood_waits == 0
+
+
+async def test_lock_connection_is_not_left_in_transaction(db_session_maker, broadcast_id):
+    states = []
+    
+    async def on_progress(report):
+        async with db_session_maker() as session:
+            result = await session.scalars(
+                text(
+                    "SELECT a.state FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid "
+                    "WHERE l.locktype = 'advisory' AND l.classid = :namespace AND l.objid = :id"
+                ),
+                {"namespace": BROADCAST_LOCK_NAMESPACE, "id": broadcast_id}
+            )
+            states.extend(result)
+    
+    await engine(StubBot(), db_session_maker).run(broadcast_id, on_progress=on_progress)
+    
+    # Блокировка держится все время рассылки, но без открытой транзакции
+    assert states and set(states) == {"idle"}
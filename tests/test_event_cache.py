@@ -0,0 +1,193 @@
+"""
+Тесты двухуровневого кэша событий (modules/events/cache.py)
+"""
+import asyncio
+import json
+
+import pytest
+
+from modules.events.cache import EventCache, generation_key
+
+
+KEY = "event:1"
+
+
+class Loader:
+    """Загрузчик из "БД" со счетчиком вызовов и ручным завершением"""
+    
+    def __init__(self, value, gated: bool = False):
+        self.value = value
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not gated:
+            self.release.set()
+    
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return self.value
+
+
+@pytest.fixture
+def cache(redis):
+    return EventCache(redis=redis, maxsize=16, l1_ttl=60, l2_ttl=60)
+
+
+async def test_concurrent_misses_share_one_load(cache, redis):
+    loader = Loader({"id": 1}, gated=True)
+    
+    tasks = [asyncio.create_task(cache.get_or_load(KEY, loader)) for _ in range(10)]
+    await loader.started.wait()
+    loader.release.set()
+    results = await asyncio.gather(*tasks)
+    
+    assert loader.calls == 1
+    assert results == [{"id": 1}] * 10
+    assert json.loads(await redis.get(KEY)) == {"id": 1}
+
+
+async def test_loader_error_reaches_all_waiters(cache):
+    started = asyncio.Event()
+    release = asyncio.Event()
+    
+    async def failing():
+        started.set()
+        await release.wait()
+        raise RuntimeError("db down")
+    
+    tasks = [asyncio.create_task(cache.get_or_load(KEY, failing)) for _ in range(3)]
+    await started.wait()
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # Ошибка не кэшируется: следующий промах снова идет в загрузчик
+    assert await cache.get_or_load(KEY, Loader({"id": 1})) == {"id": 1}
+
+
+async def test_none_is_not_cached(cache):
+    loader = Loader(None)
+    
+    assert await cache.get_or_load(KEY, loader) is None
+    assert await cache.get_or_load(KEY, loader) is None
+    assert loader.calls == 2
+
+
+async def test_l1_serves_repeated_reads(cache, redis):
+    loader = Loader({"id": 1})
+    await cache.get_or_load(KEY, loader)
+    
+    # Без L2 значение все равно берется из памяти
+    await redis.delete(KEY)
+    assert await cache.get_or_load(KEY, loader) == {"id": 1}
+    assert loader.calls == 1
+
+
+async def test_l2_is_shared_between_replicas(cache, redis_server):
+    from fakeredis.aioredis import FakeRedis
+    
+    await cache.get_or_load(KEY, Loader({"id": 1}))
+    
+    replica = EventCache(redis=FakeRedis(server=redis_server), l1_ttl=60, l2_ttl=60)
+    loader = Loader({"id": 1, "stale": True})
+    assert await replica.get_or_load(KEY, loader) == {"id": 1}
+    assert loader.calls == 0
+
+
+async def test_invalidate_clears_both_levels(cache, redis):
+    await cache.get_or_load(KEY, Loader({"title": "old"}))
+    
+    await cache.invalidate(KEY)
+    
+    assert await redis.get(KEY) is None
+    assert int(await redis.get(generation_key(KEY))) == 1
+    assert 0 < await redis.ttl(generation_key(KEY))
+    assert await cache.get_or_load(KEY, Loader({"title": "new"})) == {"title": "new"}
+
+
+async def test_local_invalidation_during_load_is_not_cached(cache, redis):
+    loader = Loader({"title": "old"}, gated=True)
+    task = asyncio.create_task(cache.get_or_load(KEY, loader))
+    await loader.started.wait()
+    
+    await cache.invalidate(KEY)
+    loader.release.set()
+    
+    # Вызвавший получает то, что прочитал, но ни L1, ни L2 это не запоминают
+    assert await task == {"title": "old"}
+    assert await redis.get(KEY) is None
+    assert await cache.get_or_load(KEY, Loader({"title": "new"})) == {"title": "new"}
+
+
+async def test_stale_l2_write_from_other_replica_is_rejected(cache, redis_server):
+    from fakeredis.aioredis import FakeRedis
+    
+    replica = EventCache(redis=FakeRedis(server=redis_server), l1_ttl=60, l2_ttl=60)
+    loader = Loader({"title": "old"}, gated=True)
+    task = asyncio.create_task(cache.get_or_load(KEY, loader))
+    await loader.started.wait()
+    
+    # Другая реплика изменила событие и инвалидировала ключ, пока эта читала БД
+    await replica.invalidate(KEY)
+    loader.release.set()
+    await task
+    
+    assert await replica.redis.get(KEY) is None
+    fresh = Loader({"title": "new"})
+    assert await replica.get_or_load(KEY, fresh) == {"title": "new"}
+    assert fresh.calls == 1
+
+
+async def test_write_with_current_generation_is_accepted(cache, redis):
+    await cache.invalidate(KEY)
+    
+    assert await cache.get_or_load(KEY, Loader({"title": "new"})) == {"title": "new"}
+    assert json.loads(await redis.get(KEY)) == {"title": "new"}
+
+
+async def test_waiters_take_over_when_leader_is_cancelled(cache):
+    leader_loader = Loader({"id": 1}, gated=True)
+    leader = asyncio.create_task(cache.get_or_load(KEY, leader_loader))
+    await leader_loader.started.wait()
+    
+    waiter_loader = Loader({"id": 1})
+    waiters = [asyncio.create_task(cache.get_or_load(KEY, waiter_loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    
+    assert await asyncio.gather(*waiters) == [{"id": 1}] * 3
+    # Загрузку повторил один ожидающий, остальные дождались его
+    assert waiter_loader.calls == 1
+
+
+async def test_cancelled_waiter_does_not_cancel_load(cache):
+    loader = Loader({"id": 1}, gated=True)
+    leader = asyncio.create_task(cache.get_or_load(KEY, loader))
+    await loader.started.wait()
+    
+    waiter = asyncio.create_task(cache.get_or_load(KEY, loader))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    
+    loader.release.set()
+    assert await leader == {"id": 1}
+    assert loader.calls == 1
+
+
+async def test_redis_errors_fall_back_to_loader():
+    class BrokenRedis:
+        async def mget(self, *keys):
+            raise ConnectionError("redis down")
+    
+    cache = EventCache(redis=BrokenRedis(), l1_ttl=60)
+    loader = Loader({"id": 1})
+    
+    assert await cache.get_or_load(KEY, loader) == {"id": 1}
+    assert loader.calls == 1
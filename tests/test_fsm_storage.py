@@ -0,0 +1,165 @@
+"""
+Тесты хранилища FSM в Redis (bot/fsm_storage.py)
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from redis.asyncio.connection import AbstractConnection
+
+from bot.fsm_storage import RedisFSMStorage, advance
+from bot.handlers import admin
+from bot.handlers.admin import CreateEventStates
+
+
+TTL = 600
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+@pytest.fixture
+def storage(redis):
+    return RedisFSMStorage(redis=redis, ttl=TTL)
+
+
+@pytest.fixture
+def state(storage):
+    return FSMContext(storage=storage, key=KEY)
+
+
+@pytest.fixture
+async def round_trips(redis, monkeypatch):
+    """Счетчик отправок команд в Redis (pipeline уходит одной отправкой)"""
+    # Соединение открывается заранее, чтобы не считать его рукопожатие
+    await redis.ping()
+    calls = []
+    send = AbstractConnection.send_packed_command
+    
+    async def counting(self, command, *args, **kwargs):
+        calls.append(command)
+        return await send(self, command, *args, **kwargs)
+    
+    monkeypatch.setattr(AbstractConnection, "send_packed_command", counting)
+    return calls
+
+
+def message(text: str) -> SimpleNamespace:
+    """Сообщение администратора для обработчиков мастера"""
+    return SimpleNamespace(text=text, answer=AsyncMock())
+
+
+async def test_set_state_and_data_is_one_round_trip(storage, redis, round_trips):
+    data = await storage.set_state_and_data(KEY, CreateEventStates.price, {"duration_minutes": 90})
+    
+    assert len(round_trips) == 1
+    assert data == {"duration_minutes": 90}
+    assert await storage.get_state(KEY) == CreateEventStates.price.state
+
+
+async def test_advance_is_one_round_trip(state, round_trips):
+    await advance(state, CreateEventStates.description, title="Гамлет")
+    
+    assert len(round_trips) == 1
+    assert await state.get_state() == CreateEventStates.description.state
+    assert await state.get_data() == {"title": "Гамлет"}
+
+
+async def test_update_data_merges_fields_without_reading(storage, round_trips):
+    await storage.update_data(KEY, {"title": "Гамлет"})
+    data = await storage.update_data(KEY, {"price": 500.0})
+    
+    assert len(round_trips) == 2
+    assert data == {"title": "Гамлет", "price": 500.0}
+
+
+async def test_advance_falls_back_for_other_storages():
+    state = FSMContext(storage=MemoryStorage(), key=KEY)
+    
+    await advance(state, CreateEventStates.description, title="Гамлет")
+    
+    assert await state.get_state() == CreateEventStates.description.state
+    assert await state.get_data() == {"title": "Гамлет"}
+
+
+async def test_state_and_data_expire_together(storage, redis):
+    await storage.set_state_and_data(KEY, CreateEventStates.title, {"step": 1})
+    
+    state_key = storage.key_builder.build(KEY, "state")
+    data_key = storage.key_builder.build(KEY, "data")
+    assert 0 < await redis.ttl(state_key) <= TTL
+    assert 0 < await redis.ttl(data_key) <= TTL
+    
+    # Любая запись продлевает оба ключа: брошенный мастер удаляется целиком
+    await redis.expire(state_key, 5)
+    await redis.expire(data_key, 5)
+    await storage.update_data(KEY, {"step": 2})
+    assert await redis.ttl(state_key) > 5
+    assert await redis.ttl(data_key) > 5
+
+
+async def test_abandoned_wizard_disappears_after_ttl(storage, redis):
+    await storage.set_state_and_data(KEY, CreateEventStates.price, {"title": "Гамлет"})
+    
+    for name in ("state", "data"):
+        await redis.pexpire(storage.key_builder.build(KEY, name), 1)
+    await asyncio.sleep(0.01)
+    assert await storage.get_state(KEY) is None
+    assert await storage.get_data(KEY) == {}
+
+
+async def test_without_ttl_keys_do_not_expire(redis):
+    storage = RedisFSMStorage(redis=redis)
+    
+    await storage.set_state_and_data(KEY, CreateEventStates.title, {"step": 1})
+    
+    assert await redis.ttl(storage.key_builder.build(KEY, "state")) == -1
+    assert await redis.ttl(storage.key_builder.build(KEY, "data")) == -1
+
+
+async def test_clear_removes_state_and_data(state, storage, redis):
+    await advance(state, CreateEventStates.description, title="Гамлет")
+    
+    await state.clear()
+    
+    assert await state.get_state() is None
+    assert await state.get_data() == {}
+    assert await redis.exists(storage.key_builder.build(KEY, "data")) == 0
+
+
+async def test_wizard_round_trips_start_time(state):
+    await admin.start_create_event(
+        SimpleNamespace(message=SimpleNamespace(edit_text=AsyncMock()), answer=AsyncMock()),
+        state
+    )
+    await admin.process_event_title(message("Гамлет"), state)
+    await admin.process_event_description(message("-"), state)
+    await admin.process_event_start_time(message("25.12.2024 19:00"), state)
+    await admin.process_event_duration(message("90"), state)
+    await admin.process_event_price(message("500"), state)
+    
+    assert await state.get_state() == CreateEventStates.max_viewers.state
+    data = await state.get_data()
+    assert data == {
+        "title": "Гамлет",
+        "description": None,
+        "start_time": "2024-12-25T19:00:00",
+        "duration_minutes": 90,
+        "price": 500.0,
+    }
+    # Так время читает последний шаг мастера
+    assert datetime.fromisoformat(data["start_time"]) == datetime(2024, 12, 25, 19, 0)
+
+
+async def test_wizard_keeps_step_on_bad_start_time(state):
+    await state.set_state(CreateEventStates.start_time)
+    reply = message("завтра вечером")
+    
+    await admin.process_event_start_time(reply, state)
+    
+    assert await state.get_state() == CreateEventStates.start_time.state
+    assert "start_time" not in await state.get_data()
+    reply.answer.assert_awaited_once()
@@ -0,0 +1,99 @@
+"""
+Тесты ограничителей скорости (utils/rate_limit.py)
+"""
+import asyncio
+import time
+
+from fakeredis.aioredis import FakeRedis
+
+from utils.rate_limit import RedisTokenBucket, TokenBucket
+
+
+KEY = "rate:test"
+
+
+class BrokenRedis:
+    """Redis, к которому нельзя подключиться"""
+    
+    def pipeline(self, *args, **kwargs):
+        raise ConnectionError("redis down")
+
+
+async def timed(coroutine) -> float:
+    started = time.monotonic()
+    await coroutine
+    return time.monotonic() - started
+
+
+async def acquire_many(bucket: TokenBucket, count: int) -> None:
+    for _ in range(count):
+        await bucket.acquire()
+
+
+async def test_local_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    
+    # Запас capacity выдается сразу, дальше по 1/rate
+    assert await timed(acquire_many(bucket, 2)) < 0.05
+    assert await timed(acquire_many(bucket, 4)) >= 4 / 20 - 0.01
+
+
+async def test_local_pause_stops_tokens():
+    bucket = TokenBucket(rate=100)
+    
+    await bucket.pause(0.2)
+    
+    assert await timed(bucket.acquire()) >= 0.19
+
+
+async def test_redis_bucket_paces_by_gcra(redis):
+    bucket = RedisTokenBucket(KEY, rate=20, capacity=1, redis=redis)
+    
+    assert await timed(acquire_many(bucket, 5)) >= 4 / 20 - 0.01
+    # В Redis хранится момент, когда освободится следующий токен
+    assert float(await redis.get(KEY)) > 0
+    assert await redis.pttl(KEY) > 0
+
+
+async def test_redis_bucket_allows_capacity_burst(redis):
+    bucket = RedisTokenBucket(KEY, rate=10, capacity=5, redis=redis)
+    
+    assert await timed(acquire_many(bucket, 5)) < 0.05
+    assert await timed(bucket.acquire()) >= 0.09
+
+
+async def test_redis_bucket_is_shared_between_processes(redis_server):
+    first = RedisTokenBucket(KEY, rate=20, capacity=1, redis=FakeRedis(server=redis_server))
+    second = RedisTokenBucket(KEY, rate=20, capacity=1, redis=FakeRedis(server=redis_server))
+    
+    # Два "процесса" по 5 токенов делят одну скорость: 10 токенов за 9 интервалов
+    elapsed = await timed(asyncio.gather(acquire_many(first, 5), acquire_many(second, 5)))
+    
+    assert elapsed >= 9 / 20 - 0.01
+
+
+async def test_retry_after_pauses_all_processes(redis_server):
+    first = RedisTokenBucket(KEY, rate=100, redis=FakeRedis(server=redis_server))
+    second = RedisTokenBucket(KEY, rate=100, redis=FakeRedis(server=redis_server))
+    await first.acquire()
+    
+    # Flood wait, полученный одним процессом, останавливает и остальные
+    await first.pause(0.3)
+    
+    assert await timed(second.acquire()) >= 0.28
+    assert await timed(first.acquire()) < 0.05
+
+
+async def test_falls_back_to_local_bucket_without_redis():
+    bucket = RedisTokenBucket(KEY, rate=20, capacity=1, redis=BrokenRedis())
+    
+    assert await timed(acquire_many(bucket, 5)) >= 4 / 20 - 0.01
+
+
+async def test_pause_without_redis_still_pauses_locally():
+    bucket = RedisTokenBucket(KEY, rate=100, redis=BrokenRedis())
+    
+    await bucket.pause(0.2)
+    
+    assert await timed(bucket.acquire()) >= 0.19
+
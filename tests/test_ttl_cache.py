@@ -0,0 +1,72 @@
+"""
+Тесты LRU-кэша с TTL (utils/cache.py)
+"""
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемые часы вместо time.monotonic"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_default_for_missing_key():
+    cache = TTLCache(maxsize=2, ttl=10)
+    
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("key", "value")
+    
+    clock[0] += 9.9
+    assert cache.get("key") == "value"
+    
+    clock[0] += 0.2
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    
+    clock[0] += 2
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    # Чтение делает "a" самым свежим, вытесняется "b"
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_pop_and_clear():
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+    assert len(cache) == 1
+    
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,10 @@
+"""
+Утилиты
+"""
+from utils.cache import TTLCache
+from utils.redis_client import get_redis, close_redis
+from utils.rate_limit import TokenBucket, RedisTokenBucket, telegram_bucket
+from utils.qr import QRRenderer
+from utils.timer_wheel import TimerWheel
+
+__all__ = ['TTLCache', 'get_redis', 'close_redis', 'TokenBucket', 'RedisTokenBucket', 'telegram_bucket', 'QRRenderer', 'TimerWheel']
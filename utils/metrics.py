@@ -0,0 +1,248 @@
+"""
+Метрики в формате Prometheus
+
+Счетчики и гистограммы меняются только из потока event loop, поэтому
+обходятся без блокировок: наблюдение - это поиск корзины bisect и пара
+сложений (около микросекунды). Накопленные значения отдаются HTTP-сервером
+в текстовом формате Prometheus.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+
+# Корзины задержек, сек
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Корзины количества запросов к БД
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+@dataclass
+class MetricsScope:
+    """Замер текущего обновления: сюда пишут счетчики БД и Bot API"""
+    handler: str
+    update_type: str
+    statements: int = 0
+    pool_wait: float = 0.0
+
+
+# Обновление, которое обрабатывается в текущей задаче (None - фоновые задачи)
+current_scope: ContextVar[Optional[MetricsScope]] = ContextVar("metrics_scope", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Метрика с набором меток; серии создаются при первом обращении"""
+    kind = ""
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["Registry"] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+    
+    def labels(self, *values: str):
+        """Серия с данными значениями меток (ее стоит сохранить для горячего пути)"""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+            series = self._series[values] = self._new_series()
+        return series
+    
+    def _new_series(self):
+        raise NotImplementedError
+    
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in list(self._series.items()):
+            lines.extend(self._render(values, series))
+        return lines
+    
+    def _render(self, values: Tuple[str, ...], series) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterSeries:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Монотонный счетчик"""
+    kind = "counter"
+    
+    def _new_series(self) -> _CounterSeries:
+        return _CounterSeries()
+    
+    def inc(self, amount: float = 1) -> None:
+        """Увеличить счетчик без меток"""
+        self.labels().inc(amount)
+    
+    def _render(self, values, series: _CounterSeries) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {series.value}"]
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum")
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # counts[i] - наблюдения в (bounds[i-1], bounds[i]], последний элемент - выше всех границ
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными корзинами"""
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: Optional["Registry"] = None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+    
+    def observe(self, value: float) -> None:
+        """Наблюдение без меток"""
+        self.labels().observe(value)
+    
+    def _render(self, values, series: _HistogramSeries) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            labels = _format_labels(self.labelnames, values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {series.sum}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Значение, которое считывается функцией в момент выгрузки метрик"""
+    kind = "gauge"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], float],
+        registry: Optional["Registry"] = None
+    ):
+        super().__init__(name, documentation, (), registry)
+        self.function = function
+        self._series[()] = None
+    
+    def _render(self, values, series) -> List[str]:
+        try:
+            return [f"{self.name} {float(self.function())}"]
+        except Exception as e:
+            logger.warning(f"Метрика {self.name} не считана: {e}")
+            return []
+
+
+class Registry:
+    """Набор метрик процесса"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+    
+    def render(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+_started = time.time()
+PROCESS_START_TIME = Gauge("process_start_time_seconds", "Время запуска процесса (unix)", lambda: _started)
+
+
+class MetricsServer:
+    """HTTP-сервер выгрузки метрик для Prometheus"""
+    
+    def __init__(self, host: str, port: int, path: str = "/metrics", registry: Optional[Registry] = None):
+        """
+        Args:
+            host: Адрес
+            port: Порт
+            path: Путь выгрузки
+            registry: Набор метрик (по умолчанию общий)
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.registry = registry or REGISTRY
+        self._runner: Optional[web.AppRunner] = None
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+    
+    async def start(self) -> None:
+        """Запустить сервер"""
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Метрики Prometheus: http://{self.host}:{self.port}{self.path}")
+    
+    async def stop(self) -> None:
+        """Остановить сервер"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
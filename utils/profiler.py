@@ -0,0 +1,218 @@
+"""
+Выборочный профилировщик работающего процесса бота
+
+Поток-сэмплер с заданным периодом снимает стеки всех потоков
+(sys._current_frames - профиль по реальному времени, включая ожидание)
+и цепочки await всех задач asyncio: где каждая задача сейчас ждет.
+Стеки копятся в формате collapsed stacks ("a;b;c 42"), который понимают
+flamegraph.pl и speedscope.
+
+Сэмплер работает в своем потоке и только читает кадры, поэтому обработку
+обновлений не блокирует; цена - короткое удержание GIL на выборку.
+Одновременно идет не больше одного профилирования на процесс.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from loguru import logger
+
+from config.settings import settings
+
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_running_tasks: Set[asyncio.Task] = set()
+
+# Идущее профилирование процесса
+_active: Optional["SamplingProfiler"] = None
+
+
+def _short_path(path: str) -> str:
+    """Путь файла без префикса проекта, site-packages или стандартной библиотеки"""
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        index = path.rfind(marker)
+        if index != -1:
+            rest = path[index + len(marker):]
+            return rest if marker.startswith("site") else rest.split(os.sep, 1)[-1]
+    try:
+        return os.path.relpath(path)
+    except ValueError:
+        return path
+
+
+class SamplingProfiler:
+    """Сэмплер стеков потоков и задач asyncio"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.01):
+        """
+        Args:
+            loop: Event loop, задачи которого выбираются
+            interval: Период выборки, сек
+        """
+        self.loop = loop
+        self.interval = interval
+        
+        self.wall: Counter = Counter()
+        self.tasks: Counter = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0  # Сколько занимали сами выборки, сек
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        
+        self._labels: Dict[object, str] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({_short_path(code.co_filename)})"
+        return label
+    
+    def _frame_stack(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+    
+    def _task_stack(self, task: asyncio.Task) -> str:
+        # Цепочка cr_await от корутины задачи до места, где она сейчас ждет
+        labels = []
+        awaitable = task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                labels.append(f"[{type(awaitable).__name__}]")
+                break
+            labels.append(self._label(frame.f_code))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return ";".join(labels)
+    
+    def _sample(self, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_id:
+                self.wall[f"{names.get(thread_id, thread_id)};{self._frame_stack(frame)}"] += 1
+        
+        # Набор задач меняет поток loop; all_tasks повторяет копирование при гонке
+        for task in asyncio.all_tasks(self.loop):
+            if not task.done():
+                self.tasks[self._task_stack(task)] += 1
+    
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                self._sample(own_id)
+            except RuntimeError:
+                # Кадр или набор задач изменился во время чтения: пропускаем выборку
+                continue
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - started
+    
+    def start(self) -> None:
+        """Начать выборку"""
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    async def stop(self) -> None:
+        """Остановить выборку, не блокируя event loop ожиданием потока"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        while self._thread.is_alive():
+            await asyncio.sleep(self.interval)
+        self._thread = None
+        self.finished_at = time.monotonic()
+    
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Стеки в формате collapsed stacks, частые первыми"""
+        lines: List[str] = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+def start_profile(bot: Bot, chat_id: int, seconds: float) -> Optional[asyncio.Task]:
+    """
+    Профилировать процесс в фоне и прислать результат документами
+    
+    Args:
+        bot: Бот
+        chat_id: Чат, куда прислать профили
+        seconds: Длительность, сек
+        
+    Returns:
+        Optional[asyncio.Task]: Задача профилирования или None, если уже идет другое
+    """
+    global _active
+    if _active is not None:
+        return None
+    
+    profiler = SamplingProfiler(asyncio.get_running_loop(), settings.profiler_interval)
+    _active = profiler
+    
+    async def runner():
+        global _active
+        try:
+            profiler.start()
+            await asyncio.sleep(seconds)
+            await profiler.stop()
+            await send_profile(bot, chat_id, profiler)
+        except Exception as e:
+            logger.exception(f"Профилирование прервано: {e}")
+        finally:
+            await profiler.stop()
+            _active = None
+    
+    task = asyncio.create_task(runner())
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return task
+
+
+async def send_profile(bot: Bot, chat_id: int, profiler: SamplingProfiler) -> None:
+    """
+    Отправить профили потоков и задач документами
+    
+    Args:
+        bot: Бот
+        chat_id: Чат
+        profiler: Остановленный профилировщик
+    """
+    duration = profiler.finished_at - profiler.started_at
+    if not profiler.samples:
+        await bot.send_message(chat_id, "🔬 Профилирование завершено, но выборок нет")
+        return
+    
+    overhead = profiler.sampling_time / duration * 100 if duration else 0
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    summary = (
+        f"🔬 Профиль процесса {os.getpid()} за {duration:.0f} с\n"
+        f"Выборок: {profiler.samples} (раз в {profiler.interval * 1000:.0f} мс), "
+        f"нагрузка сэмплера {overhead:.1f}%\n"
+        "Формат collapsed stacks: flamegraph.pl или speedscope.app"
+    )
+    
+    await bot.send_document(
+        chat_id,
+        BufferedInputFile(profiler.collapsed(profiler.wall).encode(), filename=f"profile_wall_{stamp}.txt"),
+        caption=f"{summary}\n\nСтеки потоков (реальное время)"
+    )
+    if profiler.tasks:
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(profiler.collapsed(profiler.tasks).encode(), filename=f"profile_tasks_{stamp}.txt"),
+            caption="Задачи asyncio: где ждут"
+        )
+    logger.info(f"Профиль за {duration:.0f} с отправлен в чат {chat_id}: {profiler.samples} выборок")
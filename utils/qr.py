@@ -0,0 +1,97 @@
+"""
+Генерация QR-кодов в пуле процессов
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+from loguru import logger
+
+
+def render_qr_png(payload: str, box_size: int = 8, border: int = 2) -> bytes:
+    """
+    Нарисовать QR-код в PNG (выполняется в процессе пула)
+    
+    Args:
+        payload: Содержимое QR-кода
+        box_size: Размер модуля в пикселях
+        border: Поле в модулях
+        
+    Returns:
+        bytes: PNG
+    """
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECT_M, box_size=box_size, border=border)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer)
+    return buffer.getvalue()
+
+
+def render_qr_chunk(payloads: Sequence[str]) -> List[bytes]:
+    """Нарисовать пачку QR-кодов за один переход в процесс пула"""
+    return [render_qr_png(payload) for payload in payloads]
+
+
+class QRRenderer:
+    """
+    Пул процессов для генерации QR-кодов
+    
+    Генерация PNG занимает процессор на миллисекунды, поэтому в event loop
+    ее не выполняем. Пул создается при первом обращении.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Количество процессов (по умолчанию по числу ядер)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Пул генерации QR-кодов: {self.workers} процессов")
+        return self._pool
+    
+    async def render(self, payload: str) -> bytes:
+        """Нарисовать один QR-код"""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, render_qr_png, payload)
+    
+    async def render_many(self, payloads: Sequence[str]) -> List[bytes]:
+        """
+        Нарисовать QR-коды на всех процессах пула
+        
+        Список режется на пачки (по несколько на процесс, чтобы выровнять
+        нагрузку), порядок результатов совпадает с порядком payloads.
+        """
+        if not payloads:
+            return []
+        
+        loop = asyncio.get_running_loop()
+        size = max(1, -(-len(payloads) // (self.workers * 4)))
+        chunks = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+        
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, render_qr_chunk, chunk) for chunk in chunks
+        ))
+        return [png for chunk in results for png in chunk]
+    
+    async def close(self) -> None:
+        """Остановить процессы пула"""
+        if self._pool is None:
+            return
+        
+        pool, self._pool = self._pool, None
+        await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
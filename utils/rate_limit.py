@@ -0,0 +1,155 @@
+"""
+Ограничение частоты запросов к Telegram Bot API
+
+Лимит Telegram считается на бота целиком, поэтому общий bucket живет в Redis
+и делится всеми процессами: фронтом, воркерами и репликами.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from loguru import logger
+
+from config.settings import settings
+from utils.redis_client import get_redis
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket
+    
+    Токены пополняются со скоростью rate в секунду до capacity.
+    pause() останавливает выдачу токенов целиком, например на время
+    flood wait (RetryAfter) от Telegram.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Токенов в секунду
+            capacity: Максимальный запас токенов (по умолчанию rate, т.е. всплеск не больше секунды)
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: float = 1) -> None:
+        """Дождаться и забрать токены (ожидающие обслуживаются по очереди)"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+    
+    async def pause(self, seconds: float) -> None:
+        """Приостановить выдачу токенов на seconds секунд"""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = now
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Token bucket в Redis, общий для всех процессов
+    
+    В Redis хранится время, с которого свободен следующий токен (GCRA).
+    acquire атомарно (WATCH/MULTI) сдвигает его на 1/rate и ждет своего
+    момента локально, поэтому ожидающие не опрашивают Redis. Внутри процесса
+    обращения к Redis идут по одному: одно соединение и меньше конфликтов WATCH. Время берется
+    из Redis (TIME), чтобы расхождение часов процессов не меняло скорость.
+    pause сдвигает это время вперед для всех процессов сразу.
+    
+    Если Redis недоступен, токены выдает локальный bucket процесса.
+    """
+    
+    def __init__(self, key: str, rate: float, capacity: Optional[float] = None, redis: Optional[Redis] = None):
+        """
+        Args:
+            key: Ключ Redis
+            rate: Токенов в секунду
+            capacity: Максимальный запас токенов (по умолчанию rate)
+            redis: Клиент Redis (по умолчанию общий)
+        """
+        super().__init__(rate, capacity)
+        self.key = key
+        self._redis = redis
+    
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+    
+    async def _advance(self, tokens: float = 0, pause: float = 0) -> float:
+        """
+        Атомарно забрать токены или отложить выдачу
+        
+        Returns:
+            float: Сколько ждать до своего токена, сек
+        """
+        interval = 1 / self.rate
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(self.key)
+                seconds, microseconds = await pipe.time()
+                now = seconds + microseconds / 1_000_000
+                free_at = float(await pipe.get(self.key) or 0)
+                
+                if pause:
+                    free_at = max(free_at, now + pause)
+                    wait = 0.0
+                else:
+                    # Простаивавший bucket накопил не больше capacity токенов
+                    start = max(free_at, now - (self.capacity - tokens) * interval)
+                    free_at = start + tokens * interval
+                    wait = max(start + (tokens - 1) * interval - now, 0.0) if tokens else 0.0
+                
+                pipe.multi()
+                pipe.set(self.key, repr(free_at), px=int((free_at - now + 60) * 1000))
+                try:
+                    await pipe.execute()
+                except WatchError:
+                    continue
+                return wait
+    
+    async def acquire(self, tokens: float = 1) -> None:
+        """Дождаться и забрать токены общего bucket"""
+        try:
+            async with self._lock:
+                wait = await self._advance(tokens=tokens)
+        except Exception as e:
+            logger.warning(f"Redis недоступен, лимит {self.key} считается в процессе: {e}")
+            await super().acquire(tokens)
+            return
+        
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    async def pause(self, seconds: float) -> None:
+        """Приостановить выдачу токенов всем процессам на seconds секунд"""
+        await super().pause(seconds)
+        try:
+            await self._advance(pause=seconds)
+        except Exception as e:
+            logger.warning(f"Не удалось приостановить лимит {self.key} в Redis: {e}")
+
+
+# Общий лимит исходящих сообщений бота (~30 сообщений в секунду у Telegram)
+telegram_bucket = RedisTokenBucket("rate:telegram", rate=settings.telegram_rate_limit)
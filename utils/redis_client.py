@@ -0,0 +1,37 @@
+"""
+Клиент Redis
+"""
+from typing import Optional
+
+from redis.asyncio import Redis
+from loguru import logger
+
+from config.settings import settings
+
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """
+    Получить общий клиент Redis (создается при первом обращении)
+    
+    Returns:
+        Redis: Асинхронный клиент с пулом соединений
+    """
+    global _redis
+    
+    if _redis is None:
+        _redis = Redis.from_url(settings.redis_url)
+        logger.info(f"Подключение к Redis: {settings.redis_host}:{settings.redis_port}")
+    
+    return _redis
+
+
+async def close_redis():
+    """Закрытие соединения с Redis"""
+    global _redis
+    
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,95 @@
+"""
+Колесо таймеров
+"""
+import math
+from typing import Dict, Hashable, List, Tuple
+
+
+class TimerWheel:
+    """
+    Хэшированное колесо таймеров
+    
+    Таймер попадает в ячейку по времени срабатывания (с точностью resolution),
+    дальние таймеры ждут своего оборота в той же ячейке. Добавление и отмена
+    выполняются за O(1), advance() просматривает только ячейки прошедших тиков.
+    Таймер задается ключом: повторное добавление ключа переносит таймер.
+    """
+    
+    def __init__(self, resolution: float = 1.0, slots: int = 3600):
+        """
+        Args:
+            resolution: Длительность тика в секундах
+            slots: Количество ячеек (один оборот - resolution * slots секунд)
+        """
+        self.resolution = resolution
+        self._slots: List[Dict[Hashable, float]] = [{} for _ in range(slots)]
+        self._index: Dict[Hashable, int] = {}
+        self._tick: int = -1  # Последний обработанный тик
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+    
+    def add(self, key: Hashable, when: float) -> None:
+        """
+        Добавить или перенести таймер
+        
+        Args:
+            key: Ключ таймера
+            when: Время срабатывания (unix time)
+        """
+        self.cancel(key)
+        # Таймер в прошлом срабатывает на ближайшем advance()
+        tick = max(math.ceil(when / self.resolution), self._tick + 1)
+        slot = tick % len(self._slots)
+        self._slots[slot][key] = when
+        self._index[key] = slot
+    
+    def cancel(self, key: Hashable) -> bool:
+        """Отменить таймер (True, если он был)"""
+        slot = self._index.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+    
+    def clear(self) -> None:
+        """Удалить все таймеры"""
+        for slot in self._slots:
+            slot.clear()
+        self._index.clear()
+    
+    def advance(self, now: float) -> List[Tuple[Hashable, float]]:
+        """
+        Забрать сработавшие таймеры
+        
+        Args:
+            now: Текущее время (unix time)
+            
+        Returns:
+            List[Tuple[Hashable, float]]: Ключи и время срабатывания по возрастанию времени
+        """
+        tick = math.floor(now / self.resolution)
+        if self._tick < 0:
+            # Первый вызов: ячейки прошлых тиков тоже просматриваются
+            self._tick = tick - len(self._slots)
+        if tick <= self._tick:
+            return []
+        
+        # За пропущенный оборот и больше каждую ячейку достаточно посмотреть один раз
+        first = max(self._tick + 1, tick - len(self._slots) + 1)
+        due: List[Tuple[Hashable, float]] = []
+        
+        for current in range(first, tick + 1):
+            slot = self._slots[current % len(self._slots)]
+            fired = [(key, when) for key, when in slot.items() if when <= now]
+            for key, _ in fired:
+                del slot[key]
+                del self._index[key]
+            due.extend(fired)
+        
+        self._tick = tick
+        due.sort(key=lambda item: item[1])
+        return due
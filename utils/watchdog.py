@@ -0,0 +1,297 @@
+"""
+Сторож event loop и пула соединений БД
+
+Задача в event loop спит по interval секунд и считает опоздание
+пробуждения - это задержка loop: все это время готовые обработчики стояли.
+Отдельный поток следит за пульсом задачи и, если loop завис дольше порога,
+снимает стек потока loop прямо во время блокировки (синхронная запись лога,
+сжатие при ротации, тяжелый CPU-код). Стек пишется в лог из самой задачи
+после восстановления, чтобы поток не конкурировал с зависшим кодом
+за блокировки loguru.
+
+Состояние отдается HTTP-сервером: /health/live и /health/ready.
+Готовность снимается (503), пока недавние задержки выше порога или пул
+соединений исчерпан и запросы стоят в очереди, - оркестратор перестает
+направлять трафик на больную реплику. В многопроцессном режиме воркеры
+передают состояние своих сторожей фронту через общую память, и готовность
+реплики учитывает каждый воркер.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+from config.settings import settings
+from utils.metrics import Counter, Histogram
+
+
+LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+loop_lag = Histogram("event_loop_lag_seconds", "Задержка event loop", buckets=LAG_BUCKETS)
+loop_stalls = Counter("event_loop_stalls_total", "Блокировок event loop дольше порога")
+
+
+class LoopWatchdog:
+    """Замер задержки event loop, снятие стеков блокировок и состояние пула"""
+    
+    def __init__(
+        self,
+        engine: Any = None,
+        interval: float = 0.1,
+        stall_threshold: float = 0.25,
+        unready_lag: float = 1.0,
+        pool_saturation: float = 5.0,
+        window: float = 30.0
+    ):
+        """
+        Args:
+            engine: Движок БД с пулом InstrumentedQueuePool; None - без проверки пула
+            interval: Период замера, сек
+            stall_threshold: Задержка, при которой снимается стек, сек
+            unready_lag: Задержка, после которой реплика не готова, сек
+            pool_saturation: Сколько пул может быть исчерпан до снятия готовности, сек
+            window: Сколько помнить задержки для готовности, сек
+        """
+        self.engine = engine
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.unready_lag = unready_lag
+        self.pool_saturation = pool_saturation
+        self.window = window
+        
+        self.lag = 0.0
+        self.stalls = 0
+        self._recent: Deque[Tuple[float, float]] = deque()  # (время, задержка) выше unready_lag
+        self._saturated_since: Optional[float] = None
+        
+        # Пульс задачи и стек, снятый потоком для этого пульса
+        self._heartbeat = 0.0
+        self._captured: Optional[Tuple[float, str]] = None
+        self._loop_thread_id: Optional[int] = None
+        
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+    
+    @property
+    def pool(self) -> Any:
+        """Текущий пул движка (dispose() заменяет пул)"""
+        return self.engine.pool if self.engine is not None else None
+    
+    async def start(self) -> None:
+        """Запустить замер и поток снятия стеков"""
+        if self._task is not None:
+            return
+        
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Сторож event loop запущен: порог {self.stall_threshold * 1000:.0f} мс, "
+            f"неготовность от {self.unready_lag * 1000:.0f} мс"
+        )
+    
+    async def stop(self) -> None:
+        """Остановить сторожа"""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+    
+    async def _run(self) -> None:
+        """Замеры в event loop"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            previous, self._heartbeat = self._heartbeat, now
+            self._observe(max(now - expected, 0.0), now, previous)
+            self._check_pool(now)
+    
+    def _observe(self, lag: float, now: float, previous: float) -> None:
+        """Учесть задержку; о блокировке сообщить со стеком, снятым во время нее"""
+        self.lag = lag
+        loop_lag.observe(lag)
+        
+        if lag >= self.unready_lag:
+            self._recent.append((now, lag))
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+        
+        if lag < self.stall_threshold:
+            return
+        
+        self.stalls += 1
+        loop_stalls.inc()
+        captured, self._captured = self._captured, None
+        if captured is not None and captured[0] == previous:
+            logger.warning(f"Event loop заблокирован на {lag * 1000:.0f} мс, стек во время блокировки:\n{captured[1]}")
+        else:
+            logger.warning(f"Event loop заблокирован на {lag * 1000:.0f} мс (стек снять не успели)")
+    
+    def _check_pool(self, now: float) -> None:
+        """Отметить, с какого момента пул исчерпан и в нем есть очередь"""
+        if self.pool is None:
+            return
+        
+        saturated = getattr(self.pool, "waiting", 0) > 0 and self.pool.checkedout() >= self.pool.capacity
+        if not saturated:
+            if self._saturated_since is not None:
+                logger.info(f"Пул соединений БД освободился через {now - self._saturated_since:.1f} с")
+            self._saturated_since = None
+        elif self._saturated_since is None:
+            self._saturated_since = now
+            logger.warning(
+                f"Пул соединений БД исчерпан: занято {self.pool.checkedout()}, "
+                f"ожидают {self.pool.waiting}"
+            )
+    
+    def _watch(self) -> None:
+        """Поток: снимает стек потока loop, если пульс не обновлялся дольше порога"""
+        period = min(self.interval, self.stall_threshold) / 2
+        while not self._stopping.wait(period):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.stall_threshold:
+                continue
+            if self._captured is not None and self._captured[0] == heartbeat:
+                continue
+            
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._captured = (heartbeat, "".join(traceback.format_stack(frame)))
+    
+    def pool_state(self) -> Dict[str, Any]:
+        """Состояние пула соединений"""
+        if self.pool is None:
+            return {}
+        return {
+            "checked_out": self.pool.checkedout(),
+            "overflow": max(self.pool.overflow(), 0),
+            "waiting": getattr(self.pool, "waiting", 0),
+            "capacity": getattr(self.pool, "capacity", None)
+        }
+    
+    def recent_lag(self) -> float:
+        """Наибольшая задержка выше unready_lag за окно (0 - не было), сек"""
+        since = time.monotonic() - self.window
+        return max((lag for at, lag in self._recent if at >= since), default=0.0)
+    
+    def saturated_for(self) -> float:
+        """Сколько пул исчерпан, если дольше pool_saturation (иначе 0), сек"""
+        if self._saturated_since is None:
+            return 0.0
+        duration = time.monotonic() - self._saturated_since
+        return duration if duration >= self.pool_saturation else 0.0
+    
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Готовность принимать трафик
+        
+        Returns:
+            Tuple[bool, Dict[str, Any]]: Готова ли реплика и подробности
+        """
+        problems = []
+        
+        recent_lag = self.recent_lag()
+        if recent_lag:
+            problems.append(f"задержка event loop до {recent_lag * 1000:.0f} мс за {self.window:.0f} с")
+        saturated_for = self.saturated_for()
+        if saturated_for:
+            problems.append(f"пул БД исчерпан {saturated_for:.0f} с")
+        # Зависший сейчас loop ответить не сможет, но зависшая задача сторожа - признак сбоя
+        if self._task is None or self._task.done():
+            problems.append("сторож не работает")
+        
+        return not problems, {
+            "lag_ms": round(self.lag * 1000, 1),
+            "stalls": self.stalls,
+            "pool": self.pool_state(),
+            "problems": problems
+        }
+
+
+def create_watchdog(engine: Any = None) -> LoopWatchdog:
+    """
+    Сторож с параметрами из настроек
+    
+    Args:
+        engine: Движок БД, пул которого проверяется
+        
+    Returns:
+        LoopWatchdog: Незапущенный сторож
+    """
+    return LoopWatchdog(
+        engine,
+        interval=settings.watchdog_interval,
+        stall_threshold=settings.watchdog_stall_threshold,
+        unready_lag=settings.watchdog_unready_lag,
+        pool_saturation=settings.watchdog_pool_saturation,
+        window=settings.watchdog_window
+    )
+
+
+class HealthServer:
+    """HTTP-сервер проверок живости и готовности для оркестратора"""
+    
+    def __init__(self, watchdog: LoopWatchdog, host: str, port: int, workers: Any = None):
+        """
+        Args:
+            watchdog: Сторож, по которому судят о готовности
+            host: Адрес
+            port: Порт
+            workers: Пул воркеров (WorkerPool), чья готовность входит в готовность реплики
+        """
+        self.watchdog = watchdog
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self._runner: Optional[web.AppRunner] = None
+    
+    async def handle_live(self, request: web.Request) -> web.Response:
+        """Живость: процесс отвечает, значит event loop крутится"""
+        return web.json_response({"status": "ok", "lag_ms": round(self.watchdog.lag * 1000, 1)})
+    
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        """Готовность: 503, пока loop или пул БД фронта либо любого воркера не в порядке"""
+        ready, details = self.watchdog.readiness()
+        if self.workers is not None:
+            workers_ready, workers_details = self.workers.readiness()
+            ready = ready and workers_ready
+            details["workers"] = workers_details["workers"]
+            details["problems"] += workers_details["problems"]
+        details["status"] = "ok" if ready else "unavailable"
+        return web.json_response(details, status=200 if ready else 503)
+    
+    async def start(self) -> None:
+        """Запустить сервер"""
+        app = web.Application()
+        app.router.add_get("/health/live", self.handle_live)
+        app.router.add_get("/health/ready", self.handle_ready)
+        
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Проверки здоровья: http://{self.host}:{self.port}/health/ready")
+    
+    async def stop(self) -> None:
+        """Остановить сервер"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None